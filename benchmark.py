@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite
+Runs the data cache, provider fallback chains, indicator computation and the HTTP
+endpoints against deterministic fake providers, a synthetic yfinance ticker and a
+token-rate fake LLM (tests/fakes.py), so results are reproducible without network
+access, Yahoo or Ollama. Reports throughput and p50/p99 latency per benchmark and
+saves the results as JSON for comparison between runs.
+With --cassette, the real providers also run against recorded HTTP traffic served
+from a local stand-in server (src/http_cassette.py).
+
+Usage:
+    python benchmark.py                              # Run every group and save the results
+    python benchmark.py cache fallback               # Run selected groups (cache, fallback, indicators, http, scale)
+    python benchmark.py --quick                      # Fewer iterations, for a smoke run
+    python benchmark.py scale --universe 50000       # Caches and batch endpoints across a synthetic market
+    python benchmark.py --concurrency 8              # Concurrent callers for cache and HTTP benchmarks
+    python benchmark.py --compare benchmark_results/20240101-120000.json
+    python benchmark.py providers --cassette cassettes/providers.jsonl.gz --record --symbols AAPL,MSFT
+    python benchmark.py providers --cassette cassettes/providers.jsonl.gz   # Replay with recorded timing
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'src'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'tests'))
+
+# Keep instrumentation quiet and local while benchmarking; set before the app modules are imported
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
+os.environ.setdefault('TRACE_EXPORT_PATH', '')
+os.environ.setdefault('PROFILE_SAMPLE_RATE', '0')
+os.environ.setdefault('SESSION_STORE', 'memory')
+os.environ.setdefault('LLM_WARMUP_MODELS', 'none')
+
+from fakes import FakeLLM, FakeProvider, FakeTicker, LatencyProfile, synthetic_financial_data
+
+RESULTS_DIR = os.path.join(ROOT_DIR, 'benchmark_results')
+GROUPS = ["cache", "fallback", "indicators", "http", "scale"]
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(p / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def summarize(durations: List[float], errors: int, wall_seconds: float) -> Dict:
+    ordered = sorted(durations)
+    return {
+        "count": len(durations),
+        "errors": errors,
+        "throughput": round(len(durations) / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0
+    }
+
+def run_sync(func: Callable[[int], object], iterations: int, concurrency: int = 1) -> Dict:
+    """Call func(i) iterations times from `concurrency` threads; exceptions count as errors"""
+    durations, errors = [], 0
+
+    def timed(i):
+        started = time.perf_counter()
+        try:
+            func(i)
+            return time.perf_counter() - started, False
+        except Exception:
+            return time.perf_counter() - started, True
+
+    wall_start = time.perf_counter()
+    if concurrency <= 1:
+        outcomes = [timed(i) for i in range(iterations)]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(timed, range(iterations)))
+    wall = time.perf_counter() - wall_start
+
+    for duration, failed in outcomes:
+        durations.append(duration)
+        errors += failed
+    return summarize(durations, errors, wall)
+
+async def run_async(func, iterations: int, concurrency: int = 1) -> Dict:
+    """Await func(i) iterations times with at most `concurrency` in flight; False or exceptions are errors"""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    durations, errors = [], 0
+
+    async def timed(i):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                ok = await func(i)
+            except Exception:
+                ok = False
+            durations.append(time.perf_counter() - started)
+            errors += ok is False
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(timed(i) for i in range(iterations)))
+    return summarize(durations, errors, time.perf_counter() - wall_start)
+
+@contextmanager
+def fake_yfinance():
+    """Serve yfinance.Ticker from FakeTicker while the block runs"""
+    import yfinance
+    original = yfinance.Ticker
+    yfinance.Ticker = FakeTicker
+    try:
+        yield
+    finally:
+        yfinance.Ticker = original
+
+def provider_chain(*providers):
+    from financial_data_providers import MultiProviderFinancialData
+    chain = MultiProviderFinancialData()
+    chain.providers = list(providers)
+    return chain
+
+def bench_cache(iterations: int, concurrency: int) -> Dict[str, Dict]:
+    from financial_agents import FinancialAnalysisAgent
+
+    agent = FinancialAnalysisAgent(FakeLLM())
+    agent.data_provider = provider_chain(FakeProvider("Primary", LatencyProfile(latency_ms=20, jitter_ms=5)))
+    agent.get_financial_data("AAPL")
+    return {
+        "cache.hit": run_sync(lambda i: agent.get_financial_data("AAPL"), iterations * 10, concurrency),
+        "cache.miss": run_sync(lambda i: agent.get_financial_data(f"MISS{i}"), iterations, concurrency),
+        # Concurrent misses on one symbol share a single provider fetch
+        "cache.miss_same_symbol": run_sync(
+            lambda i: agent.get_financial_data(f"SAME{i // max(1, concurrency)}"), iterations, concurrency),
+    }
+
+def bench_fallback(iterations: int, concurrency: int) -> Dict[str, Dict]:
+    # Every failed attempt is followed by the chain's 0.5 s back-off, so keep these runs short
+    runs = max(3, iterations // 10)
+    ok = lambda: FakeProvider("Healthy", LatencyProfile(latency_ms=30, jitter_ms=10))
+    chains = {
+        "fallback.primary_ok": provider_chain(ok()),
+        "fallback.one_error": provider_chain(
+            FakeProvider("Erroring", LatencyProfile(latency_ms=15, failure_rate=1.0)), ok()),
+        "fallback.exception_then_error": provider_chain(
+            FakeProvider("Timing out", LatencyProfile(latency_ms=100, failure_rate=1.0, failure="exception")),
+            FakeProvider("Erroring", LatencyProfile(latency_ms=15, failure_rate=1.0)), ok()),
+        "fallback.flaky_primary": provider_chain(
+            FakeProvider("Flaky", LatencyProfile(latency_ms=30, jitter_ms=10, failure_rate=0.3)), ok()),
+    }
+    return {name: run_sync(lambda i, chain=chain: chain.get_financial_data(f"SYM{i}"), runs)
+            for name, chain in chains.items()}
+
+def bench_indicators(iterations: int, concurrency: int) -> Dict[str, Dict]:
+    from financial_agents import FinancialAnalysisAgent
+    from financial_data_providers import YahooFinanceProvider
+    from financial_snapshot import compact_financial_data, derive_metrics, parse_financial_data
+    from market_history import HistoryStore
+    from simple_fallback_provider import SyntheticMarketProvider
+
+    texts = [synthetic_financial_data(f"IND{i}") for i in range(50)]
+    agent = FinancialAnalysisAgent(FakeLLM())
+    agent.history_store = HistoryStore(fetcher=SyntheticMarketProvider().history)
+    yahoo = YahooFinanceProvider()
+    results = {
+        "indicators.parse_and_derive": run_sync(
+            lambda i: derive_metrics(parse_financial_data(texts[i % len(texts)])), iterations * 10),
+        "indicators.compact_encoding": run_sync(lambda i: compact_financial_data(texts[i % len(texts)]), iterations * 10),
+        "indicators.calculate_metrics_tool": run_sync(lambda i: agent.calculate_metrics(texts[i % len(texts)]), iterations * 10),
+    }
+    with fake_yfinance():
+        yahoo.get_financial_data("WARM")
+        results["indicators.yahoo_sma_rsi"] = run_sync(lambda i: yahoo.get_financial_data(f"YF{i % 20}"), iterations)
+    return results
+
+def fake_app(data_provider):
+    """The web app with its LLM client and data providers replaced by fakes"""
+    import app as A
+    from simple_fallback_provider import SyntheticMarketProvider
+
+    FakeLLM(tokens_per_second=4000, output_tokens=64).install(A.llm_client)
+    A.financial_agent.data_provider = data_provider
+    A.financial_agent.data_cache.clear()
+    A.history_store.fetcher = SyntheticMarketProvider().history
+    return A
+
+async def succeeded(response_coro) -> bool:
+    """Await a request and read its body; True for a 200"""
+    response = await response_coro
+    await response.aread()
+    return response.status_code == 200
+
+def bench_http(iterations: int, concurrency: int) -> Dict[str, Dict]:
+    import httpx
+    from market_history import PYARROW_AVAILABLE
+
+    A = fake_app(provider_chain(FakeProvider("Primary", LatencyProfile(latency_ms=20, jitter_ms=5))))
+    history = [{"role": "assistant", "content": "Initial analysis of AAPL. " * 20}]
+
+    async def request(client, method: str, url: str, **kwargs) -> bool:
+        response = await client.request(method, url, **kwargs)
+        await response.aread()
+        return response.status_code == 200
+
+    endpoints = {
+        "http.GET /quote/{symbol}": lambda c, i: request(c, "GET", "/quote/AAPL"),
+        "http.GET /quotes": lambda c, i: request(c, "GET", "/quotes?symbols=AAPL,MSFT,NVDA"),
+        "http.GET /history/{symbol}": lambda c, i: request(c, "GET", "/history/AAPL"),
+        "http.POST /analyze": lambda c, i: request(c, "POST", "/analyze", data={"company_name": "AAPL"}),
+        "http.POST /analyze/stream": lambda c, i: request(c, "POST", "/analyze/stream", data={"company_name": "AAPL"}),
+        "http.POST /conversation": lambda c, i: request(c, "POST", "/conversation", json={
+            "company_name": "AAPL", "message": f"What about margins? ({i})", "history": history}),
+        "http.POST /feedback": lambda c, i: request(c, "POST", "/feedback", json={
+            "company_name": "AAPL", "feedback": f"Focus on valuation ({i})", "history": history}),
+        "http.POST /critique": lambda c, i: request(c, "POST", "/critique", json={
+            "company_name": "AAPL", "history": history}),
+        "http.GET /cache-status": lambda c, i: request(c, "GET", "/cache-status"),
+        "http.GET /scheduler-status": lambda c, i: request(c, "GET", "/scheduler-status"),
+        "http.GET /status": lambda c, i: request(c, "GET", "/status"),
+    }
+    if PYARROW_AVAILABLE:
+        endpoints["http.GET /history/{symbol} (arrow)"] = lambda c, i: request(c, "GET", "/history/AAPL?format=arrow")
+
+    async def run_all():
+        transport = httpx.ASGITransport(app=A.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            # Warm the data cache, history cache and lazily built objects
+            for call in endpoints.values():
+                await call(client, -1)
+            return {name: await run_async(lambda i, call=call: call(client, i), iterations, concurrency)
+                    for name, call in endpoints.items()}
+
+    with fake_yfinance():
+        return asyncio.run(run_all())
+
+def bench_scale(iterations: int, concurrency: int, universe: int = 10000) -> Dict[str, Dict]:
+    """The data cache, indicators, history cache and batch endpoints over a synthetic market"""
+    import httpx
+    from financial_agents import FinancialAnalysisAgent
+    from financial_snapshot import derive_metrics, parse_financial_data
+    from market_history import HistoryStore
+    from portfolio import BATCH_MAX_SYMBOLS
+    from simple_fallback_provider import synthetic_multi_provider, synthetic_symbols
+
+    symbols = synthetic_symbols(universe)
+    market = synthetic_multi_provider()
+    agent = FinancialAnalysisAgent(FakeLLM())
+    agent.data_provider = market
+    history_store = HistoryStore(fetcher=market.providers[0].history)
+    agent.history_store = history_store
+    rng = random.Random(0)
+    sample = [rng.choice(symbols) for _ in range(iterations * 10)]
+    baskets = [",".join(rng.sample(symbols, BATCH_MAX_SYMBOLS)) for _ in range(iterations)]
+
+    results = {
+        f"scale.cache_fill ({universe} symbols)": run_sync(lambda i: agent.get_financial_data(symbols[i]), universe, concurrency),
+        "scale.cache_hit": run_sync(lambda i: agent.get_financial_data(sample[i]), len(sample), concurrency),
+        "scale.cache_status": run_sync(lambda i: agent.get_cache_status(), max(3, iterations // 10)),
+        "scale.parse_and_derive": run_sync(
+            lambda i: derive_metrics(parse_financial_data(agent.get_financial_data(sample[i]))), len(sample)),
+        "scale.history_store": run_sync(lambda i: history_store.get(sample[i]), iterations, concurrency),
+        "scale.calculate_metrics": run_sync(lambda i: agent.calculate_metrics(sample[i]), iterations, concurrency),
+    }
+
+    A = fake_app(market)
+    A.financial_agent.data_cache.update(agent.data_cache)
+
+    async def run_batches():
+        transport = httpx.ASGITransport(app=A.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=60) as client:
+            return {
+                f"scale.GET /quotes ({BATCH_MAX_SYMBOLS} symbols)": await run_async(
+                    lambda i: succeeded(client.get(f"/quotes?symbols={baskets[i]}")), iterations, concurrency),
+                f"scale.POST /analyze/batch ({BATCH_MAX_SYMBOLS} symbols)": await run_async(
+                    lambda i: succeeded(client.post("/analyze/batch", json={"symbols": baskets[i].split(",")})),
+                    max(3, iterations // 10), 1),
+            }
+
+    results.update(asyncio.run(run_batches()))
+    return results
+
+def bench_providers(iterations: int, concurrency: int, cassette: str, symbols: List[str],
+                    record: bool = False, speed: float = 1.0) -> Dict[str, Dict]:
+    """The real providers against a cassette; --record fills it from the network first"""
+    import http_cassette
+    from financial_data_providers import MultiProviderFinancialData
+
+    chain = MultiProviderFinancialData()
+    if record:
+        with http_cassette.recording(cassette) as recorded:
+            for symbol in symbols:
+                for provider in chain.providers:
+                    provider.get_financial_data(symbol)
+        print(f"📼 Recorded {len(recorded.interactions)} interactions to {cassette}")
+
+    def fetch(provider, i):
+        result = provider.get_financial_data(symbols[i % len(symbols)])
+        if result.startswith("Error"):
+            raise RuntimeError(result[:200])
+
+    # Replayed calls take their recorded time, and Alpha Vantage sleeps a second per call
+    runs = max(len(symbols), iterations // 10)
+    with http_cassette.replaying(cassette, speed) as server:
+        results = {f"providers.{provider.name}": run_sync(functools.partial(fetch, provider), runs)
+                   for provider in chain.providers}
+        results["providers.chain"] = run_sync(functools.partial(fetch, chain), runs)
+        if server.cassette.misses:
+            print(f"⚠️  {server.cassette.misses} requests were not in the cassette")
+    return results
+
+BENCHMARKS = {
+    "cache": bench_cache,
+    "fallback": bench_fallback,
+    "indicators": bench_indicators,
+    "http": bench_http,
+    "scale": bench_scale,
+    "providers": bench_providers,
+}
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                              capture_output=True, text=True, timeout=10).stdout.strip()
+    except Exception:
+        return ""
+
+def print_results(results: Dict[str, Dict]):
+    print(f"\n{'benchmark':<44}{'ops/s':>10}{'p50 ms':>11}{'p99 ms':>11}{'errors':>8}")
+    print("-" * 84)
+    for name, stats in results.items():
+        print(f"{name:<44}{stats['throughput']:>10.1f}{stats['p50_ms']:>11.3f}{stats['p99_ms']:>11.3f}{stats['errors']:>8}")
+
+def compare(results: Dict[str, Dict], baseline_path: str):
+    """Print the change against a saved run; latency increases and throughput drops are regressions"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+
+    def delta(new, old):
+        return f"{(new / old - 1) * 100:+.1f}%" if old else "n/a"
+
+    print(f"\n📈 Compared with {baseline_path}:")
+    print(f"{'benchmark':<44}{'ops/s':>10}{'p50':>10}{'p99':>10}")
+    print("-" * 74)
+    for name, stats in results.items():
+        old = baseline.get(name)
+        if old is None:
+            print(f"{name:<44}{'new':>10}")
+            continue
+        print(f"{name:<44}{delta(stats['throughput'], old['throughput']):>10}"
+              f"{delta(stats['p50_ms'], old['p50_ms']):>10}{delta(stats['p99_ms'], old['p99_ms']):>10}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks with fake providers and a fake LLM")
+    parser.add_argument("groups", nargs="*",
+                        help=f"benchmark groups: {', '.join(BENCHMARKS)} (default: all; providers needs --cassette)")
+    parser.add_argument("--iterations", type=int, default=200, help="calls per benchmark (cache hits and parsing run 10x)")
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent callers for cache and HTTP benchmarks")
+    parser.add_argument("--quick", action="store_true", help="20 iterations, for a smoke run")
+    parser.add_argument("--output", help=f"results file (default: {os.path.relpath(RESULTS_DIR)}/<timestamp>.json)")
+    parser.add_argument("--no-save", action="store_true", help="don't write a results file")
+    parser.add_argument("--compare", metavar="RESULTS_JSON", help="show changes against a previous results file")
+    parser.add_argument("--universe", type=int, help="synthetic symbols for the scale group (default: 10000, 1000 with --quick)")
+    parser.add_argument("--cassette", help="recorded provider HTTP traffic to replay (enables the providers group)")
+    parser.add_argument("--record", action="store_true", help="record the cassette from the live providers first")
+    parser.add_argument("--symbols", default="AAPL", help="comma-separated symbols for the providers group")
+    parser.add_argument("--replay-speed", type=float, default=1.0, help="multiplier on recorded latencies (0 = none)")
+    args = parser.parse_args()
+    unknown = [group for group in args.groups if group not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark group(s): {', '.join(unknown)}")
+
+    iterations = 20 if args.quick else args.iterations
+    universe = args.universe or (1000 if args.quick else 10000)
+    groups = args.groups or GROUPS + (["providers"] if args.cassette else [])
+    if "providers" in groups and not args.cassette:
+        parser.error("the providers group needs --cassette")
+    print("🚀 Offline Benchmark Suite")
+    print("=" * 50)
+    print(f"Groups: {', '.join(groups)}; iterations: {iterations}; concurrency: {args.concurrency}")
+
+    results = {}
+    for group in groups:
+        print(f"⏱️  Running {group}...")
+        benchmark = BENCHMARKS[group]
+        if group == "scale":
+            benchmark = functools.partial(benchmark, universe=universe)
+        if group == "providers":
+            benchmark = functools.partial(benchmark, cassette=args.cassette, record=args.record, speed=args.replay_speed,
+                                          symbols=[s.strip().upper() for s in args.symbols.split(",") if s.strip()])
+        results.update(benchmark(iterations, args.concurrency))
+    print_results(results)
+
+    if args.compare:
+        compare(results, args.compare)
+
+    if not args.no_save:
+        path = args.output or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "config": {"groups": groups, "iterations": iterations, "concurrency": args.concurrency,
+                           "cassette": args.cassette, "universe": universe},
+                "results": results
+            }, f, indent=2)
+        print(f"\n💾 Results saved to {os.path.relpath(path)}")
+
+    errors = sum(stats["errors"] for name, stats in results.items() if not name.startswith("fallback."))
+    return errors == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
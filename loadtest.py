@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+HTTP load test for the web app
+Drives /analyze, /conversation, /critique and /cache-status with open-loop (Poisson)
+arrivals at a series of rates, and reports throughput, latency percentiles, error
+rates and event-loop lag at each rate, to find the saturation point of one worker.
+By default it starts one app worker (uvicorn, one process) against local stand-ins:
+a fake Ollama server with a token-rate model (tests/fakes.py) and the synthetic
+market provider (tests/simple_fallback_provider.py). --target drives an app that is
+already running, with whatever LLM and providers it is configured for.
+
+Usage:
+    python loadtest.py                                        # Ramp 2, 4, 8, 16, 32 req/s for 15 s each
+    python loadtest.py --rates 5,10,20 --duration 30          # Custom ramp
+    python loadtest.py --mix analyze=1,conversation=3,critique=1,cache-status=2
+    python loadtest.py --symbols 5000 --zipf 1.2              # Symbol popularity skew over a synthetic universe
+    python loadtest.py --turns 8                              # Mean conversation length, in turns
+    python loadtest.py --tokens-per-second 50 --ollama-parallel 1   # Stand-in GPU capacity
+    python loadtest.py --target http://localhost:8000         # An app that is already running
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'src'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'tests'))
+
+RESULTS_DIR = os.path.join(ROOT_DIR, 'benchmark_results')
+ENDPOINTS = ["analyze", "conversation", "critique", "cache-status"]
+# Admission control turning requests away rather than failing them
+REJECTED = {429, 503}
+
+QUESTIONS = [
+    "How does the valuation compare with the sector?",
+    "What are the main risks over the next year?",
+    "Is the dividend sustainable?",
+    "What does the RSI say about momentum?",
+    "How exposed is it to interest rates?",
+]
+
+class Workload:
+    """Requests to send: endpoint mix, Zipf-skewed symbol popularity and conversation lengths"""
+
+    def __init__(self, mix: Dict[str, float], symbols: List[str], zipf: float, turns: float, seed: int = 0):
+        self.rng = random.Random(seed)
+        self.endpoints = list(mix)
+        self.mix_weights = [mix[name] for name in self.endpoints]
+        self.symbols = symbols
+        # The k-th most popular symbol is requested in proportion to 1 / k^zipf
+        weights = [1 / (rank ** zipf) for rank in range(1, len(symbols) + 1)]
+        total, running = sum(weights), 0.0
+        self.cum_weights = []
+        for weight in weights:
+            running += weight / total
+            self.cum_weights.append(running)
+        self.turns = turns
+
+    def symbol(self) -> str:
+        return self.rng.choices(self.symbols, cum_weights=self.cum_weights)[0]
+
+    def history(self, symbol: str) -> List[Dict]:
+        """A conversation of about `turns` question/answer pairs after the initial analysis"""
+        turns = max(0, round(self.rng.expovariate(1 / self.turns))) if self.turns > 0 else 0
+        history = [{"role": "assistant", "content": f"Analysis of {symbol}: " + "The company shows steady fundamentals. " * 30}]
+        for _ in range(turns):
+            history.append({"role": "user", "content": self.rng.choice(QUESTIONS)})
+            history.append({"role": "assistant", "content": f"On {symbol}: " + "Margins and growth point the same way. " * 20})
+        return history
+
+    def next_request(self, endpoint: Optional[str] = None):
+        """(endpoint, method, path, aiohttp request options); the endpoint is drawn from the mix unless given"""
+        endpoint = endpoint or self.rng.choices(self.endpoints, weights=self.mix_weights)[0]
+        if endpoint == "cache-status":
+            return endpoint, "GET", "/cache-status", {}
+        symbol = self.symbol()
+        if endpoint == "analyze":
+            return endpoint, "POST", "/analyze", {"data": {"company_name": symbol}}
+        body = {"company_name": symbol, "history": self.history(symbol)}
+        if endpoint == "conversation":
+            body["message"] = self.rng.choice(QUESTIONS)
+        return endpoint, "POST", f"/{endpoint}", {"json": body}
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(p / 100 * len(sorted_values)))]
+
+def summarize(samples: List, duration: float) -> Dict:
+    """
+    samples: (latency seconds, status code or "timeout"/"error") of the requests sent in
+    the arrival window. Rates are per second of that window, so waiting for late responses
+    after it doesn't make a worker that keeps up look slower than its arrivals.
+    """
+    ok = sorted(latency for latency, status in samples if status == 200)
+    rejected = sum(1 for _, status in samples if status in REJECTED)
+    failed = len(samples) - len(ok) - rejected
+    return {
+        "requests": len(samples),
+        "offered": round(len(samples) / duration, 2) if duration > 0 else 0.0,
+        "ok": len(ok),
+        "rejected": rejected,
+        "errors": failed,
+        "error_rate": round((failed + rejected) / len(samples), 4) if samples else 0.0,
+        "throughput": round(len(ok) / duration, 2) if duration > 0 else 0.0,
+        "p50_ms": round(percentile(ok, 50) * 1000, 1),
+        "p95_ms": round(percentile(ok, 95) * 1000, 1),
+        "p99_ms": round(percentile(ok, 99) * 1000, 1),
+        "max_ms": round(ok[-1] * 1000, 1) if ok else 0.0,
+    }
+
+async def app_status(session, base_url: str) -> Dict:
+    """The app's /status merged with its /scheduler-status; empty if it can't be read"""
+    status = {}
+    for path in ("/status", "/scheduler-status"):
+        try:
+            async with session.get(base_url + path) as response:
+                status.update(await response.json())
+        except Exception:
+            pass
+    return status
+
+async def run_step(session, base_url: str, workload: Workload, rate: float, duration: float, timeout: float) -> Dict:
+    """Open-loop arrivals at `rate` for `duration` seconds, then wait (up to `timeout`) for stragglers"""
+    import aiohttp
+    from concurrency import LoopLagMonitor
+
+    loop = asyncio.get_running_loop()
+    samples = defaultdict(list)
+    # Lag in the generator itself; if it grows, the generator rather than the app is the bottleneck
+    generator_lag = LoopLagMonitor(interval_ms=50, window=duration)
+    generator_lag.start()
+
+    async def send(endpoint, method, path, options):
+        started = loop.time()
+        try:
+            async with session.request(method, base_url + path, **options) as response:
+                await response.read()
+                status = response.status
+        except asyncio.TimeoutError:
+            status = "timeout"
+        except aiohttp.ClientError:
+            status = "error"
+        samples[endpoint].append((loop.time() - started, status))
+
+    tasks = {}
+    started = next_at = loop.time()
+    while True:
+        next_at += workload.rng.expovariate(rate)
+        if next_at - started >= duration:
+            break
+        await asyncio.sleep(max(0.0, next_at - loop.time()))
+        request = workload.next_request()
+        tasks[loop.create_task(send(*request))] = request[0]
+    await asyncio.sleep(max(0.0, started + duration - loop.time()))
+    # Both lag windows are `duration` long, so read them as the arrival window closes
+    status = await app_status(session, base_url)
+    generator_lag_p99 = generator_lag.get_status()["lag_p99_ms"]
+    await generator_lag.stop()
+
+    pending = set()
+    if tasks:
+        # The client timeout normally ends stragglers first; this is a backstop
+        _, pending = await asyncio.wait(tasks, timeout=timeout + 5)
+    for task in pending:
+        task.cancel()
+        samples[tasks[task]].append((loop.time() - started, "timeout"))
+
+    every = [sample for endpoint_samples in samples.values() for sample in endpoint_samples]
+    return {
+        "rate": rate,
+        **summarize(every, duration),
+        "endpoints": {endpoint: summarize(endpoint_samples, duration) for endpoint, endpoint_samples in sorted(samples.items())},
+        "generator_lag_p99_ms": generator_lag_p99,
+        "event_loop": status.get("event_loop"),
+        "scheduler": status.get("scheduler"),
+    }
+
+def saturated(step: Dict, max_error_rate: float, slo_ms: float) -> bool:
+    """
+    The worker didn't keep up: under 90% of the requests that arrived completed, too many
+    errors, or p99 over the SLO
+    Completions are compared to the arrivals actually sent rather than to `rate`, since
+    Poisson arrivals over a short step stray well off the nominal rate.
+    """
+    return (step["ok"] < 0.9 * step["requests"] or step["error_rate"] > max_error_rate
+            or step["p99_ms"] > slo_ms)
+
+def print_step(step: Dict):
+    lag = step.get("event_loop") or {}
+    print(f"{step['rate']:>7.1f}{step['throughput']:>10.2f}{step['error_rate'] * 100:>8.1f}%"
+          f"{step['p50_ms']:>9.0f}{step['p95_ms']:>9.0f}{step['p99_ms']:>9.0f}"
+          f"{lag.get('lag_p99_ms', 0):>10.1f}{lag.get('lag_max_ms', 0):>10.1f}{step['generator_lag_p99_ms']:>9.1f}"
+          f"  {'⚠️  saturated' if step['saturated'] else ''}")
+    for endpoint, stats in step["endpoints"].items():
+        print(f"         {endpoint:<14}{stats['requests']:>6} req {stats['throughput']:>7.2f}/s"
+              f"  p50 {stats['p50_ms']:>7.0f}  p99 {stats['p99_ms']:>7.0f} ms"
+              f"  rejected {stats['rejected']}  errors {stats['errors']}")
+
+async def drive(base_url: str, workload: Workload, args) -> List[Dict]:
+    import aiohttp
+
+    connector = aiohttp.TCPConnector(limit=0)
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        # First requests pay for lazily built clients and imports; keep that out of the first rate
+        for endpoint in workload.endpoints:
+            _, method, path, options = workload.next_request(endpoint)
+            async with session.request(method, base_url + path, **options) as response:
+                await response.read()
+
+        print(f"\n{'rate':>7}{'req/s':>10}{'errors':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+              f"{'lag p99':>10}{'lag max':>10}{'gen lag':>9}")
+        print("-" * 84)
+        steps = []
+        for rate in args.rates:
+            step = await run_step(session, base_url, workload, rate, args.duration, args.timeout)
+            step["saturated"] = saturated(step, args.max_error_rate, args.slo_ms)
+            steps.append(step)
+            print_step(step)
+            if step["saturated"] and not args.full_ramp:
+                break
+        return steps
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_ready(url: str, process: subprocess.Popen, timeout: float = 60):
+    import requests
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"App worker exited with code {process.returncode}")
+        try:
+            if requests.get(url + "/ready", timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"App worker at {url} wasn't ready after {timeout:.0f}s")
+
+@contextmanager
+def local_app(args):
+    """One app worker against a fake Ollama and the synthetic market, each in its own process"""
+    ollama_port, app_port = free_port(), free_port()
+    env = {
+        **os.environ,
+        "OLLAMA_BASE_URL": f"http://127.0.0.1:{ollama_port}",
+        "LLM_WARMUP_MODELS": "none",
+        "SESSION_STORE": "memory",
+        "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+        "TRACE_EXPORT_PATH": "",
+        "PROFILE_SAMPLE_RATE": "0",
+        "HTTP_CASSETTE_MODE": "off",
+        # Read as each arrival window closes, so the app's event-loop lag covers exactly that window
+        "LOOP_LAG_WINDOW": str(args.duration),
+    }
+    script = os.path.abspath(__file__)
+    ollama = subprocess.Popen([sys.executable, script, "--serve-ollama", str(ollama_port),
+                               "--tokens-per-second", str(args.tokens_per_second),
+                               "--output-tokens", str(args.output_tokens),
+                               "--ollama-parallel", str(args.ollama_parallel)], env=env)
+    app = subprocess.Popen([sys.executable, script, "--serve-app", str(app_port),
+                            "--provider-latency-ms", str(args.provider_latency_ms),
+                            "--seed", str(args.seed)], env=env)
+    url = f"http://127.0.0.1:{app_port}"
+    try:
+        wait_ready(url, app)
+        yield url
+    finally:
+        for process in (app, ollama):
+            process.terminate()
+        for process in (app, ollama):
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+def serve_ollama(args):
+    from fakes import FakeLLM, FakeOllamaServer
+
+    llm = FakeLLM(tokens_per_second=args.tokens_per_second, output_tokens=args.output_tokens,
+                  prefill_tokens_per_second=args.tokens_per_second * 20, first_token_ms=20)
+    FakeOllamaServer(llm, parallel=args.ollama_parallel, port=args.serve_ollama).serve_forever()
+
+def serve_app(args):
+    import uvicorn
+    import app as A
+    from simple_fallback_provider import synthetic_multi_provider
+
+    A.financial_agent.data_provider = synthetic_multi_provider(args.seed, latency_ms=args.provider_latency_ms)
+    A.history_store.fetcher = A.financial_agent.data_provider.providers[0].history
+    uvicorn.run(A.app, host="127.0.0.1", port=args.serve_app, log_level="warning")
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown endpoint '{name}'. Expected: {', '.join(ENDPOINTS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP load test for the web app")
+    parser.add_argument("--target", help="base URL of a running app (default: start one against local stand-ins)")
+    parser.add_argument("--rates", type=lambda v: [float(r) for r in v.split(",")], default=[2, 4, 8, 16, 32],
+                        help="arrival rates to ramp through, requests/second (default: 2,4,8,16,32)")
+    parser.add_argument("--duration", type=float, default=15, help="seconds per rate")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("analyze=1,conversation=3,critique=1,cache-status=2"),
+                        help="endpoint weights (default: analyze=1,conversation=3,critique=1,cache-status=2)")
+    parser.add_argument("--symbols", type=int, default=1000, help="synthetic symbols requested")
+    parser.add_argument("--zipf", type=float, default=1.1, help="popularity skew: 0 is uniform, higher favours top symbols")
+    parser.add_argument("--turns", type=float, default=4, help="mean conversation length in turns")
+    parser.add_argument("--timeout", type=float, default=60, help="per-request timeout, seconds")
+    parser.add_argument("--slo-ms", type=float, default=30000, help="p99 latency above which a rate counts as saturated")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="error or rejection rate counted as saturated")
+    parser.add_argument("--full-ramp", action="store_true", help="keep ramping after the first saturated rate")
+    parser.add_argument("--tokens-per-second", type=float, default=200, help="stand-in Ollama output rate")
+    parser.add_argument("--output-tokens", type=int, default=128, help="stand-in Ollama tokens per generation")
+    parser.add_argument("--ollama-parallel", type=int, default=4, help="stand-in Ollama concurrent generations")
+    parser.add_argument("--provider-latency-ms", type=float, default=50, help="stand-in provider latency")
+    parser.add_argument("--seed", type=int, default=0, help="seed for arrivals, symbols and market data")
+    parser.add_argument("--output", help=f"results file (default: {os.path.relpath(RESULTS_DIR)}/loadtest-<timestamp>.json)")
+    parser.add_argument("--no-save", action="store_true", help="don't write a results file")
+    parser.add_argument("--serve-ollama", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--serve-app", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_ollama:
+        serve_ollama(args)
+        return True
+    if args.serve_app:
+        serve_app(args)
+        return True
+
+    from simple_fallback_provider import synthetic_symbols
+
+    workload = Workload(args.mix, synthetic_symbols(args.symbols), args.zipf, args.turns, args.seed)
+    print("🚀 HTTP Load Test")
+    print("=" * 50)
+    print(f"Mix: {', '.join(f'{k}={v:g}' for k, v in args.mix.items())}; {args.symbols} symbols, zipf {args.zipf}; "
+          f"{args.turns:g} turns; {args.duration:g}s per rate")
+    if args.target:
+        steps = asyncio.run(drive(args.target.rstrip("/"), workload, args))
+    else:
+        print(f"Stand-ins: Ollama {args.tokens_per_second:g} tok/s x{args.ollama_parallel}, "
+              f"{args.output_tokens} tokens; providers {args.provider_latency_ms:g} ms")
+        with local_app(args) as url:
+            steps = asyncio.run(drive(url, workload, args))
+
+    sustained = [step for step in steps if not step["saturated"]]
+    limit = next((step for step in steps if step["saturated"]), None)
+    print()
+    if sustained:
+        best = sustained[-1]
+        print(f"✅ Sustained {best['rate']:g} req/s: {best['throughput']:.2f} req/s, p99 {best['p99_ms']:.0f} ms, "
+              f"{best['error_rate']:.1%} errors")
+    if limit:
+        print(f"⚠️  Saturated at {limit['rate']:g} req/s: {limit['throughput']:.2f} req/s, p99 {limit['p99_ms']:.0f} ms, "
+              f"{limit['error_rate']:.1%} errors or rejected")
+    else:
+        print("✅ No saturation within the ramp; try higher --rates")
+
+    if not args.no_save:
+        path = args.output or os.path.join(RESULTS_DIR, "loadtest-" + time.strftime("%Y%m%d-%H%M%S") + ".json")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        config = {key: value for key, value in vars(args).items() if key not in ("serve_ollama", "serve_app", "output", "no_save")}
+        with open(path, "w") as f:
+            json.dump({
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "config": config,
+                "steps": steps
+            }, f, indent=2)
+        print(f"\n💾 Results saved to {os.path.relpath(path)}")
+    return True
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
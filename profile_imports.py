@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Import-time profile for the application modules
+Imports each module in a fresh interpreter with `python -X importtime` and reports
+its total import time, the slowest modules it pulled in, and any heavy libraries
+(LangChain, pandas, yfinance, Alpha Vantage, pyarrow) that were loaded eagerly.
+
+Usage:
+    python profile_imports.py                      # Profile app, financial_agents and agent
+    python profile_imports.py app --top 20         # Show the 20 slowest imports
+    python profile_imports.py --budget-ms 1500     # Exit with 1 if any module is slower
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src')
+
+DEFAULT_MODULES = ["app", "financial_agents", "agent"]
+
+# Libraries that should only be imported on first use
+HEAVY_PACKAGES = ["langchain", "langchain_community", "langchain_core", "pandas", "yfinance", "alpha_vantage", "pyarrow"]
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+def profile_module(module: str):
+    """Return (total_us, [(self_us, cumulative_us, depth, name), ...]) for importing module"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((int(self_us), int(cumulative_us), len(indent) // 2, name))
+
+    total = next((cumulative for _, cumulative, depth, name in entries if name == module and depth == 0), 0)
+    return total, entries
+
+def report(module: str, top: int) -> float:
+    """Print the profile for one module and return its import time in milliseconds"""
+    total_us, entries = profile_module(module)
+    total_ms = total_us / 1000
+
+    print(f"\n📦 {module}: {total_ms:.0f} ms")
+    print("-" * 50)
+    for self_us, cumulative_us, _, name in sorted(entries, key=lambda e: e[0], reverse=True)[:top]:
+        print(f"  {self_us / 1000:8.1f} ms self  {cumulative_us / 1000:8.1f} ms total  {name}")
+
+    loaded = sorted({name.split(".")[0] for *_, name in entries} & set(HEAVY_PACKAGES))
+    if loaded:
+        print(f"⚠️  Heavy packages loaded at import: {', '.join(loaded)}")
+    else:
+        print("✅ No heavy packages loaded at import")
+    return total_ms
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile import time of the application modules")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="modules under src/ to profile")
+    parser.add_argument("--top", type=int, default=10, help="number of slowest imports to show")
+    parser.add_argument("--budget-ms", type=float, default=None, help="fail if a module takes longer to import")
+    args = parser.parse_args()
+
+    print("⏱️  Import-time profile")
+    print("=" * 50)
+
+    over_budget = []
+    for module in args.modules:
+        try:
+            total_ms = report(module, args.top)
+        except RuntimeError as e:
+            print(f"\n❌ {module}: {e}")
+            over_budget.append(module)
+            continue
+        if args.budget_ms is not None and total_ms > args.budget_ms:
+            over_budget.append(module)
+
+    if over_budget:
+        print(f"\n❌ Over budget or failed: {', '.join(over_budget)}")
+        return False
+    return True
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
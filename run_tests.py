@@ -6,6 +6,31 @@ Usage:
     python run_tests.py                 # Run all tests
     python run_tests.py providers       # Run provider tests
     python run_tests.py debug           # Run debug tests
+    python run_tests.py refinement      # Run refinement tests (offline)
+    python run_tests.py context         # Run context packer tests (offline)
+    python run_tests.py scheduler       # Run LLM scheduler tests (offline)
+    python run_tests.py fastpath        # Run fast-path analysis tests (offline)
+    python run_tests.py snapshot        # Run snapshot parsing/encoding tests (offline)
+    python run_tests.py metrics         # Run metrics engine tests (offline)
+    python run_tests.py router          # Run model routing tests (offline)
+    python run_tests.py factory         # Run shared client/warm-up tests (offline)
+    python run_tests.py startup         # Run import-time checks (offline)
+    python run_tests.py jobs            # Run background job tests (offline)
+    python run_tests.py critique        # Run critique pipeline tests (offline)
+    python run_tests.py sse             # Run Server-Sent Events streaming tests (offline)
+    python run_tests.py portfolio       # Run portfolio batch tests (offline)
+    python run_tests.py sessions        # Run session store tests (offline)
+    python run_tests.py kvcontext       # Run LLM context reuse tests (offline)
+    python run_tests.py history         # Run price history tests (offline)
+    python run_tests.py quotes          # Run live quote stream tests (offline)
+    python run_tests.py tracing         # Run request tracing tests (offline)
+    python run_tests.py logging         # Run structured logging tests (offline)
+    python run_tests.py profiling       # Run request profiling tests (offline)
+    python run_tests.py benchmarks      # Run benchmark fake and harness tests (offline)
+    python run_tests.py cassette        # Run provider HTTP record/replay tests (offline)
+    python run_tests.py concurrency     # Run thread pool, fetch lock and async Ollama client tests (offline)
+    python run_tests.py synthetic       # Run synthetic market provider tests (offline)
+    python run_tests.py loadtest        # Run load-test harness tests (offline)
 """
 
 import sys
@@ -44,7 +69,32 @@ def main():
     """Main test runner"""
     available_tests = {
         'providers': 'test_providers',
-        'debug': 'debug_yfinance'
+        'debug': 'debug_yfinance',
+        'refinement': 'test_refinement',
+        'context': 'test_context_packer',
+        'scheduler': 'test_scheduler',
+        'fastpath': 'test_fast_path',
+        'snapshot': 'test_snapshot',
+        'metrics': 'test_metrics_engine',
+        'router': 'test_model_router',
+        'factory': 'test_llm_factory',
+        'startup': 'test_startup',
+        'jobs': 'test_jobs',
+        'critique': 'test_critique',
+        'sse': 'test_sse',
+        'portfolio': 'test_portfolio',
+        'sessions': 'test_session_store',
+        'kvcontext': 'test_llm_sessions',
+        'history': 'test_market_history',
+        'quotes': 'test_quote_stream',
+        'tracing': 'test_tracing',
+        'logging': 'test_structured_logging',
+        'profiling': 'test_profiling',
+        'benchmarks': 'test_benchmarks',
+        'cassette': 'test_http_cassette',
+        'concurrency': 'test_concurrency',
+        'synthetic': 'test_synthetic_market',
+        'loadtest': 'test_loadtest'
     }
     
     if len(sys.argv) == 1:
@@ -1,15 +1,8 @@
-from langchain.agents import create_react_agent
-from langchain.agents import AgentExecutor, Tool
-from langchain.prompts import StringPromptTemplate, PromptTemplate
-from langchain_community.llms import Ollama
-from langchain.schema import AgentAction, AgentFinish
-from langchain.agents.format_scratchpad import format_log_to_str
-from langchain.agents.output_parsers import ReActSingleInputOutputParser
-from langchain.tools.render import format_tool_to_openai_function
-from typing import List, Union
+from functools import lru_cache
 import os
 from dotenv import load_dotenv
-from pydantic import Field
+from model_router import Task
+from llm_factory import get_llm
 
 # Load environment variables
 load_dotenv()
@@ -26,30 +19,32 @@ def calculator_tool(expression: str) -> str:
     except:
         return "Invalid expression"
 
-# Create tools
-tools = [
-    Tool(
-        name="Search",
-        func=search_tool,
-        description="Useful for searching for information about a topic"
-    ),
-    Tool(
-        name="Calculator",
-        func=calculator_tool,
-        description="Useful for performing mathematical calculations"
-    )
-]
+# The LLM is loaded, and LangChain imported, on first use
+llm = get_llm(Task.ANALYSIS)
 
-# Create the LLM using Ollama with Llama 3.1 model
-llm = Ollama(
-    model="llama3.1:8b",
-    temperature=0.7,
-    base_url="http://localhost:11434"
-)
+@lru_cache(maxsize=None)
+def get_agent_executor():
+    """Build the agent on first use so the CLI starts without importing LangChain"""
+    from langchain.agents import AgentExecutor, Tool, create_react_agent
+    from langchain.prompts import PromptTemplate
+    
+    # Create tools
+    tools = [
+        Tool(
+            name="Search",
+            func=search_tool,
+            description="Useful for searching for information about a topic"
+        ),
+        Tool(
+            name="Calculator",
+            func=calculator_tool,
+            description="Useful for performing mathematical calculations"
+        )
+    ]
 
-# Create the prompt template
-prompt = PromptTemplate.from_template(
-    """Answer the following questions as best you can. You have access to the following tools:
+    # Create the prompt template
+    prompt = PromptTemplate.from_template(
+        """Answer the following questions as best you can. You have access to the following tools:
 
 {tools}
 
@@ -68,27 +63,28 @@ Begin!
 
 Question: {input}
 Thought: {agent_scratchpad}"""
-)
+    )
 
-# Create the agent
-agent = create_react_agent(llm, tools, prompt)
+    # Create the agent
+    agent = create_react_agent(llm, tools, prompt)
 
-# Create the agent executor
-agent_executor = AgentExecutor.from_agent_and_tools(
-    agent=agent,
-    tools=tools,
-    verbose=True
-)
+    # Create the agent executor
+    agent_executor = AgentExecutor.from_agent_and_tools(
+        agent=agent,
+        tools=tools,
+        verbose=True
+    )
+    return agent_executor
 
 def main():
     print("Local AI Agent is ready! Type 'exit' to quit.")
-    print("Note: Make sure Ollama is running with the Llama 3.1 model installed.")
+    print(f"Note: Make sure Ollama is running with the {llm.model} model installed.")
     while True:
         user_input = input("\nYour question: ")
         if user_input.lower() == 'exit':
             break
         try:
-            response = agent_executor.invoke({"input": user_input})
+            response = get_agent_executor().invoke({"input": user_input})
             print(f"\nFinal Answer: {response['output']}")
         except Exception as e:
             print(f"Error: {str(e)}")
@@ -1,18 +1,41 @@
-from fastapi import FastAPI, Request, Form
+from fastapi import FastAPI, Request, Form, Depends, WebSocket, WebSocketDisconnect
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
+from typing import List, Optional
 import os
+import json
+import asyncio
 from dotenv import load_dotenv
 from financial_agents import FinancialAnalysisAgent
-from langchain_community.llms import Ollama
+from concurrency import LoopLagMonitor, run_blocking
+from llm_scheduler import Priority, SchedulerOverloaded
+from context_packer import ContextPacker, PackedContext, count_tokens, extractive_summarizer, llm_summarizer
+from llm_sessions import SessionAwareOllamaClient
+from financial_snapshot import compact_financial_data, derive_metrics, parse_financial_data
+from model_router import ModelChoice, ModelRouter, Task
+from llm_factory import ModelWarmup, get_async_client, get_llm, warmup_models
+from jobs import JobManager, JobQueueFull
+from portfolio import analyze_portfolio, build_portfolio_summary_prompt, normalize_symbols
+from session_store import Session, SessionNotFound, create_session_store, new_message
+from market_history import FORMATS, HistoryStore, available_formats, iter_arrow, iter_msgpack
+from quote_stream import QUOTE_MAX_SYMBOLS, QuoteHub
+from tracing import TracingMiddleware, get_status as get_tracing_status
+from structured_logging import get_status as get_logging_status
+from profiling import ProfilingMiddleware, profiler
+from http_cassette import get_status as get_cassette_status
 
 # Load environment variables
 load_dotenv()
 
 app = FastAPI(title="Interactive Financial Analysis System")
 
+# Times cache, provider and LLM work per request; adds Server-Timing and X-Trace-Id headers
+app.add_middleware(TracingMiddleware)
+# Profiles requests on demand (PROFILE_TOKEN) or by sampling (PROFILE_SAMPLE_RATE)
+app.add_middleware(ProfilingMiddleware)
+
 # Get the directory paths relative to project root
 current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(current_dir)
@@ -26,43 +49,93 @@ app.mount("/static", StaticFiles(directory=static_dir), name="static")
 templates = Jinja2Templates(directory=templates_dir)
 
 # Initialize the LLM and agent
-llm = Ollama(
-    model="llama3.1:8b",
-    temperature=0.7,
-    base_url="http://localhost:11434"
+llm = get_llm(Task.ANALYSIS)
+
+# Async client used by the request handlers so generations don't block the event loop.
+# All generations from the web app share its bounded, prioritized pool of LLM slots
+llm_client = get_async_client()
+llm_scheduler = llm_client.scheduler
+
+# Loads the models at start-up so the first request doesn't pay for it; gates /ready
+model_warmup = ModelWarmup(llm_client, warmup_models())
+
+# Picks the model for each task and downgrades to smaller models under load
+model_router = ModelRouter(llm_client)
+
+# Packs conversation history into the model's token budget; older turns are summarized
+context_packer = ContextPacker(
+    model_router.route_for(Task.CONVERSATION).model,
+    summarizer=(llm_summarizer(get_llm(Task.SUMMARIZATION))
+                if os.getenv('CONTEXT_SUMMARIZER', 'extractive') == 'llm' else extractive_summarizer)
 )
 
+# Continues conversations from Ollama's returned context so each turn only prefills the new message
+conversation_sessions = SessionAwareOllamaClient(llm_client, max_context_tokens=context_packer.budget)
+
+# Conversation histories kept on the server so clients only send the new message
+session_store = create_session_store()
+
+# OHLCV bars behind /history and the agent's metrics; quotes are served from the agent's data cache
+history_store = HistoryStore()
+
+async def fetch_live_quote(symbol: str) -> dict:
+    """Current quote fields for the live feed; refreshes the shared data cache"""
+    # Polls may reach the hub's upstream rate, so providers with a smaller quota (FMP, Alpha Vantage) sit out
+    financial_data = await run_blocking(financial_agent.get_financial_data, symbol, quote_hub.poll_interval,
+                                        quote_hub.upstream_per_minute)
+    if financial_data.startswith("Error"):
+        raise RuntimeError(financial_data)
+    return parse_financial_data(financial_data)
+
+# One upstream poller per watched symbol, fanned out to every WebSocket client
+quote_hub = QuoteHub(fetch_live_quote)
+
+# How late the event loop runs timers; blocking work on the loop shows up here first
+loop_lag = LoopLagMonitor()
+
+# Seconds a client may take to accept one update before it is dropped
+QUOTE_SEND_TIMEOUT = float(os.getenv('QUOTE_SEND_TIMEOUT', '10'))
+
 # Initialize the financial analysis agent
 financial_agent = FinancialAnalysisAgent(llm)
+financial_agent.history_store = history_store
+
+# How market data is written into analysis prompts: "compact" key=value encoding or the provider "text"
+PROMPT_DATA_FORMAT = os.getenv('PROMPT_DATA_FORMAT', 'compact')
 
 # Pydantic models for request validation
+# With a session_id the history (and company) come from the server-side session
 class ConversationRequest(BaseModel):
-    company_name: str
+    company_name: str = ""
     message: str
-    history: list
+    history: list = []
+    session_id: Optional[str] = None
 
 class FeedbackRequest(BaseModel):
-    company_name: str
+    company_name: str = ""
     feedback: str
-    history: list
+    history: list = []
+    session_id: Optional[str] = None
 
 class CritiqueRequest(BaseModel):
+    company_name: str = ""
+    history: list = []
+    session_id: Optional[str] = None
+
+class SessionRequest(BaseModel):
     company_name: str
-    history: list
 
-@app.get("/")
-async def home(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+class BatchRequest(BaseModel):
+    symbols: List[str]
 
-@app.post("/analyze")
-async def analyze_company(company_name: str = Form(...)):
-    """Initial analysis endpoint"""
-    try:
-        # Get financial data
-        financial_data = financial_agent.get_financial_data(company_name)
-        
-        # Create analysis prompt
-        analysis_prompt = f"""Based on the following financial data for {company_name}, provide a comprehensive investment analysis:
+class JobRequest(BaseModel):
+    kind: str = "analysis"
+    company_name: str
+    history: list = []
+
+def build_analysis_prompt(company_name: str, financial_data: str) -> str:
+    """Prompt for a fresh investment analysis of the given financial data"""
+    return f"""Based on the following financial data for {company_name}, provide a comprehensive investment analysis:
 
 {financial_data}
 
@@ -75,8 +148,344 @@ Please provide:
 
 Be thorough but concise in your analysis."""
 
+def encode_prompt_data(financial_data: str):
+    """Market data as written into analysis prompts, with token counts for both encodings"""
+    compact = compact_financial_data(financial_data)
+    prompt_data = compact if PROMPT_DATA_FORMAT == 'compact' else financial_data
+    return prompt_data, {
+        "format": PROMPT_DATA_FORMAT,
+        "text_tokens": count_tokens(financial_data),
+        "compact_tokens": count_tokens(compact)
+    }
+
+def prior_history(request: ConversationRequest) -> list:
+    """History before the current message (the web UI appends the message before sending)"""
+    history = request.history
+    if history and history[-1].get('role') == 'user' and history[-1].get('content') == request.message:
+        return history[:-1]
+    return history
+
+def conversation_turn_text(message: str) -> str:
+    """The new-turn part of a conversation prompt; kept byte-stable so it can follow a cached context"""
+    return (f"\nUser's current message: {message}\n\n"
+            "Please provide a helpful response that continues the conversation and addresses the user's input.")
+
+def build_conversation_prompt(request: ConversationRequest, session_state: Optional[dict] = None) -> PackedContext:
+    """Prompt for continuing the conversation about a company, packed into the token budget"""
+    system_prompt = f"You are a financial analyst having a conversation about {request.company_name}."
+    
+    return context_packer.pack(
+        system_prompt,
+        prior_history(request),
+        conversation_turn_text(request.message),
+        # Only reuse data we already have; never fetch on the chat path
+        data_snapshot=financial_agent.get_cached_financial_data(request.company_name),
+        session_state=session_state
+    )
+
+def format_feedback_turn(message: dict) -> str:
+    return f"Previous Analysis: {message['content']}\n"
+
+def build_feedback_prompt(request: FeedbackRequest) -> PackedContext:
+    """Prompt for revising the analysis according to user feedback, packed into the token budget"""
+    system_prompt = f"""You are a financial analyst. The user has provided feedback on your analysis of {request.company_name}.
+
+User Feedback: {request.feedback}"""
+    
+    tail = f"""
+Based on the user's feedback, please provide an improved or additional analysis that addresses their specific request.
+
+Focus on:
+- Addressing the specific feedback provided
+- Providing more detailed or targeted analysis
+- Incorporating the user's guidance into your recommendations
+
+Please be specific and actionable in your response."""
+    
+    return context_packer.pack(
+        system_prompt,
+        [msg for msg in request.history if msg['role'] == 'assistant'],
+        tail,
+        format_turn=format_feedback_turn,
+        history_header="Previous analysis context:\n"
+    )
+
+def context_stats(packed: PackedContext) -> dict:
+    """Prompt size details reported alongside responses"""
+    return {
+        "prompt_tokens": packed.tokens,
+        "budget": packed.budget,
+        "included_turns": packed.included_turns,
+        "summarized_turns": packed.summarized_turns
+    }
+
+def find_recent_analysis(history: list):
+    """Find the most recent analysis in conversation history"""
+    for msg in reversed(history):
+        if msg['role'] == 'assistant' and 'analysis' in msg['content'].lower():
+            return msg['content']
+    return None
+
+def build_critique_prompt(analysis: str) -> str:
+    """Prompt asking the model to critique an analysis"""
+    return f"""You are a critical financial analyst. Review the following analysis and identify potential flaws, biases, or areas for improvement.
+
+Analysis to Critique:
+{analysis}
+
+Provide your critique in the following format:
+1. Identified Issues
+2. Potential Biases
+3. Missing Information
+4. Alternative Perspectives
+5. Recommendations for Improvement
+
+Be concise and prescriptive in your criticism. Focus on actionable improvements."""
+
+def build_improvement_prompt(company_name: str, analysis: str, critique: str) -> str:
+    """Prompt for an improved analysis that addresses a critique"""
+    return f"""Based on the following critique of the analysis for {company_name}, provide an improved analysis that addresses the identified issues:
+
+Original Analysis:
+{analysis}
+
+Critique:
+{critique}
+
+Please provide an improved analysis that:
+1. Addresses the specific issues identified in the critique
+2. Incorporates the alternative perspectives mentioned
+3. Includes the missing information highlighted
+4. Provides more balanced and comprehensive recommendations
+
+Make the analysis more robust and actionable based on the critique feedback."""
+
+def sse_event(event: str, data: dict) -> str:
+    """Format a single Server-Sent Event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def stream_llm_tokens(choice: ModelChoice, prompt: str, stage: str, parts: list,
+                            priority: Optional[Priority] = None):
+    """
+    Yield SSE token events as Ollama produces them, collecting the full text in parts
+    priority overrides the task's scheduler priority (e.g. BATCH for portfolio summaries).
+    """
+    options = {"priority": priority} if priority is not None else {}
+    yield sse_event("stage", {"stage": stage, "model": choice.model})
+    async for token in model_router.astream(choice, prompt, **options):
+        parts.append(token)
+        yield sse_event("token", {"stage": stage, "text": token})
+
+def sse_response(events) -> StreamingResponse:
+    """Wrap an async event generator in a streaming response, reporting failures as an error event"""
+    async def guarded():
+        try:
+            async for event in events:
+                yield event
+        except Exception as e:
+            yield sse_event("error", {"message": str(e)})
+    return StreamingResponse(
+        guarded(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def generate_stage(task: Task, prompt: str, stage: str, result: dict, emit=None) -> str:
+    """
+    Run one pipeline generation to completion, reporting stage and token events through
+    emit(event, data) if given. The model chosen for the stage is recorded in result["models"].
+    """
+    choice = model_router.choose(task)
+    result.setdefault("models", {})[stage] = choice.as_dict()
+    if emit is None:
+        return await model_router.ainvoke(choice, prompt)
+    
+    parts = []
+    await emit("stage", {"stage": stage, "model": choice.model})
+    async for token in model_router.astream(choice, prompt):
+        parts.append(token)
+        await emit("token", {"stage": stage, "text": token})
+    return "".join(parts)
+
+async def critique_pipeline(company_name: str, history: list, result: dict, emit=None):
+    """
+    Staged critique pipeline: optional fresh analysis, critique, then improvement
+    Each stage starts as soon as the previous generation finishes, independently of
+    how fast the client reads the stream. Completed stages are recorded in result so
+    a failure in a later stage still returns partial results.
+    """
+    result.update({"critique": None, "improved_analysis": None, "partial": True})
+    stage = "analysis"
+    try:
+        recent_analysis = find_recent_analysis(history)
+        
+        if not recent_analysis:
+            # If no analysis found, get fresh financial data and create analysis
+            if emit is not None:
+                await emit("stage", {"stage": "data"})
+            financial_data = await run_blocking(financial_agent.get_financial_data, company_name)
+            prompt_data, result["data_tokens"] = encode_prompt_data(financial_data)
+            recent_analysis = await generate_stage(
+                Task.ANALYSIS, build_analysis_prompt(company_name, prompt_data), stage, result, emit
+            )
+            result["analysis"] = recent_analysis
+        
+        stage = "critique"
+        result["critique"] = await generate_stage(
+            Task.CRITIQUE, build_critique_prompt(recent_analysis), stage, result, emit
+        )
+        
+        stage = "improved_analysis"
+        result["improved_analysis"] = await generate_stage(
+            Task.ANALYSIS, build_improvement_prompt(company_name, recent_analysis, result["critique"]), stage, result, emit
+        )
+        result["partial"] = False
+    except Exception as e:
+        result["failed_stage"] = stage
+        result["error"] = str(e)
+        if emit is not None:
+            await emit("error", {"stage": stage, "message": str(e)})
+    return result
+
+async def run_analysis_job(params: dict, emit) -> dict:
+    """Background job: fetch data and generate an analysis, reporting progress through emit"""
+    company_name = params["company_name"]
+    await emit("stage", {"stage": "data"})
+    financial_data = await run_blocking(financial_agent.get_financial_data, company_name)
+    prompt_data, data_tokens = encode_prompt_data(financial_data)
+    result = {"data_tokens": data_tokens}
+    result["final_analysis"] = await generate_stage(
+        Task.ANALYSIS, build_analysis_prompt(company_name, prompt_data), "analysis", result, emit
+    )
+    return result
+
+async def run_critique_job(params: dict, emit) -> dict:
+    """Background job: the staged critique pipeline; fails only if neither an analysis nor a critique was produced"""
+    result = await critique_pipeline(params["company_name"], params.get("history", []), {}, emit)
+    if result["critique"] is None and not result.get("analysis"):
+        raise RuntimeError(result["error"])
+    return result
+
+# Long analyses submitted through /jobs run here instead of holding a request open
+job_manager = JobManager({"analysis": run_analysis_job, "critique": run_critique_job})
+
+async def load_session(request) -> Optional[Session]:
+    """Fill the request's history and company from its session, if it names one"""
+    if not request.session_id:
+        return None
+    session = await run_blocking(session_store.get, request.session_id)
+    if session is None:
+        raise SessionNotFound(request.session_id)
+    request.history = session.history
+    request.company_name = request.company_name or session.company_name
+    return session
+
+def append_to_session(session: Optional[Session], turns: list):
+    """Record (role, content) turns and the derived state in the session, if there is one"""
+    if session is not None:
+        session_store.append(session.id, [new_message(role, content) for role, content in turns], session.state)
+
+async def stream_conversation_turn(request: ConversationRequest, stats: dict, session: Optional[Session] = None):
+    """Stream a conversation response, reusing the cached Ollama context for this transcript when possible"""
+    async def full_prompt():
+        packed = await run_blocking(build_conversation_prompt, request, session.state if session else None)
+        stats.update(context_stats(packed))
+        return packed.prompt
+    
+    choice = model_router.choose(Task.CONVERSATION)
+    stats["model"] = choice.as_dict()
+    turn_prompt = conversation_turn_text(request.message)
+    async with model_router.timed(choice):
+        async for text in conversation_sessions.astream_turn(
+            request.company_name, prior_history(request), request.message,
+            turn_prompt, full_prompt, turn_tokens=count_tokens(turn_prompt), stats=stats,
+            **choice.options()
+        ):
+            yield text
+
+def admit(priority: Priority):
+    """Dependency that turns requests away with 429/503 when the LLM queue for their class is full"""
+    async def check():
+        llm_scheduler.check_admission(priority)
+    return Depends(check)
+
+@app.exception_handler(SchedulerOverloaded)
+async def scheduler_overloaded_handler(request: Request, exc: SchedulerOverloaded):
+    return JSONResponse({
+        "status": "error",
+        "message": str(exc),
+        "retry_after": exc.retry_after
+    }, status_code=exc.status_code, headers={"Retry-After": str(exc.retry_after)})
+
+@app.exception_handler(JobQueueFull)
+async def job_queue_full_handler(request: Request, exc: JobQueueFull):
+    return JSONResponse({
+        "status": "error",
+        "message": str(exc),
+        "retry_after": exc.retry_after
+    }, status_code=429, headers={"Retry-After": str(exc.retry_after)})
+
+@app.exception_handler(SessionNotFound)
+async def session_not_found_handler(request: Request, exc: SessionNotFound):
+    return JSONResponse({
+        "status": "error",
+        "message": str(exc)
+    }, status_code=404)
+
+@app.on_event("startup")
+async def start_model_warmup():
+    app.state.warmup_task = asyncio.create_task(model_warmup.run())
+
+@app.on_event("startup")
+async def start_job_workers():
+    job_manager.start()
+
+@app.on_event("startup")
+async def start_loop_lag_monitor():
+    loop_lag.start()
+
+@app.on_event("startup")
+async def prefetch_benchmark_history():
+    # Fetched in the background; every fast-path analysis needs the benchmark for beta
+    await run_blocking(financial_agent.prefetch_benchmark)
+
+@app.on_event("shutdown")
+async def close_llm_client():
+    app.state.warmup_task.cancel()
+    await job_manager.stop()
+    await quote_hub.stop()
+    await loop_lag.stop()
+    await llm_client.aclose()
+
+@app.get("/")
+async def home(request: Request):
+    return templates.TemplateResponse("index.html", {"request": request})
+
+async def analysis_session(company_name: str, session_id: Optional[str], start_session: bool) -> Optional[Session]:
+    """The session an analysis belongs to: the given one, a new one if asked for, else None"""
+    if session_id:
+        session = await run_blocking(session_store.get, session_id)
+        if session is None:
+            raise SessionNotFound(session_id)
+        return session
+    if start_session:
+        return await run_blocking(session_store.create, company_name)
+    return None
+
+@app.post("/analyze", dependencies=[admit(Priority.ANALYSIS)])
+async def analyze_company(company_name: str = Form(...), session_id: Optional[str] = Form(None),
+                          start_session: bool = Form(False)):
+    """Initial analysis endpoint"""
+    session = await analysis_session(company_name, session_id, start_session)
+    try:
+        # Get financial data
+        financial_data = await run_blocking(financial_agent.get_financial_data, company_name)
+        prompt_data, data_tokens = encode_prompt_data(financial_data)
+        
         # Get analysis from LLM
-        analysis = llm.invoke(analysis_prompt)
+        choice = model_router.choose(Task.ANALYSIS)
+        analysis = await model_router.ainvoke(choice, build_analysis_prompt(company_name, prompt_data))
+        await run_blocking(append_to_session, session, [('assistant', analysis)])
         
         return JSONResponse({
             "status": "success",
@@ -84,7 +493,10 @@ Be thorough but concise in your analysis."""
                 "final_analysis": analysis,
                 "history": [
                     {"type": "analysis", "content": analysis}
-                ]
+                ],
+                "data_tokens": data_tokens,
+                "model": choice.as_dict(),
+                "session_id": session.id if session else None
             }
         })
     except Exception as e:
@@ -93,32 +505,82 @@ Be thorough but concise in your analysis."""
             "message": str(e)
         }, status_code=500)
 
-@app.post("/conversation")
+@app.post("/analyze/stream", dependencies=[admit(Priority.ANALYSIS)])
+async def analyze_company_stream(company_name: str = Form(...), session_id: Optional[str] = Form(None),
+                                 start_session: bool = Form(False)):
+    """Initial analysis endpoint, streaming tokens as Server-Sent Events"""
+    session = await analysis_session(company_name, session_id, start_session)
+    
+    async def events():
+        yield sse_event("stage", {"stage": "data"})
+        financial_data = await run_blocking(financial_agent.get_financial_data, company_name)
+        prompt_data, data_tokens = encode_prompt_data(financial_data)
+        choice = model_router.choose(Task.ANALYSIS)
+        analysis = []
+        async for event in stream_llm_tokens(choice, build_analysis_prompt(company_name, prompt_data), "analysis", analysis):
+            yield event
+        final_analysis = "".join(analysis)
+        await run_blocking(append_to_session, session, [('assistant', final_analysis)])
+        yield sse_event("done", {"final_analysis": final_analysis, "data_tokens": data_tokens,
+                                 "model": choice.as_dict(), "session_id": session.id if session else None})
+    return sse_response(events())
+
+@app.post("/analyze/batch", dependencies=[admit(Priority.BATCH)])
+async def analyze_portfolio_stream(request: BatchRequest):
+    """Analyze a portfolio, streaming each symbol's result as it completes and then a portfolio summary"""
+    try:
+        symbols = normalize_symbols(request.symbols)
+    except ValueError as e:
+        return JSONResponse({
+            "status": "error",
+            "message": str(e)
+        }, status_code=400)
+    
+    async def fetch(symbol: str) -> str:
+        return await run_blocking(financial_agent.get_financial_data, symbol)
+    
+    async def analyze(symbol: str, financial_data: str) -> dict:
+        prompt_data, data_tokens = encode_prompt_data(financial_data)
+        choice = model_router.choose(Task.ANALYSIS)
+        analysis = await model_router.ainvoke(
+            choice, build_analysis_prompt(symbol, prompt_data), priority=Priority.BATCH
+        )
+        return {"analysis": analysis, "data_tokens": data_tokens, "model": choice.as_dict()}
+    
+    async def events():
+        yield sse_event("stage", {"stage": "data", "symbols": symbols})
+        results = {}
+        async for result in analyze_portfolio(symbols, fetch, analyze):
+            results[result["symbol"]] = result
+            yield sse_event("result", result)
+        
+        ordered = [results[symbol] for symbol in symbols]
+        analyzed = [result for result in ordered if result["status"] == "success"]
+        summary, model = None, None
+        if analyzed:
+            choice = model_router.choose(Task.ANALYSIS)
+            parts = []
+            prompt = build_portfolio_summary_prompt(analyzed, choice.model)
+            async for event in stream_llm_tokens(choice, prompt, "summary", parts, priority=Priority.BATCH):
+                yield event
+            summary, model = "".join(parts), choice.as_dict()
+        yield sse_event("done", {"results": ordered, "summary": summary, "model": model})
+    return sse_response(events())
+
+@app.post("/conversation", dependencies=[admit(Priority.INTERACTIVE)])
 async def handle_conversation(request: ConversationRequest):
     """Handle ongoing conversation with the model"""
+    session = await load_session(request)
     try:
-        # Create conversation context
-        context = f"""You are a financial analyst having a conversation about {request.company_name}. 
-        
-Previous conversation context:
-"""
-        
-        # Add conversation history
-        for msg in request.history[-6:]:  # Keep last 6 messages for context
-            if msg['role'] == 'user':
-                context += f"User: {msg['content']}\n"
-            else:
-                context += f"Assistant: {msg['content']}\n"
-        
-        context += f"\nUser's current message: {request.message}\n\n"
-        context += "Please provide a helpful response that continues the conversation and addresses the user's input."
-        
         # Get response from LLM
-        response = llm.invoke(context)
+        stats = {}
+        response = "".join([text async for text in stream_conversation_turn(request, stats, session)])
+        await run_blocking(append_to_session, session, [('user', request.message), ('assistant', response)])
         
         return JSONResponse({
             "status": "success",
-            "response": response
+            "response": response,
+            "context": stats
         })
     except Exception as e:
         return JSONResponse({
@@ -126,39 +588,39 @@ Previous conversation context:
             "message": str(e)
         }, status_code=500)
 
-@app.post("/feedback")
+@app.post("/conversation/stream", dependencies=[admit(Priority.INTERACTIVE)])
+async def handle_conversation_stream(request: ConversationRequest):
+    """Handle ongoing conversation, streaming tokens as Server-Sent Events"""
+    session = await load_session(request)
+    
+    async def events():
+        stats = {}
+        response = []
+        yield sse_event("stage", {"stage": "response"})
+        async for token in stream_conversation_turn(request, stats, session):
+            response.append(token)
+            yield sse_event("token", {"stage": "response", "text": token})
+        await run_blocking(append_to_session, session, [('user', request.message), ('assistant', "".join(response))])
+        yield sse_event("done", {"response": "".join(response), "context": stats})
+    return sse_response(events())
+
+@app.post("/feedback", dependencies=[admit(Priority.INTERACTIVE)])
 async def handle_feedback(request: FeedbackRequest):
     """Handle user feedback and provide improved analysis"""
+    session = await load_session(request)
     try:
-        # Create feedback prompt
-        feedback_prompt = f"""You are a financial analyst. The user has provided feedback on your analysis of {request.company_name}.
-
-User Feedback: {request.feedback}
-
-Previous analysis context:
-"""
-        
-        # Add recent conversation history
-        for msg in request.history[-4:]:
-            if msg['role'] == 'assistant':
-                feedback_prompt += f"Previous Analysis: {msg['content']}\n"
+        packed = await run_blocking(build_feedback_prompt, request)
         
-        feedback_prompt += f"""
-Based on the user's feedback, please provide an improved or additional analysis that addresses their specific request.
-
-Focus on:
-- Addressing the specific feedback provided
-- Providing more detailed or targeted analysis
-- Incorporating the user's guidance into your recommendations
-
-Please be specific and actionable in your response."""
-
         # Get improved analysis from LLM
-        response = llm.invoke(feedback_prompt)
+        choice = model_router.choose(Task.FEEDBACK)
+        response = await model_router.ainvoke(choice, packed.prompt)
+        await run_blocking(append_to_session, session, [('user', request.feedback), ('assistant', response)])
         
         return JSONResponse({
             "status": "success",
-            "response": response
+            "response": response,
+            "context": context_stats(packed),
+            "model": choice.as_dict()
         })
     except Exception as e:
         return JSONResponse({
@@ -166,81 +628,317 @@ Please be specific and actionable in your response."""
             "message": str(e)
         }, status_code=500)
 
-@app.post("/critique")
+@app.post("/feedback/stream", dependencies=[admit(Priority.INTERACTIVE)])
+async def handle_feedback_stream(request: FeedbackRequest):
+    """Handle user feedback, streaming tokens as Server-Sent Events"""
+    session = await load_session(request)
+    
+    async def events():
+        packed = await run_blocking(build_feedback_prompt, request)
+        choice = model_router.choose(Task.FEEDBACK)
+        response = []
+        async for event in stream_llm_tokens(choice, packed.prompt, "response", response):
+            yield event
+        await run_blocking(append_to_session, session, [('user', request.feedback), ('assistant', "".join(response))])
+        yield sse_event("done", {"response": "".join(response), "context": context_stats(packed), "model": choice.as_dict()})
+    return sse_response(events())
+
+def critique_turns(result: dict) -> list:
+    """Completed pipeline stages, including a fresh analysis, as recorded in the conversation history"""
+    return [('assistant', result[stage]) for stage in ("analysis", "critique", "improved_analysis") if result.get(stage)]
+
+@app.post("/critique", dependencies=[admit(Priority.ANALYSIS)])
 async def run_critique_analysis(request: CritiqueRequest):
     """Run critique analysis on the current analysis"""
-    try:
-        # Find the most recent analysis in conversation history
-        recent_analysis = None
-        for msg in reversed(request.history):
-            if msg['role'] == 'assistant' and 'analysis' in msg['content'].lower():
-                recent_analysis = msg['content']
-                break
-        
-        if not recent_analysis:
-            # If no analysis found, get fresh financial data and create analysis
-            financial_data = financial_agent.get_financial_data(request.company_name)
-            analysis_prompt = f"""Based on the following financial data for {request.company_name}, provide a comprehensive investment analysis:
-
-{financial_data}
-
-Please provide:
-1. Key financial metrics summary
-2. Technical analysis insights
-3. Investment recommendation for 3-5 year horizon
-4. Risk assessment
-5. Key factors to watch
-
-Be thorough but concise in your analysis."""
-            recent_analysis = llm.invoke(analysis_prompt)
+    session = await load_session(request)
+    result = await critique_pipeline(request.company_name, request.history, {})
+    await run_blocking(append_to_session, session, critique_turns(result))
+    
+    if result["critique"] is None:
+        if result.get("analysis"):
+            # The fresh analysis still stands on its own
+            return JSONResponse({
+                "status": "success",
+                "analysis": result["analysis"],
+                "critique_error": result["error"],
+                "partial": True,
+                "data_tokens": result.get("data_tokens"),
+                "models": result.get("models")
+            })
+        return JSONResponse({
+            "status": "error",
+            "message": result["error"]
+        }, status_code=500)
+    
+    return JSONResponse({
+        "status": "success",
+        "analysis": result.get("analysis"),
+        "critique": result["critique"],
+        "improved_analysis": result["improved_analysis"],
+        "partial": result["partial"],
+        "data_tokens": result.get("data_tokens"),
+        "models": result.get("models")
+    })
+
+@app.post("/critique/stream", dependencies=[admit(Priority.ANALYSIS)])
+async def run_critique_analysis_stream(request: CritiqueRequest):
+    """Run critique analysis, streaming each stage's tokens as Server-Sent Events"""
+    session = await load_session(request)
+    
+    async def events():
+        queue = asyncio.Queue()
+        result = {}
         
-        # Create critique prompt
-        critique_prompt = f"""You are a critical financial analyst. Review the following analysis and identify potential flaws, biases, or areas for improvement.
-
-Analysis to Critique:
-{recent_analysis}
-
-Provide your critique in the following format:
-1. Identified Issues
-2. Potential Biases
-3. Missing Information
-4. Alternative Perspectives
-5. Recommendations for Improvement
-
-Be concise and prescriptive in your criticism. Focus on actionable improvements."""
+        async def emit(event: str, data: dict):
+            await queue.put(sse_event(event, data))
         
-        # Get critique from LLM
-        critique = llm.invoke(critique_prompt)
+        async def produce():
+            try:
+                await critique_pipeline(request.company_name, request.history, result, emit)
+            finally:
+                await queue.put(None)
         
-        # Optionally generate improved analysis based on critique
-        improved_prompt = f"""Based on the following critique of the analysis for {request.company_name}, provide an improved analysis that addresses the identified issues:
-
-Original Analysis:
-{recent_analysis}
-
-Critique:
-{critique}
-
-Please provide an improved analysis that:
-1. Addresses the specific issues identified in the critique
-2. Incorporates the alternative perspectives mentioned
-3. Includes the missing information highlighted
-4. Provides more balanced and comprehensive recommendations
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                yield event
+            await run_blocking(append_to_session, session, critique_turns(result))
+            yield sse_event("done", result)
+        finally:
+            # Stop generating if the client went away mid-stream
+            producer.cancel()
+    return sse_response(events())
+
+@app.post("/sessions")
+async def create_session(request: SessionRequest):
+    """Start a server-side conversation session for a company"""
+    session = await run_blocking(session_store.create, request.company_name)
+    return JSONResponse({"status": "success", "session": session.as_dict()})
+
+@app.get("/sessions/{session_id}")
+async def get_session(session_id: str):
+    """A session's history and token count"""
+    session = await run_blocking(session_store.get, session_id)
+    if session is None:
+        raise SessionNotFound(session_id)
+    return JSONResponse({"status": "success", "session": session.as_dict()})
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """End a session and delete its history"""
+    if not await run_blocking(session_store.delete, session_id):
+        raise SessionNotFound(session_id)
+    return JSONResponse({"status": "success"})
+
+@app.post("/jobs", status_code=202)
+async def submit_job(request: JobRequest):
+    """Queue an analysis or critique job and return its id immediately"""
+    try:
+        job = job_manager.submit(request.kind, {"company_name": request.company_name, "history": request.history})
+    except ValueError as e:
+        return JSONResponse({
+            "status": "error",
+            "message": str(e)
+        }, status_code=400)
+    
+    return JSONResponse({
+        "status": "success",
+        "job_id": job.id,
+        "job_status": job.status
+    }, status_code=202, headers={"Location": f"/jobs/{job.id}"})
+
+def job_not_found(job_id: str) -> JSONResponse:
+    return JSONResponse({
+        "status": "error",
+        "message": f"Job {job_id} not found or expired"
+    }, status_code=404)
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Poll a job's status, stage progress and, once finished, its result"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return job_not_found(job_id)
+    return JSONResponse({"status": "success", "job": job.as_dict()})
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job"""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return job_not_found(job_id)
+    return JSONResponse({"status": "success", "job": job.as_dict()})
+
+@app.websocket("/jobs/{job_id}/ws")
+async def job_progress(websocket: WebSocket, job_id: str):
+    """Send a job's progress events as JSON messages: past stages first, then live tokens, ending with 'done'"""
+    await websocket.accept()
+    job = job_manager.get(job_id)
+    if job is None:
+        await websocket.send_json({"event": "error", "data": {"message": f"Job {job_id} not found or expired"}})
+        await websocket.close(code=4404)
+        return
+    
+    events = job_manager.subscribe(job)
+    try:
+        while True:
+            event, data = await events.get()
+            await websocket.send_json({"event": event, "data": data})
+            if event == "done":
+                break
+        await websocket.close()
+    except WebSocketDisconnect:
+        # The job keeps running; the client can reconnect or poll for the result
+        pass
+    finally:
+        job_manager.unsubscribe(job, events)
+
+def quote_payload(symbol: str, financial_data: str) -> dict:
+    """Structured quote parsed from the provider data, with derived metrics"""
+    snapshot = parse_financial_data(financial_data)
+    return {
+        "symbol": symbol,
+        "quote": snapshot,
+        "metrics": derive_metrics(snapshot),
+        "cache_age": financial_agent.get_cache_age(symbol)
+    }
+
+@app.get("/quote/{symbol}")
+async def get_quote(symbol: str):
+    """Latest market data for a symbol as JSON, from the data cache when fresh"""
+    symbol = symbol.strip().upper()
+    financial_data = await run_blocking(financial_agent.get_financial_data, symbol)
+    if financial_data.startswith("Error"):
+        return JSONResponse({
+            "status": "error",
+            "message": financial_data
+        }, status_code=502)
+    return JSONResponse({"status": "success", **quote_payload(symbol, financial_data)})
 
-Make the analysis more robust and actionable based on the critique feedback."""
-        
-        improved_analysis = llm.invoke(improved_prompt)
-        
+@app.get("/quotes")
+async def get_quotes(symbols: str):
+    """Latest market data for a comma-separated list of symbols"""
+    try:
+        symbols = normalize_symbols(symbols.split(","))
+    except ValueError as e:
         return JSONResponse({
-            "status": "success",
-            "critique": critique,
-            "improved_analysis": improved_analysis
-        })
-    except Exception as e:
+            "status": "error",
+            "message": str(e)
+        }, status_code=400)
+    
+    fetched = await asyncio.gather(*(run_blocking(financial_agent.get_financial_data, symbol) for symbol in symbols))
+    quotes, errors = [], {}
+    for symbol, financial_data in zip(symbols, fetched):
+        if financial_data.startswith("Error"):
+            errors[symbol] = financial_data
+        else:
+            quotes.append(quote_payload(symbol, financial_data))
+    return JSONResponse({"status": "success", "quotes": quotes, "errors": errors})
+
+def history_format(requested: Optional[str], accept: str) -> str:
+    """Encoding for /history: the format parameter, else a matching Accept type, else JSON"""
+    if requested:
+        return requested
+    for name, media_type in FORMATS.items():
+        if media_type in accept:
+            return name
+    return "json"
+
+@app.get("/history/{symbol}")
+async def get_history(request: Request, symbol: str, period: str = "1y", interval: str = "1d",
+                      format: Optional[str] = None):
+    """OHLCV bars for a symbol as JSON columns, or as a chunked Arrow IPC / msgpack stream"""
+    symbol = symbol.strip().upper()
+    encoding = history_format(format, request.headers.get("accept", ""))
+    if encoding not in FORMATS:
+        return JSONResponse({
+            "status": "error",
+            "message": f"Unknown format '{encoding}'. Expected one of: {', '.join(FORMATS)}"
+        }, status_code=400)
+    if encoding not in available_formats():
+        return JSONResponse({
+            "status": "error",
+            "message": f"Format '{encoding}' is not installed on this server. Available: {', '.join(available_formats())}"
+        }, status_code=406)
+    
+    try:
+        history = await run_blocking(history_store.get, symbol, period, interval)
+    except ValueError as e:
         return JSONResponse({
             "status": "error",
             "message": str(e)
-        }, status_code=500)
+        }, status_code=400)
+    except Exception as e:
+        return JSONResponse({
+            "status": "error",
+            "message": f"Error fetching history for {symbol}: {str(e)}"
+        }, status_code=502)
+    
+    rows = len(history["timestamp"])
+    if encoding == "json":
+        return JSONResponse({
+            "status": "success",
+            "symbol": symbol,
+            "period": period,
+            "interval": interval,
+            "rows": rows,
+            "columns": history
+        })
+    
+    # Chunks are encoded in the thread pool as the client reads them
+    chunks = iter_arrow(history) if encoding == "arrow" else iter_msgpack(
+        history, symbol=symbol, period=period, interval=interval
+    )
+    return StreamingResponse(chunks, media_type=FORMATS[encoding], headers={"X-Row-Count": str(rows)})
+
+@app.websocket("/quotes/ws")
+async def quote_updates(websocket: WebSocket, symbols: str = ""):
+    """
+    Live quotes: the first message has the full quote per symbol, later ones only changed fields
+    Clients subscribe with ?symbols=AAPL,MSFT and/or {"action": "subscribe" | "unsubscribe", "symbols": [...]}.
+    """
+    await websocket.accept()
+    subscriber = quote_hub.subscriber()
+    
+    def update_subscriptions(action: str, requested: list):
+        try:
+            requested = normalize_symbols(requested, QUOTE_MAX_SYMBOLS)
+        except ValueError:
+            return
+        if action == "unsubscribe":
+            quote_hub.unsubscribe(subscriber, requested)
+        else:
+            quote_hub.subscribe(subscriber, requested[:max(0, QUOTE_MAX_SYMBOLS - len(subscriber.symbols))])
+    
+    async def receive():
+        try:
+            while True:
+                message = await websocket.receive_json()
+                update_subscriptions(message.get("action", "subscribe"), message.get("symbols", []))
+        except Exception:
+            subscriber.close()
+    
+    update_subscriptions("subscribe", symbols.split(","))
+    receiver = asyncio.create_task(receive())
+    try:
+        while True:
+            updates = await subscriber.next_updates()
+            if updates is None:
+                break
+            await asyncio.wait_for(websocket.send_json({"event": "quotes", "data": updates}), QUOTE_SEND_TIMEOUT)
+        if subscriber.dropped:
+            await websocket.close(code=1013, reason="Client too slow; reconnect to resume")
+    except asyncio.TimeoutError:
+        # The client stopped reading; treat it like any other slow consumer
+        quote_hub.drop(subscriber)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        quote_hub.unsubscribe(subscriber)
 
 @app.get("/cache-status")
 async def get_cache_status():
@@ -257,6 +955,47 @@ async def get_cache_status():
             "message": str(e)
         }, status_code=500)
 
+@app.get("/ready")
+async def readiness():
+    """Readiness probe: 503 until the models have been loaded into Ollama, naming any that aren't pulled"""
+    status = model_warmup.get_status()
+    if status["missing"]:
+        return JSONResponse({
+            "status": "model_missing",
+            "message": f"Not installed in Ollama: {', '.join(status['missing'])}; "
+                       f"run `ollama pull` for each or set LLM_*_MODEL to a pulled model",
+            **status
+        }, status_code=503)
+    return JSONResponse({
+        "status": "ready" if status["ready"] else "warming",
+        **status
+    }, status_code=200 if status["ready"] else 503)
+
+@app.get("/scheduler-status")
+async def get_scheduler_status():
+    """LLM scheduler queue depths, admission counts and queue-wait percentiles"""
+    return JSONResponse({
+        "status": "success",
+        "scheduler": llm_scheduler.get_status()
+    })
+
+@app.get("/status")
+async def get_status():
+    """Model routing, sessions, jobs, quotes, tracing, logging, profiling, HTTP cassettes and event-loop lag"""
+    return JSONResponse({
+        "status": "success",
+        "models": model_router.get_status(),
+        "conversation_sessions": conversation_sessions.get_status(),
+        "sessions": await run_blocking(session_store.get_status),
+        "jobs": job_manager.get_status(),
+        "quotes": quote_hub.get_status(),
+        "tracing": get_tracing_status(),
+        "logging": get_logging_status(),
+        "profiling": profiler.get_status(),
+        "http_cassette": get_cassette_status(),
+        "event_loop": loop_lag.get_status()
+    })
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
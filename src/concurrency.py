@@ -0,0 +1,162 @@
+"""
+Concurrency helpers for the async web application
+Runs blocking provider work in a bounded thread pool, caps concurrent LLM generations,
+serializes fetches per key and measures event-loop lag
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+from profiling import current_profile
+
+PROVIDER_MAX_WORKERS = int(os.getenv('PROVIDER_MAX_WORKERS', '8'))
+PROVIDER_MAX_PENDING = int(os.getenv('PROVIDER_MAX_PENDING', '64'))
+# Threads for price-history fetches left running in the background by HistoryStore.get_within
+HISTORY_MAX_WORKERS = int(os.getenv('HISTORY_MAX_WORKERS', '4'))
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '2'))
+# Event-loop lag is sampled every LOOP_LAG_INTERVAL_MS and reported over the last LOOP_LAG_WINDOW seconds
+LOOP_LAG_INTERVAL_MS = float(os.getenv('LOOP_LAG_INTERVAL_MS', '100'))
+LOOP_LAG_WINDOW = float(os.getenv('LOOP_LAG_WINDOW', '60'))
+
+class AsyncLimiter:
+    """
+    Async semaphore that can be shared between event loops
+    A separate semaphore is created lazily for each running loop, so module-level
+    limiters keep working under test clients and benchmark harnesses.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.limit)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    async def __aenter__(self):
+        await self._semaphore().acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._semaphore().release()
+        return False
+
+# Thread pool for blocking provider calls (requests, yfinance, time.sleep)
+provider_executor = ThreadPoolExecutor(max_workers=PROVIDER_MAX_WORKERS, thread_name_prefix="provider")
+
+# Bounds how much blocking work may be queued on the pool at once
+provider_limiter = AsyncLimiter(PROVIDER_MAX_PENDING)
+
+# Separate pool for history fetches, so a slow Yahoo download can't hold provider threads
+# (or wait behind the provider calls that are waiting for it)
+history_executor = ThreadPoolExecutor(max_workers=HISTORY_MAX_WORKERS, thread_name_prefix="history")
+
+class KeyedLocks:
+    """
+    One lock per key (e.g. a symbol), so only one thread fetches it at a time
+    Entries are reference-counted and removed by the last thread to release them,
+    so the map only holds the keys being fetched right now.
+    """
+
+    def __init__(self):
+        self._locks = {}  # key -> [lock, threads holding or waiting for it]
+        self._lock = threading.Lock()
+
+    def acquire(self, key):
+        with self._lock:
+            entry = self._locks.get(key)
+            if entry is None:
+                entry = self._locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        entry[0].acquire()
+
+    def release(self, key):
+        with self._lock:
+            entry = self._locks[key]
+            entry[0].release()
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._locks)
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Run a blocking function in the provider thread pool without blocking the event loop
+    Context variables are copied into the worker thread, and the thread joins the
+    request's profile if it is being profiled.
+    """
+    profile = current_profile()
+    if profile is not None:
+        func = profile.wrap(func)
+    async with provider_limiter:
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, func, *args, **kwargs)
+        return await loop.run_in_executor(provider_executor, call)
+
+class LoopLagMonitor:
+    """
+    Measures how late a timer scheduled every interval fires on the event loop
+    Lag means callbacks are holding the loop (CPU-bound work or blocking calls on it),
+    which delays every request on the worker, not just the one doing the work.
+    """
+
+    def __init__(self, interval_ms: float = LOOP_LAG_INTERVAL_MS, window: float = LOOP_LAG_WINDOW):
+        self.interval = max(0.001, interval_ms / 1000)
+        self.window = window
+        self.samples = deque()  # (loop time, lag in seconds)
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            now = loop.time()
+            self.samples.append((now, max(0.0, now - expected)))
+            while self.samples and self.samples[0][0] < now - self.window:
+                self.samples.popleft()
+
+    def get_status(self) -> Dict:
+        lags = sorted(lag for _, lag in self.samples)
+
+        def percentile(p):
+            if not lags:
+                return 0.0
+            return round(lags[min(len(lags) - 1, int(p * len(lags)))] * 1000, 2)
+
+        return {
+            "interval_ms": round(self.interval * 1000, 1),
+            "window_s": self.window,
+            "samples": len(lags),
+            "lag_p50_ms": percentile(0.50),
+            "lag_p99_ms": percentile(0.99),
+            "lag_max_ms": round(lags[-1] * 1000, 2) if lags else 0.0
+        }
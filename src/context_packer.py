@@ -0,0 +1,277 @@
+"""
+Token-budgeted context packing for conversation prompts
+Fills a per-model token budget by priority: system prompt, latest data snapshot,
+then the most recent turns. Older turns are folded into a cached rolling summary.
+"""
+
+import hashlib
+import math
+import os
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+# Llama 3's tokenizer extends tiktoken's cl100k_base vocabulary, so cl100k counts match or
+# slightly exceed the model's own; without tiktoken a local heuristic is used
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+# Context window (num_ctx) used for each model; prompts are packed to fit inside it
+MODEL_CONTEXT_WINDOWS = {
+    "llama3.1:8b": 8192,
+    "llama3.2:3b": 8192,
+    "llama3.2:1b": 8192,
+    "mistral": 8192,
+}
+DEFAULT_CONTEXT_WINDOW = int(os.getenv('LLM_CONTEXT_WINDOW', '4096'))
+
+# Tokens kept free for the model's response
+RESPONSE_RESERVE_TOKENS = int(os.getenv('LLM_RESPONSE_RESERVE_TOKENS', '1024'))
+
+# Share of the prompt budget held back because counts only approximate the model's tokenizer
+TOKEN_SAFETY_MARGIN = float(os.getenv('LLM_TOKEN_SAFETY_MARGIN', '0.1'))
+
+# Share of the prompt budget the rolling summary may use
+SUMMARY_BUDGET_SHARE = 0.15
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_encoding = None
+
+def _get_encoding():
+    global _encoding, TIKTOKEN_AVAILABLE
+    if _encoding is None and TIKTOKEN_AVAILABLE:
+        try:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            # Encoding files unavailable (e.g. offline) - use the heuristic
+            TIKTOKEN_AVAILABLE = False
+    return _encoding
+
+class TokenCounter:
+    """
+    Counts tokens with tiktoken's cl100k_base when available, otherwise with a word/punctuation heuristic
+    Counts are memoized by content hash since long analysis messages are re-sent every turn.
+    """
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._counts = OrderedDict()
+
+    @staticmethod
+    def _count(text: str) -> int:
+        encoding = _get_encoding()
+        if encoding is not None:
+            return len(encoding.encode(text))
+        # Roughly one token per short word or symbol, one per ~4 characters of longer words
+        return sum(max(1, math.ceil(len(piece) / 4)) for piece in _TOKEN_PATTERN.findall(text))
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        key = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        if key in self._counts:
+            self._counts.move_to_end(key)
+            return self._counts[key]
+        tokens = self._count(text)
+        self._counts[key] = tokens
+        if len(self._counts) > self.max_entries:
+            self._counts.popitem(last=False)
+        return tokens
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Keep the longest prefix of text that fits in max_tokens"""
+        if max_tokens <= 0:
+            return ""
+        if self.count(text) <= max_tokens:
+            return text
+        low, high = 0, len(text)
+        while low < high:
+            mid = (low + high + 1) // 2
+            if self._count(text[:mid]) <= max_tokens:
+                low = mid
+            else:
+                high = mid - 1
+        return text[:low]
+
+token_counter = TokenCounter()
+
+def count_tokens(text: str) -> int:
+    """Count tokens in text using the shared counter"""
+    return token_counter.count(text)
+
+def context_window_for(model: str) -> int:
+    """Context window (num_ctx) configured for a model"""
+    return MODEL_CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+
+def prompt_budget(model: str) -> int:
+    """Tokens a prompt may use: the context window less the response reserve and the safety margin"""
+    return int((context_window_for(model) - RESPONSE_RESERVE_TOKENS) * (1 - TOKEN_SAFETY_MARGIN))
+
+def default_format_turn(message: dict) -> str:
+    label = "User" if message.get('role') == 'user' else "Assistant"
+    return f"{label}: {message.get('content', '')}\n"
+
+def _first_sentence(text: str, max_chars: int = 240) -> str:
+    text = " ".join(text.split())
+    match = re.search(r"(.+?[.!?])(\s|$)", text)
+    sentence = match.group(1) if match else text
+    return sentence[:max_chars]
+
+def extractive_summarizer(previous_summary: str, turns: List[dict]) -> str:
+    """Fold turns into the running summary by keeping the first sentence of each"""
+    lines = [previous_summary] if previous_summary else []
+    for message in turns:
+        label = "User" if message.get('role') == 'user' else "Assistant"
+        lines.append(f"- {label}: {_first_sentence(message.get('content', ''))}")
+    return "\n".join(lines)
+
+def llm_summarizer(llm) -> Callable[[str, List[dict]], str]:
+    """Build a summarizer that asks the LLM to extend the running summary"""
+    def summarize(previous_summary: str, turns: List[dict]) -> str:
+        transcript = "".join(default_format_turn(message) for message in turns)
+        prompt = f"""Update the running summary of a conversation about a company's investment analysis.
+
+Current summary:
+{previous_summary or "(empty)"}
+
+New messages:
+{transcript}
+
+Return a concise updated summary that keeps figures, recommendations and user preferences."""
+        return llm.invoke(prompt).strip()
+    return summarize
+
+class RollingSummaryCache:
+    """
+    LRU cache of rolling summaries keyed by the transcript they cover
+    Summarizing turns 0..n reuses the cached summary of the longest already-summarized prefix,
+    or a seed summary kept with the conversation (e.g. in a server-side session).
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._summaries = OrderedDict()
+
+    @staticmethod
+    def _prefix_keys(turns: List[dict]) -> List[str]:
+        keys = []
+        digest = hashlib.sha1()
+        for message in turns:
+            digest.update(f"{message.get('role')}\x00{message.get('content', '')}\x01".encode("utf-8"))
+            keys.append(digest.copy().hexdigest())
+        return keys
+
+    def summarize(self, turns: List[dict], summarizer, seed: Optional[dict] = None) -> str:
+        """
+        seed: {"turns": n, "text": summary} of the first n turns, used when nothing longer is cached
+        A seed covering 0 turns summarizes messages trimmed from the conversation; it is kept.
+        """
+        if not turns:
+            return seed["text"] if seed and seed["turns"] == 0 else ""
+        keys = self._prefix_keys(turns)
+
+        # Find the longest prefix we've already summarized
+        summary = ""
+        start = 0
+        for index in range(len(keys) - 1, -1, -1):
+            if keys[index] in self._summaries:
+                summary = self._summaries[keys[index]]
+                self._summaries.move_to_end(keys[index])
+                start = index + 1
+                break
+
+        if seed and seed["turns"] <= len(turns) and (start < seed["turns"] or start == 0):
+            summary, start = seed["text"], seed["turns"]
+
+        if start < len(turns):
+            summary = summarizer(summary, turns[start:])
+            self._summaries[keys[-1]] = summary
+            if len(self._summaries) > self.max_entries:
+                self._summaries.popitem(last=False)
+        return summary
+
+@dataclass
+class PackedContext:
+    prompt: str
+    tokens: int
+    budget: int
+    included_turns: int
+    summarized_turns: int
+    data_included: bool
+
+class ContextPacker:
+    """
+    Packs a system prompt, optional data snapshot and conversation history into a token budget
+    """
+
+    def __init__(self, model: str, summarizer=None, budget: Optional[int] = None,
+                 counter: TokenCounter = None, summary_cache: RollingSummaryCache = None):
+        self.model = model
+        self.budget = budget or prompt_budget(model)
+        self.summarizer = summarizer or extractive_summarizer
+        self.counter = counter or token_counter
+        self.summary_cache = summary_cache or RollingSummaryCache()
+
+    def pack(self, system_prompt: str, history: List[dict], tail: str,
+             data_snapshot: Optional[str] = None,
+             format_turn: Callable[[dict], str] = default_format_turn,
+             history_header: str = "Previous conversation context:\n",
+             session_state: Optional[dict] = None) -> PackedContext:
+        """
+        system_prompt and tail (the current message and instructions) are always included.
+        The data snapshot is added next (truncated if needed), then turns newest-first.
+        Turns that don't fit are replaced by a rolling summary.
+        session_state: per-conversation dict; its "summary" seeds and receives the rolling summary.
+        """
+        count = self.counter.count
+        remaining = self.budget - count(system_prompt) - count(tail) - count(history_header)
+
+        data_section = ""
+        if data_snapshot and remaining > 0:
+            header = "\n\nLatest financial data:\n"
+            snapshot = self.counter.truncate(data_snapshot, remaining - count(header))
+            if snapshot:
+                data_section = header + snapshot
+                remaining -= count(data_section)
+
+        # Reserve room for the summary of older turns before filling recent ones
+        summary_budget = min(int(self.budget * SUMMARY_BUDGET_SHARE), max(remaining, 0))
+        turn_budget = remaining - summary_budget
+
+        rendered = [format_turn(message) for message in history]
+        included = 0
+        for text in reversed(rendered):
+            tokens = count(text)
+            if tokens > turn_budget:
+                break
+            turn_budget -= tokens
+            included += 1
+
+        older = history[:len(history) - included]
+        summary_section = ""
+        seed = session_state.get("summary") if session_state is not None else None
+        if older or (seed and seed["turns"] == 0):
+            header = "\n\nSummary of earlier conversation:\n"
+            # Unused turn budget can go to the summary
+            available = summary_budget + turn_budget - count(header)
+            full_summary = self.summary_cache.summarize(older, self.summarizer, seed=seed)
+            if session_state is not None:
+                session_state["summary"] = {"turns": len(older), "text": full_summary}
+            summary = self.counter.truncate(full_summary, available)
+            if summary:
+                summary_section = header + summary
+
+        turns_section = "".join(rendered[len(rendered) - included:])
+        prompt = f"{system_prompt}{data_section}{summary_section}\n\n{history_header}{turns_section}{tail}"
+        return PackedContext(
+            prompt=prompt,
+            tokens=count(prompt),
+            budget=self.budget,
+            included_turns=included,
+            summarized_turns=len(older),
+            data_included=bool(data_section)
+        )
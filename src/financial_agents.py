@@ -1,39 +1,74 @@
-from langchain.agents import create_react_agent, AgentExecutor, Tool
-from langchain.prompts import PromptTemplate
-from langchain_community.llms import Ollama
 from typing import Dict, List
-import pandas as pd
+from functools import cached_property
+import difflib
 import time
+import threading
 from datetime import datetime, timedelta
 # Alpha Vantage now handled by financial_data_providers.py
 import os
 from dotenv import load_dotenv
+from concurrency import KeyedLocks
 from financial_data_providers import MultiProviderFinancialData
+from financial_snapshot import parse_financial_data
+from market_history import HistoryStore
+from model_router import Task
+from llm_factory import get_llm
+from profiling import profiled
+from structured_logging import get_logger
+from tracing import span
 
 # Load environment variables
 load_dotenv()
 
+# Reply the fast-path prompt asks for when the prefetched data is not enough
+NEED_MORE_DATA = "NEED_MORE_DATA"
+
+log = get_logger("cache")
+
 class FinancialAnalysisAgent:
-    def __init__(self, llm):
+    def __init__(self, llm, fast_path: bool = True):
+        """
+        fast_path: prefetch data and metrics and analyze them in a single LLM call,
+            falling back to the ReAct agent only when the model asks for more
+        """
         self.llm = llm
-        # Initialize multi-provider system (Yahoo Finance, Polygon, Finnhub, Alpha Vantage)
-        self.data_provider = MultiProviderFinancialData()
-        
+        self.fast_path = fast_path
         # Initialize cache for financial data
         self.data_cache = {}
         self.cache_duration = 3000  # 5 minutes in seconds
+        # Requests are served from a thread pool, so guard the cache and
+        # let only one thread fetch a given symbol at a time
+        self._cache_lock = threading.Lock()
+        self._fetch_locks = KeyedLocks()
+
+    # LangChain, the agent executor and the data providers are built on first use so
+    # that importing this module (and starting the web app) stays fast
+
+    @cached_property
+    def data_provider(self) -> MultiProviderFinancialData:
+        # Multi-provider system (Yahoo Finance, Polygon, Finnhub, Alpha Vantage)
+        return MultiProviderFinancialData()
+
+    @cached_property
+    def history_store(self) -> HistoryStore:
+        # Daily bars behind the risk and trend metrics; the web app shares its /history store
+        return HistoryStore()
+
+    @cached_property
+    def tools(self) -> list:
+        from langchain.agents import Tool
         
-        self.tools = [
+        return [
             Tool(
                 name="GetFinancialData",
                 func=self.get_financial_data,
                 description="Get financial data for a company using multiple sources (Yahoo Finance, Polygon, Finnhub). Input should be just the stock symbol (e.g., AAPL, MSFT). Data is cached for 5 minutes to reduce API calls."
             ),
-            # Tool(
-            #     name="CalculateMetrics",
-            #     func=self.calculate_metrics,
-            #     description="Calculate financial metrics from the data. Input should be the data string from GetFinancialData"
-            # ),
+            Tool(
+                name="CalculateMetrics",
+                func=self.calculate_metrics,
+                description="Calculate exact financial metrics for a company: valuation ratios, growth rates, volatility, drawdown, Sharpe ratio, beta and distances from moving averages. Input should be just the stock symbol (e.g., AAPL). Use these numbers instead of calculating them yourself."
+            ),
             Tool(
                 name="CheckDataSources",
                 func=self.check_data_sources,
@@ -50,8 +85,12 @@ class FinancialAnalysisAgent:
                 description="Clear all cached financial data to force fresh API calls on next request."
             )
         ]
+
+    @cached_property
+    def prompt(self):
+        from langchain.prompts import PromptTemplate
         
-        self.prompt = PromptTemplate.from_template(
+        return PromptTemplate.from_template(
             """You are a financial analysis expert. Analyze the following company and provide a detailed investment recommendation for a 3-5 year horizon.
 
 You have access to the following tools:
@@ -70,7 +109,7 @@ Thought: I now know the final answer
 Final Answer: the final answer to the original input question
 
 Important Instructions:
-1. For GetFinancialData, only input the stock symbol (e.g., AAPL, MSFT)
+1. For GetFinancialData and CalculateMetrics, only input the stock symbol (e.g., AAPL, MSFT)
 2. Do not try to use any other tools or methods
 3. Keep your analysis focused on the data you receive
 4. Always follow the format exactly as shown above
@@ -81,50 +120,193 @@ Begin!
 Question: Analyze {company_name} for investment potential
 Thought: {agent_scratchpad}"""
         )
+
+    @cached_property
+    def executor(self):
+        from langchain.agents import create_react_agent, AgentExecutor
         
-        self.agent = create_react_agent(self.llm, self.tools, self.prompt)
-        self.executor = AgentExecutor.from_agent_and_tools(
-            agent=self.agent,
+        agent = create_react_agent(self.llm, self.tools, self.prompt)
+        return AgentExecutor.from_agent_and_tools(
+            agent=agent,
             tools=self.tools,
             verbose=True,
-            handle_parsing_errors=True
+            handle_parsing_errors=True,
+            return_intermediate_steps=True
         )
 
-    def get_financial_data(self, company_name: str) -> str:
-        try:
-            # Normalize the symbol (uppercase)
-            symbol = company_name.upper()
-            current_time = time.time()
-            
-            # Check if data is in cache and not expired
+    @cached_property
+    def fast_path_prompt(self):
+        from langchain.prompts import PromptTemplate
+        
+        return PromptTemplate.from_template(
+            """You are a financial analysis expert. Analyze {company_name} and provide a detailed investment recommendation for a 3-5 year horizon.
+
+Financial data ({freshness}):
+{financial_data}
+
+Computed metrics:
+{metrics}
+
+Base your analysis only on the data above. If it is not enough to give a recommendation, reply with exactly "{need_more_data}: <what is missing>" and nothing else.
+
+Provide:
+1. Key financial metrics summary
+2. Technical analysis insights
+3. Investment recommendation for 3-5 year horizon
+4. Risk assessment
+5. Key factors to watch"""
+        )
+
+    @cached_property
+    def revision_prompt(self):
+        from langchain.prompts import PromptTemplate
+        
+        return PromptTemplate.from_template(
+            """You are a financial analysis expert revising your investment analysis of {company_name} for a 3-5 year horizon.
+
+Data gathered while preparing the analysis:
+{observations}
+
+Current analysis:
+{analysis}
+
+Critique of the current analysis:
+{critique}
+
+Revise the analysis to address the critique. Use only the data above; keep what the critique did not object to and change what it did.
+Return only the complete revised analysis."""
+        )
+
+    def _get_cached_data(self, symbol: str, max_age: float = None):
+        """Return cached data for a symbol, or None if missing, expired or older than max_age"""
+        with span("cache.lookup", symbol=symbol) as lookup, self._cache_lock:
+            lookup.set(hit=False)
             if symbol in self.data_cache:
                 cached_data, cache_time = self.data_cache[symbol]
-                if current_time - cache_time < self.cache_duration:
-                    print(f"📋 Returning cached data for {symbol} (age: {int(current_time - cache_time)}s)")
+                age = time.time() - cache_time
+                lookup.set(age=int(age))
+                if max_age is not None and age >= max_age and age < self.cache_duration:
+                    return None
+                if age < self.cache_duration:
+                    log.debug("cache_hit", symbol=symbol, age=int(age))
+                    lookup.set(hit=True)
                     return cached_data
                 else:
                     # Remove expired cache entry
                     del self.data_cache[symbol]
-                    print(f"🗑️  Cache expired for {symbol}, fetching fresh data")
-            
-            # Fetch fresh data from provider
-            print(f"🔄 Fetching fresh data for {symbol}")
-            result = self.data_provider.get_financial_data(symbol)
+                    log.info("cache_expired", symbol=symbol, age=int(age))
+            return None
+
+    def get_cached_financial_data(self, company_name: str):
+        """Return cached data for a symbol without fetching, or None"""
+        return self._get_cached_data(company_name.upper())
+
+    @profiled
+    def get_financial_data(self, company_name: str, max_age: float = None, min_calls_per_minute: float = 0.0) -> str:
+        """
+        Provider data for a symbol, from the cache when fresh
+        max_age: refetch if the cached data is older than this many seconds (e.g. for live quotes)
+        min_calls_per_minute: only fetch from providers whose quota sustains this call rate
+        """
+        try:
+            # Normalize the symbol (uppercase)
+            symbol = company_name.upper()
             
-            # Cache the result if it's not an error
-            if not result.startswith("Error:"):
-                self.data_cache[symbol] = (result, current_time)
-                print(f"💾 Cached data for {symbol}")
+            # Check if data is in cache and not expired
+            cached_data = self._get_cached_data(symbol, max_age)
+            if cached_data is not None:
+                return cached_data
             
-            return result
+            # Time spent waiting here is another request fetching the same symbol
+            with span("cache.fetch_wait", symbol=symbol):
+                self._fetch_locks.acquire(symbol)
+            try:
+                # Another thread may have fetched the symbol while we waited
+                cached_data = self._get_cached_data(symbol, max_age)
+                if cached_data is not None:
+                    return cached_data
+                
+                # Fetch fresh data from provider
+                log.info("cache_miss", symbol=symbol)
+                if min_calls_per_minute:
+                    result = self.data_provider.get_financial_data(symbol, min_calls_per_minute=min_calls_per_minute)
+                else:
+                    result = self.data_provider.get_financial_data(symbol)
+                
+                # Cache the result if it's not an error
+                if not result.startswith("Error:"):
+                    with span("cache.store", symbol=symbol), self._cache_lock:
+                        self.data_cache[symbol] = (result, time.time())
+                    log.debug("cache_store", symbol=symbol)
+                
+                return result
+            finally:
+                self._fetch_locks.release(symbol)
             
         except Exception as e:
             return f"Error fetching data for {company_name}: {str(e)}. Please try again later or check if the symbol is correct."
 
-    def calculate_metrics(self, data: str) -> str:
+    def get_cache_age(self, company_name: str):
+        """Age in seconds of the cached data for a symbol, or None if not cached"""
+        with self._cache_lock:
+            entry = self.data_cache.get(company_name.upper())
+        if entry is None:
+            return None
+        return int(time.time() - entry[1])
+
+    def get_history(self, symbol: str, timeout: float = None):
+        """
+        Daily bars for the metrics engine, or None if they can't be fetched
+        timeout: seconds to wait for bars that aren't cached; the fetch carries on in the background
+        """
+        from metrics_engine import METRICS_HISTORY_PERIOD
+
         try:
-            # Parse the data and calculate key metrics
-            return "Key metrics calculated successfully"
+            if timeout is None:
+                history = self.history_store.get(symbol, METRICS_HISTORY_PERIOD, "1d")
+            else:
+                history = self.history_store.get_within(symbol, METRICS_HISTORY_PERIOD, "1d", timeout)
+        except Exception as e:
+            log.warning("history_failed", symbol=symbol, error=str(e))
+            return None
+        return history if history and history["close"] else None
+
+    def prefetch_benchmark(self):
+        """Start fetching the benchmark's bars so analyses don't wait for them"""
+        from metrics_engine import METRICS_BENCHMARK
+
+        self.get_history(METRICS_BENCHMARK, timeout=0)
+
+    @profiled
+    def calculate_metrics(self, data: str, wait_for_history: bool = True) -> str:
+        """
+        Metrics for a symbol or GetFinancialData output
+        wait_for_history: if False, history that isn't cached within METRICS_HISTORY_TIMEOUT
+        is left out (its fetch fills the cache for later calls)
+        """
+        # numpy is only imported once metrics are first needed
+        from metrics_engine import METRICS_BENCHMARK, METRICS_HISTORY_TIMEOUT, compute_metrics, format_metrics
+        
+        timeout = None if wait_for_history else METRICS_HISTORY_TIMEOUT
+
+        try:
+            # Accept either a stock symbol or the data string from GetFinancialData
+            if "\n" not in data.strip():
+                data = self.get_financial_data(data.strip())
+                if data.startswith("Error"):
+                    return data
+            
+            snapshot = parse_financial_data(data)
+            history = benchmark = None
+            if snapshot.get("symbol"):
+                history = self.get_history(snapshot["symbol"], timeout)
+                if history is not None and snapshot["symbol"].upper() != METRICS_BENCHMARK.upper():
+                    benchmark = self.get_history(METRICS_BENCHMARK, timeout)
+            
+            metrics = compute_metrics(snapshot, history, benchmark)
+            if not metrics:
+                return "Error calculating metrics: no numeric data found"
+            return format_metrics(metrics)
         except Exception as e:
             return f"Error calculating metrics: {str(e)}"
     
@@ -142,7 +324,10 @@ Thought: {agent_scratchpad}"""
             active_cache = {}
             expired_count = 0
             
-            for symbol, (data, cache_time) in self.data_cache.items():
+            with self._cache_lock:
+                entries = list(self.data_cache.items())
+            
+            for symbol, (data, cache_time) in entries:
                 if current_time - cache_time < self.cache_duration:
                     age = int(current_time - cache_time)
                     active_cache[symbol] = age
@@ -151,8 +336,9 @@ Thought: {agent_scratchpad}"""
             
             # Clean up expired entries
             if expired_count > 0:
-                self.data_cache = {k: v for k, v in self.data_cache.items() 
-                                 if current_time - v[1] < self.cache_duration}
+                with self._cache_lock:
+                    self.data_cache = {k: v for k, v in self.data_cache.items() 
+                                     if current_time - v[1] < self.cache_duration}
             
             status = f"📋 Financial Data Cache Status:\n"
             status += f"Cache Duration: {self.cache_duration} seconds ({self.cache_duration//60} minutes)\n"
@@ -173,17 +359,89 @@ Thought: {agent_scratchpad}"""
     def clear_cache(self, _: str = "") -> str:
         """Clear all cached financial data"""
         try:
-            cache_size = len(self.data_cache)
-            self.data_cache.clear()
+            with self._cache_lock:
+                cache_size = len(self.data_cache)
+                self.data_cache.clear()
             return f"🗑️  Cache cleared. Removed {cache_size} cached entries."
         except Exception as e:
             return f"Error clearing cache: {str(e)}"
 
+    @profiled
     def analyze(self, company_name: str) -> str:
-        return self.executor.invoke({"company_name": company_name})["output"]
+        return self.analyze_with_steps(company_name)["output"]
+    
+    @profiled
+    def analyze_with_steps(self, company_name: str) -> Dict:
+        """Analyze a company and also return the observations the analysis was based on"""
+        if self.fast_path:
+            result = self.analyze_fast(company_name)
+            if result is not None:
+                return result
+        return self.analyze_with_agent(company_name)
+    
+    @profiled
+    def analyze_fast(self, company_name: str):
+        """
+        Single-shot analysis over deterministically prefetched data and metrics
+        Returns None when the agent loop is needed instead: the data could not be
+        fetched (e.g. a company name rather than a symbol) or the model asked for more.
+        """
+        financial_data = self.get_financial_data(company_name)
+        if financial_data.startswith("Error"):
+            return None
+        
+        # Analyze without history rather than hold the request for a slow fetch
+        metrics = self.calculate_metrics(financial_data, wait_for_history=False)
+        age = self.get_cache_age(company_name)
+        freshness = f"fetched {age}s ago" if age is not None else "freshly fetched"
+        
+        output = self.llm.invoke(self.fast_path_prompt.format(
+            company_name=company_name,
+            freshness=freshness,
+            financial_data=financial_data,
+            metrics=metrics,
+            need_more_data=NEED_MORE_DATA
+        ))
+        if output.strip().startswith(NEED_MORE_DATA):
+            log.info("fast_path_fallback", symbol=company_name)
+            return None
+        
+        return {
+            "output": output,
+            "observations": f"{financial_data}\n\nComputed metrics:\n{metrics}",
+            "fast_path": True
+        }
+    
+    @profiled
+    def analyze_with_agent(self, company_name: str) -> Dict:
+        """Run the ReAct agent and also return its tool observations as a scratchpad"""
+        result = self.executor.invoke({"company_name": company_name})
+        steps = result.get("intermediate_steps", [])
+        
+        # If the model answered without calling any tool, fall back to the
+        # (cached) financial data so revisions still have the facts to work with
+        if steps:
+            from langchain.agents.format_scratchpad import format_log_to_str
+            observations = format_log_to_str(steps)
+        else:
+            observations = self.get_financial_data(company_name)
+        
+        return {"output": result["output"], "observations": observations, "fast_path": False}
+    
+    @profiled
+    def revise(self, company_name: str, analysis: str, critique: str, observations: str) -> str:
+        """Revise an analysis against a critique in a single LLM call, reusing earlier observations"""
+        return self.llm.invoke(self.revision_prompt.format(
+            company_name=company_name,
+            observations=observations,
+            analysis=analysis,
+            critique=critique
+        ))
 
 class CritiqueAgent:
     def __init__(self, llm):
+        from langchain.prompts import PromptTemplate
+        
         self.llm = llm
         self.prompt = PromptTemplate.from_template(
             """You are a critical financial analyst. Review the following analysis and identify potential flaws, biases, or areas for improvement.
@@ -204,32 +462,64 @@ Be concise and and prescriptive in your criticism."""
     def critique(self, analysis: str) -> str:
         return self.llm.invoke(self.prompt.format(analysis=analysis))
 
+def analysis_similarity(previous: str, current: str) -> float:
+    """Word-level similarity ratio between two analyses (1.0 means identical)"""
+    return difflib.SequenceMatcher(None, previous.split(), current.split()).ratio()
+
 class FinancialAnalysisSystem:
-    def __init__(self, iterations: int = 2):
-        self.llm = Ollama(
-            model="llama3.1:8b",
-            temperature=0.7,
-            base_url="http://localhost:11434"
-        )
+    def __init__(self, iterations: int = 2, refine: bool = True, convergence_threshold: float = 0.9, llm=None):
+        """
+        iterations: maximum number of critique/improvement rounds
+        refine: revise the previous analysis against the critique in one LLM call,
+            reusing the first run's tool observations, instead of re-running the agent
+        convergence_threshold: in refine mode, stop early once a revision is at least
+            this similar to the analysis it revised
+        """
+        self.llm = llm or get_llm(Task.ANALYSIS)
         self.analysis_agent = FinancialAnalysisAgent(self.llm)
-        self.critique_agent = CritiqueAgent(self.llm)
+        # Critiques go to the smaller critique model unless an LLM is given explicitly
+        self.critique_agent = CritiqueAgent(llm or get_llm(Task.CRITIQUE))
         self.iterations = iterations
+        self.refine = refine
+        self.convergence_threshold = convergence_threshold
 
     def run_analysis(self, company_name: str) -> Dict:
         analysis_history = []
-        current_analysis = self.analysis_agent.analyze(company_name)
+        initial = self.analysis_agent.analyze_with_steps(company_name)
+        current_analysis = initial["output"]
         analysis_history.append({"type": "initial", "content": current_analysis})
-
+        
+        converged = False
+        iterations_run = 0
         for i in range(self.iterations):
             critique = self.critique_agent.critique(current_analysis)
             analysis_history.append({"type": "critique", "content": critique})
             
             # Improve analysis based on critique
-            improved_analysis = self.analysis_agent.analyze(company_name)
-            analysis_history.append({"type": "improved", "content": improved_analysis})
+            if self.refine:
+                improved_analysis = self.analysis_agent.revise(
+                    company_name, current_analysis, critique, initial["observations"]
+                )
+            else:
+                improved_analysis = self.analysis_agent.analyze(company_name)
+            
+            similarity = analysis_similarity(current_analysis, improved_analysis)
+            analysis_history.append({
+                "type": "improved",
+                "content": improved_analysis,
+                "similarity": round(similarity, 3)
+            })
             current_analysis = improved_analysis
+            iterations_run += 1
+            
+            # Further rounds would only produce near-identical revisions
+            if self.refine and similarity >= self.convergence_threshold:
+                converged = True
+                break
 
         return {
             "final_analysis": current_analysis,
-            "history": analysis_history
+            "history": analysis_history,
+            "iterations_run": iterations_run,
+            "converged": converged
         } 
\ No newline at end of file
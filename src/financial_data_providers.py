@@ -3,26 +3,84 @@ Enhanced Financial Data Providers with Multiple APIs
 Provides alternatives to Alpha Vantage with better rate limits
 """
 
-import yfinance as yf
-import pandas as pd
+import importlib.util
 import requests
+import threading
 import time
 from datetime import datetime, timedelta
 from typing import Dict, Optional, Tuple
 import os
 from dotenv import load_dotenv
+from http_cassette import install_from_env as install_http_cassette
+from structured_logging import get_logger
+from tracing import span
 # Note: SimpleFallbackProvider moved to tests/test_provider_system.py for test-only use
 
-# Alpha Vantage imports
-try:
-    from alpha_vantage.timeseries import TimeSeries
-    from alpha_vantage.techindicators import TechIndicators
-    ALPHA_VANTAGE_AVAILABLE = True
-except ImportError:
-    ALPHA_VANTAGE_AVAILABLE = False
+# yfinance, pandas and alpha_vantage take seconds to import, so providers import them
+# on first use; only check here that Alpha Vantage is installed
+ALPHA_VANTAGE_AVAILABLE = importlib.util.find_spec("alpha_vantage") is not None
+
+log = get_logger("providers")
 
 load_dotenv()
 
+# Record or replay provider HTTP traffic when HTTP_CASSETTE_MODE asks for it
+install_http_cassette()
+
+MINUTE, DAY = 60, 86400
+
+class CallBudget:
+    """
+    Token bucket holding a provider's quota of `calls` per `period` seconds
+    Starts full and refills continuously, so calls past the quota are refused until
+    enough of the period has gone by. A fetch making several upstream requests
+    acquires one token per request.
+    """
+
+    def __init__(self, calls: int, period: float):
+        self.calls = calls
+        self.period = period
+        self._tokens = float(calls)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def per_minute(self) -> float:
+        """Calls per minute the quota sustains"""
+        return self.calls * MINUTE / self.period
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.calls, self._tokens + (now - self._updated) * self.calls / self.period)
+        self._updated = now
+
+    def try_acquire(self, cost: int = 1) -> bool:
+        with self._lock:
+            self._refill()
+            if self._tokens < cost:
+                return False
+            self._tokens -= cost
+            return True
+
+    def remaining(self) -> int:
+        with self._lock:
+            self._refill()
+            return int(self._tokens)
+
+# Quotas belong to the provider account, so every provider chain in the process shares them
+_budgets = {}
+_budgets_lock = threading.Lock()
+
+def provider_budget(provider) -> Optional[CallBudget]:
+    """The provider's CallBudget, created on first use; None if it has no quota"""
+    quota = getattr(provider, "quota", None)
+    if quota is None:
+        return None
+    with _budgets_lock:
+        if provider.name not in _budgets:
+            _budgets[provider.name] = CallBudget(*quota)
+        return _budgets[provider.name]
+
 class FinancialModelingPrepProvider:
     """
     Financial Modeling Prep (FMP) provider - 250 API calls per day free tier
@@ -34,6 +92,10 @@ class FinancialModelingPrepProvider:
         self.base_url = "https://financialmodelingprep.com/api/v3"
         self.name = "Financial Modeling Prep"
         self.rate_limit = "250 calls/day (free)"
+        # (calls, seconds) of the free tier, enforced by MultiProviderFinancialData
+        self.quota = (250, DAY)
+        # Upstream requests per fetch: quote, profile and key metrics
+        self.calls_per_fetch = 3
     
     def get_financial_data(self, symbol: str) -> str:
         if not self.api_key:
@@ -173,9 +235,13 @@ class YahooFinanceProvider:
     def __init__(self):
         self.name = "Yahoo Finance"
         self.rate_limit = "Virtually unlimited"
+        self.quota = None
     
     def get_financial_data(self, symbol: str) -> str:
         try:
+            import yfinance as yf
+            import pandas as pd
+            
             # Create ticker object
             ticker = yf.Ticker(symbol)
             
@@ -186,44 +252,50 @@ class YahooFinanceProvider:
             
             # First try fast_info (more reliable)
             try:
-                fast_info = ticker.fast_info
-                if fast_info and fast_info.get('lastPrice'):
-                    print(f"✅ Fast info available for {symbol}")
-                    print(f"   Last Price: ${fast_info.get('lastPrice')}")
-                else:
-                    print(f"⚠️  Fast info available but no lastPrice for {symbol}")
-                    fast_info = None
+                with span("yfinance.fast_info", symbol=symbol) as attempt:
+                    fast_info = ticker.fast_info
+                    if fast_info and fast_info.get('lastPrice'):
+                        log.debug("yfinance_fast_info", symbol=symbol, last_price=fast_info.get('lastPrice'))
+                    else:
+                        log.debug("yfinance_fast_info_missing_price", symbol=symbol)
+                        attempt.fail("No lastPrice")
+                        fast_info = None
             except Exception as e:
-                print(f"Warning: Fast info failed for {symbol}: {e}")
+                log.info("yfinance_fast_info_failed", symbol=symbol, error=str(e))
                 fast_info = None
             
             # Try to get historical data with shorter periods first
             for period in ["5d", "1mo", "3mo", "1y"]:
                 try:
-                    print(f"Trying {period} historical data for {symbol}...")
-                    hist = ticker.history(period=period)
+                    log.debug("yfinance_history_attempt", symbol=symbol, period=period)
+                    with span("yfinance.history", symbol=symbol, period=period) as attempt:
+                        hist = ticker.history(period=period)
+                        attempt.set(rows=len(hist))
                     if not hist.empty:
-                        print(f"✅ Got {len(hist)} days of data")
+                        log.debug("yfinance_history", symbol=symbol, period=period, rows=len(hist))
                         break
                     else:
-                        print(f"❌ Empty data for {period}")
+                        log.info("yfinance_history_empty", symbol=symbol, period=period)
                 except Exception as e:
-                    print(f"❌ Failed {period}: {e}")
-                    time.sleep(0.5)  # Small delay between attempts
+                    log.info("yfinance_history_failed", symbol=symbol, period=period, error=str(e))
+                    with span("provider.backoff"):
+                        time.sleep(0.5)  # Small delay between attempts
             
             # If no historical data, try yf.download as fallback
             if hist is None or hist.empty:
                 try:
-                    print(f"Trying yf.download for {symbol}...")
-                    hist = yf.download(symbol, period="5d", progress=False)
+                    log.debug("yfinance_download_attempt", symbol=symbol)
+                    with span("yfinance.download", symbol=symbol) as attempt:
+                        hist = yf.download(symbol, period="5d", progress=False)
+                        attempt.set(rows=len(hist))
                     if not hist.empty:
-                        print(f"✅ Download successful: {len(hist)} rows")
+                        log.debug("yfinance_download", symbol=symbol, rows=len(hist))
                 except Exception as e:
-                    print(f"❌ Download failed: {e}")
+                    log.info("yfinance_download_failed", symbol=symbol, error=str(e))
             
             # If we have fast_info, we can proceed even without historical data
             if fast_info and fast_info.get('lastPrice'):
-                print(f"✅ Using fast_info data for {symbol}")
+                log.debug("yfinance_using_fast_info", symbol=symbol)
             # If no fast_info and no historical data, return error
             elif (hist is None or hist.empty):
                 return f"Error: No data available for {symbol}. Yahoo Finance may be rate-limited. Please try again later."
@@ -233,7 +305,8 @@ class YahooFinanceProvider:
             sector = market_cap = pe_ratio = dividend_yield = beta = 'N/A'
             
             try:
-                info = ticker.info
+                with span("yfinance.info", symbol=symbol):
+                    info = ticker.info
                 company_name = info.get('longName', symbol)
                 sector = info.get('sector', 'N/A')
                 market_cap = info.get('marketCap', 'N/A')
@@ -241,7 +314,7 @@ class YahooFinanceProvider:
                 dividend_yield = info.get('dividendYield', 'N/A')
                 beta = info.get('beta', 'N/A')
             except Exception as e:
-                print(f"Warning: Company info failed: {e}")
+                log.info("yfinance_info_failed", symbol=symbol, error=str(e))
                 # Use fast_info for company data if available
                 if fast_info:
                     if fast_info.get('marketCap'):
@@ -369,6 +442,7 @@ class PolygonProvider:
         self.base_url = "https://api.polygon.io"
         self.name = "Polygon.io"
         self.rate_limit = "5 calls/minute (free)"
+        self.quota = (5, MINUTE)
     
     def get_financial_data(self, symbol: str) -> str:
         if not self.api_key:
@@ -413,6 +487,7 @@ class FinnhubProvider:
         self.base_url = "https://finnhub.io/api/v1"
         self.name = "Finnhub"
         self.rate_limit = "60 calls/minute (free)"
+        self.quota = (60, MINUTE)
     
     def get_financial_data(self, symbol: str) -> str:
         if not self.api_key:
@@ -459,15 +534,35 @@ class AlphaVantageProvider:
         self.api_key = os.getenv('ALPHA_VANTAGE_API_KEY', 'demo')  # Use demo key as fallback
         self.name = "Alpha Vantage"
         self.rate_limit = "25 calls/day (free) or demo key (limited)"
+        self.quota = (25, DAY)
+        # Upstream requests per fetch: daily series, SMA and RSI
+        self.calls_per_fetch = 3
         
         if not ALPHA_VANTAGE_AVAILABLE:
             raise ImportError("Alpha Vantage library not installed. Run: pip install alpha_vantage")
         
-        self.ts = TimeSeries(key=self.api_key, output_format='pandas')
-        self.ti = TechIndicators(key=self.api_key, output_format='pandas')
+        # API clients are created on first use
+        self._ts = None
+        self._ti = None
+    
+    @property
+    def ts(self):
+        if self._ts is None:
+            from alpha_vantage.timeseries import TimeSeries
+            self._ts = TimeSeries(key=self.api_key, output_format='pandas')
+        return self._ts
+    
+    @property
+    def ti(self):
+        if self._ti is None:
+            from alpha_vantage.techindicators import TechIndicators
+            self._ti = TechIndicators(key=self.api_key, output_format='pandas')
+        return self._ti
     
     def get_financial_data(self, symbol: str) -> str:
         try:
+            import pandas as pd
+            
             # Add delay to avoid rate limiting
             time.sleep(1)
             
@@ -482,13 +577,13 @@ class AlphaVantageProvider:
                 sma_20, _ = self.ti.get_sma(symbol=symbol, interval='daily', time_period=20)
             except Exception as e:
                 sma_20 = pd.DataFrame()
-                print(f"Warning: Could not fetch SMA data: {str(e)}")
+                log.warning("alpha_vantage_sma_failed", symbol=symbol, error=str(e))
             
             try:
                 rsi, _ = self.ti.get_rsi(symbol=symbol, interval='daily', time_period=14)
             except Exception as e:
                 rsi = pd.DataFrame()
-                print(f"Warning: Could not fetch RSI data: {str(e)}")
+                log.warning("alpha_vantage_rsi_failed", symbol=symbol, error=str(e))
             
             # Format the response
             response = f"Financial Data for {symbol}:\n"
@@ -560,36 +655,52 @@ class MultiProviderFinancialData:
             try:
                 self.providers.append(AlphaVantageProvider())
             except ImportError as e:
-                print(f"Warning: Alpha Vantage provider not available: {e}")
+                log.warning("alpha_vantage_unavailable", error=str(e))
         
         # Note: Mock data provider removed from production
         # It's available in simple_fallback_provider.py for testing only
     
-    def get_financial_data(self, symbol: str) -> str:
+    def get_financial_data(self, symbol: str, min_calls_per_minute: float = 0.0) -> str:
         """
         Try providers in order until one succeeds
+        Providers whose quota is used up are skipped, as are providers whose quota can't
+        sustain min_calls_per_minute (callers polling continuously, like the live quote feed).
         """
         last_error = ""
         
         for i, provider in enumerate(self.providers):
+            budget = provider_budget(provider)
+            cost = getattr(provider, "calls_per_fetch", 1)
+            if budget is not None and budget.per_minute / cost < min_calls_per_minute:
+                log.debug("provider_skipped", provider=provider.name, symbol=symbol, reason="quota_too_low")
+                continue
+            if budget is not None and not budget.try_acquire(cost):
+                log.info("provider_skipped", provider=provider.name, symbol=symbol, reason="quota_exhausted")
+                last_error = f"Error: {provider.name} quota ({provider.rate_limit}) used up"
+                continue
             try:
-                print(f"🔄 Trying provider {i+1}/{len(self.providers)}: {provider.name}")
-                result = provider.get_financial_data(symbol)
+                log.debug("provider_attempt", provider=provider.name, symbol=symbol,
+                          attempt=i + 1, providers=len(self.providers))
+                with span("provider.attempt", provider=provider.name, symbol=symbol, attempt=i + 1) as attempt:
+                    result = provider.get_financial_data(symbol)
+                    if result.startswith("Error:") or result.startswith("All providers failed"):
+                        attempt.fail(result[:200])
                 
                 if not result.startswith("Error:") and not result.startswith("All providers failed"):
-                    print(f"✅ Success with {provider.name}")
+                    log.info("provider_succeeded", provider=provider.name, symbol=symbol, attempt=i + 1)
                     return result
                     
-                print(f"❌ {provider.name} failed: {result[:100]}...")
+                log.warning("provider_failed", provider=provider.name, symbol=symbol, error=result[:100])
                 last_error = result
                 
                 # Small delay between providers to avoid rate limiting
                 if i < len(self.providers) - 1:  # Don't delay after last provider
-                    time.sleep(0.5)
+                    with span("provider.backoff"):
+                        time.sleep(0.5)
                     
             except Exception as e:
                 error_msg = f"Error with {provider.name}: {str(e)}"
-                print(f"❌ {error_msg}")
+                log.warning("provider_error", provider=provider.name, symbol=symbol, error=str(e))
                 last_error = error_msg
                 continue
         
@@ -629,6 +740,9 @@ Note: This system never returns fake/mock data in production."""
         for i, provider in enumerate(self.providers, 1):
             status += f"{i}. {provider.name}\n"
             status += f"   Rate Limit: {provider.rate_limit}\n"
+            budget = provider_budget(provider)
+            if budget is not None:
+                status += f"   Calls Left: {budget.remaining()}/{budget.calls}\n"
             if hasattr(provider, 'api_key'):
                 status += f"   API Key: ✅ Configured\n"
             else:
@@ -0,0 +1,240 @@
+"""
+Structured view of provider output
+Parses the "Label: value" text returned by the data providers into a snapshot dict
+and derives deterministic metrics from it.
+"""
+
+import re
+from typing import Dict, Optional
+
+# Provider labels mapped to snapshot keys
+FIELD_LABELS = {
+    "company": "company",
+    "sector": "sector",
+    "industry": "industry",
+    "data source": "source",
+    "date": "date",
+    "current price": "price",
+    "open": "open",
+    "high": "high",
+    "low": "low",
+    "close": "close",
+    "day high": "day_high",
+    "high (day)": "day_high",
+    "day low": "day_low",
+    "low (day)": "day_low",
+    "previous close": "previous_close",
+    "change": "change",
+    "change %": "change_pct",
+    "price change": "change_pct",
+    "volume": "volume",
+    "average volume": "avg_volume",
+    "market cap": "market_cap",
+    "52-week high": "year_high",
+    "52-week low": "year_low",
+    "52-week range": "year_range_pct",
+    "50-day average": "avg_50d",
+    "200-day average": "avg_200d",
+    "year change": "year_change_pct",
+    "1 week change": "change_1w_pct",
+    "1 month change": "change_1m_pct",
+    "1 year change": "change_1y_pct",
+    "20-day sma": "sma_20",
+    "50-day sma": "sma_50",
+    "14-day rsi": "rsi_14",
+    "p/e ratio": "pe_ratio",
+    "forward p/e": "forward_pe",
+    "dividend": "dividend",
+    "dividend yield": "dividend_yield_pct",
+    "beta": "beta",
+    "return on equity": "roe_pct",
+    "return on assets": "roa_pct",
+    "debt-to-equity": "debt_to_equity",
+    "current ratio": "current_ratio",
+    "highest price (20 days)": "period_high",
+    "lowest price (20 days)": "period_low",
+}
+
+_HEADER = re.compile(r"^Financial Data for ([^\s:(]+)(?: \((.+)\))?:\s*$")
+_FIELD = re.compile(r"^\s*([^:]+?):\s*(.+?)\s*$")
+_NUMBER = re.compile(r"^\$?(-?[\d,]+(?:\.\d+)?)(%?)$")
+
+def _slug(label: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", label.lower()).strip("_")
+
+def _parse_value(raw: str):
+    """Convert "$1,234.50" / "2.5%" / "N/A" to a float or string; None for missing values"""
+    if raw in ("N/A", "None", ""):
+        return None, False
+    match = _NUMBER.match(raw.replace(" ", ""))
+    if match:
+        return float(match.group(1).replace(",", "")), bool(match.group(2))
+    return raw, False
+
+def parse_financial_data(text: str) -> Dict:
+    """Parse provider output into a flat snapshot dict (missing values omitted)"""
+    snapshot = {}
+    for line in text.splitlines():
+        header = _HEADER.match(line.strip())
+        if header:
+            snapshot["symbol"] = header.group(1)
+            if header.group(2):
+                snapshot["company"] = header.group(2)
+            continue
+
+        match = _FIELD.match(line)
+        if not match:
+            continue
+        label, raw = match.group(1).strip(), match.group(2)
+        value, is_percent = _parse_value(raw)
+        if value is None:
+            continue
+
+        key = FIELD_LABELS.get(label.lower(), _slug(label))
+        # "Change" is a dollar amount for some providers and a percentage for others
+        if key == "change" and is_percent:
+            key = "change_pct"
+        if key == "source" and isinstance(value, str):
+            value = value.split(" (")[0]
+        # Keep the first occurrence (providers may repeat e.g. Market Cap)
+        snapshot.setdefault(key, value)
+    return snapshot
+
+def _number(snapshot: Dict, key: str) -> Optional[float]:
+    value = snapshot.get(key)
+    return value if isinstance(value, float) else None
+
+def _pct_from(value: Optional[float], reference: Optional[float]) -> Optional[float]:
+    if value is None or not reference:
+        return None
+    return (value / reference - 1) * 100
+
+def derive_metrics(snapshot: Dict) -> Dict:
+    """Deterministic metrics computed from a parsed snapshot; unavailable metrics are omitted"""
+    price = _number(snapshot, "price") or _number(snapshot, "close")
+    metrics = {}
+
+    if price is not None:
+        metrics["price"] = price
+        metrics["change_pct"] = _number(snapshot, "change_pct") or _pct_from(price, _number(snapshot, "previous_close"))
+        for key, label in (("sma_20", "vs_sma_20_pct"), ("sma_50", "vs_sma_50_pct"),
+                           ("avg_50d", "vs_avg_50d_pct"), ("avg_200d", "vs_avg_200d_pct")):
+            metrics[label] = _pct_from(price, _number(snapshot, key))
+
+        year_high, year_low = _number(snapshot, "year_high"), _number(snapshot, "year_low")
+        if year_high and year_low and year_high > year_low:
+            metrics["year_range_position_pct"] = (price - year_low) / (year_high - year_low) * 100
+            metrics["below_year_high_pct"] = (1 - price / year_high) * 100
+
+        day_high = _number(snapshot, "day_high") or _number(snapshot, "high")
+        day_low = _number(snapshot, "day_low") or _number(snapshot, "low")
+        if day_high and day_low:
+            metrics["day_range_pct"] = (day_high - day_low) / day_low * 100
+
+    pe_ratio = _number(snapshot, "pe_ratio")
+    if pe_ratio and pe_ratio > 0:
+        metrics["earnings_yield_pct"] = 100 / pe_ratio
+
+    rsi = _number(snapshot, "rsi_14")
+    if rsi is not None:
+        metrics["rsi_14"] = rsi
+        metrics["rsi_signal"] = "overbought" if rsi >= 70 else "oversold" if rsi <= 30 else "neutral"
+
+    volume, avg_volume = _number(snapshot, "volume"), _number(snapshot, "avg_volume")
+    if volume and avg_volume:
+        metrics["relative_volume"] = volume / avg_volume
+
+    return {key: value for key, value in metrics.items() if value is not None}
+
+# Snapshot keys in prompt order with their compact labels and formats
+COMPACT_FIELDS = [
+    ("price", "price", "money"),
+    ("change_pct", "chg%", "pct"),
+    ("open", "open", "money"),
+    ("high", "high", "money"),
+    ("low", "low", "money"),
+    ("close", "close", "money"),
+    ("day_high", "day_hi", "money"),
+    ("day_low", "day_lo", "money"),
+    ("previous_close", "prev_close", "money"),
+    ("volume", "vol", "count"),
+    ("avg_volume", "avg_vol", "count"),
+    ("market_cap", "mcap", "count"),
+    ("year_high", "52w_hi", "money"),
+    ("year_low", "52w_lo", "money"),
+    ("avg_50d", "avg50d", "money"),
+    ("avg_200d", "avg200d", "money"),
+    ("period_high", "hi_20d", "money"),
+    ("period_low", "lo_20d", "money"),
+    ("change_1w_pct", "chg1w%", "pct"),
+    ("change_1m_pct", "chg1m%", "pct"),
+    ("change_1y_pct", "chg1y%", "pct"),
+    ("year_change_pct", "chg1y%", "pct"),
+    ("sma_20", "sma20", "money"),
+    ("sma_50", "sma50", "money"),
+    ("rsi_14", "rsi14", "ratio"),
+    ("pe_ratio", "pe", "ratio"),
+    ("forward_pe", "fwd_pe", "ratio"),
+    ("dividend", "div", "money"),
+    ("dividend_yield_pct", "div_yield%", "pct"),
+    ("beta", "beta", "ratio"),
+    ("roe_pct", "roe%", "pct"),
+    ("roa_pct", "roa%", "pct"),
+    ("debt_to_equity", "debt_eq", "ratio"),
+    ("current_ratio", "cur_ratio", "ratio"),
+]
+
+# Header keys, keys that only restate other fields and provider prose
+_COMPACT_SKIP = {"symbol", "company", "sector", "industry", "source", "date", "change", "year_range_pct", "note"}
+
+def _abbreviate(value: float) -> str:
+    for divisor, suffix in ((1e12, "T"), (1e9, "B"), (1e6, "M"), (1e3, "K")):
+        if abs(value) >= divisor:
+            return f"{value / divisor:.2f}{suffix}"
+    return f"{value:.0f}"
+
+def _format_compact(value, kind: str = "ratio") -> str:
+    if not isinstance(value, float):
+        return str(value)
+    if kind == "count":
+        return _abbreviate(value)
+    return f"{value:.2f}"
+
+def encode_compact(snapshot: Dict, metrics: Optional[Dict] = None) -> str:
+    """
+    Dense prompt encoding of a snapshot: a header line plus space-separated key=value pairs
+    Prices and ratios use two decimals, large counts are abbreviated (2.91T, 52.30M) and
+    missing fields are left out. Unknown provider fields follow under their slug.
+    """
+    header = snapshot.get("symbol", "")
+    if snapshot.get("company") and snapshot.get("company") != header:
+        header += f" ({snapshot['company']})"
+    for key in ("sector", "industry", "source", "date"):
+        if snapshot.get(key):
+            header += f" | {key}={snapshot[key]}"
+
+    pairs = []
+    seen_labels = set()
+    for key, label, kind in COMPACT_FIELDS:
+        if key in snapshot and label not in seen_labels:
+            pairs.append(f"{label}={_format_compact(snapshot[key], kind)}")
+            seen_labels.add(label)
+
+    known = {key for key, _, _ in COMPACT_FIELDS} | _COMPACT_SKIP
+    for key, value in snapshot.items():
+        if key not in known:
+            pairs.append(f"{key}={_format_compact(value)}")
+
+    lines = [header.strip(), " ".join(pairs)]
+    if metrics:
+        lines.append("derived: " + " ".join(f"{key}={_format_compact(value)}" for key, value in metrics.items()))
+    return "\n".join(line for line in lines if line)
+
+def compact_financial_data(text: str) -> str:
+    """Compact encoding of provider output; errors and unparseable text are returned unchanged"""
+    if text.startswith("Error"):
+        return text
+    snapshot = parse_financial_data(text)
+    if not any(isinstance(value, float) for value in snapshot.values()):
+        return text
+    return encode_compact(snapshot)
@@ -0,0 +1,309 @@
+"""
+Record/replay for provider HTTP traffic
+Every data provider reaches the network through requests (FMP, Polygon and Finnhub
+directly, yfinance and alpha_vantage underneath), so this layer hooks
+requests.Session.send for the provider hosts; other traffic, such as Ollama calls over
+the shared LLM session, goes to the network untouched:
+- record: real responses are appended to a cassette along with how long they took
+- replay: requests are redirected to a local stand-in server that answers from the
+  cassette after each response's original latency, so provider code runs its full
+  HTTP path against realistic payloads with no network
+Cassettes are JSON lines, one interaction per line, gzip-compressed when the path ends
+in .gz. API keys and other secret query parameters are never written to them.
+"""
+
+import base64
+import gzip
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit
+
+import requests
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+HTTP_CASSETTE = os.getenv('HTTP_CASSETTE', '')
+# off, record or replay
+HTTP_CASSETTE_MODE = os.getenv('HTTP_CASSETTE_MODE', 'off')
+# Multiplier on recorded latencies when replaying; 0 answers immediately
+HTTP_REPLAY_SPEED = float(os.getenv('HTTP_REPLAY_SPEED', '1'))
+
+MODES = ("off", "record", "replay")
+# Hosts (and their subdomains) recorded or replayed
+PROVIDER_HOSTS = ("financialmodelingprep.com", "polygon.io", "finnhub.io", "alphavantage.co", "yahoo.com")
+HTTP_CASSETTE_HOSTS = tuple(host.strip().lower() for host in
+                            os.getenv('HTTP_CASSETTE_HOSTS', ",".join(PROVIDER_HOSTS)).split(",") if host.strip())
+# Dropped from recorded URLs and ignored when matching requests
+SECRET_PARAMS = {"apikey", "api_key", "token", "key", "crumb"}
+# Change on every run without changing the payload asked for (yfinance's time range
+# ends at "now", jQuery-style cache busters); ignored only when no exact match exists
+VOLATILE_PARAMS = {"period1", "period2", "_"}
+# Headers describing the original transfer or session rather than the payload
+SKIPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection",
+                   "keep-alive", "set-cookie", "date", "server"}
+
+def redact_url(url: str) -> str:
+    """The URL without secret query parameters, with the remaining ones sorted"""
+    parts = urlsplit(url)
+    query = sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if name.lower() not in SECRET_PARAMS)
+    return parts._replace(query=urlencode(query), fragment="").geturl()
+
+def matches_host(url: str, hosts) -> bool:
+    """Whether the URL's host is one of hosts or a subdomain of one"""
+    host = (urlsplit(url).hostname or "").lower()
+    return any(host == name or host.endswith("." + name) for name in hosts)
+
+def _stable_key(method: str, url: str) -> str:
+    parts = urlsplit(url)
+    query = [(name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+             if name.lower() not in VOLATILE_PARAMS]
+    return f"{method.upper()} {parts._replace(query=urlencode(query)).geturl()}"
+
+class Cassette:
+    """
+    Recorded interactions
+    A request matches interactions with the same method and redacted URL, served in
+    recording order (the last one repeats); failing that, the same URL apart from
+    VOLATILE_PARAMS. Any other difference in the query is a miss.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.interactions: List[Dict] = []
+        self.hits = 0
+        self.misses = 0
+        self._by_url: Dict[str, List[Dict]] = {}
+        self._by_stable_url: Dict[str, List[Dict]] = {}
+        self._served: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _open(self, mode: str):
+        if self.path.endswith(".gz"):
+            return gzip.open(self.path, mode + "t", encoding="utf-8")
+        return open(self.path, mode, encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        cassette = cls(path)
+        with cassette._open("r") as f:
+            for line in f:
+                if line.strip():
+                    cassette._index(json.loads(line))
+        return cassette
+
+    def _index(self, interaction: Dict):
+        self.interactions.append(interaction)
+        method, url = interaction["method"], interaction["url"]
+        self._by_url.setdefault(f"{method} {url}", []).append(interaction)
+        self._by_stable_url.setdefault(_stable_key(method, url), []).append(interaction)
+
+    def append(self, interaction: Dict):
+        """Add an interaction and write it out straight away, so a crashed run keeps what it recorded"""
+        with self._lock:
+            self._index(interaction)
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            with self._open("a") as f:
+                f.write(json.dumps(interaction, separators=(",", ":")) + "\n")
+
+    def match(self, method: str, url: str) -> Optional[Dict]:
+        method, url = method.upper(), redact_url(url)
+        with self._lock:
+            for key, candidates in ((f"{method} {url}", self._by_url), (_stable_key(method, url), self._by_stable_url)):
+                found = candidates.get(key)
+                if found:
+                    served = self._served.get(key, 0)
+                    self._served[key] = served + 1
+                    self.hits += 1
+                    return found[min(served, len(found) - 1)]
+            self.misses += 1
+            return None
+
+def record_interaction(request: requests.PreparedRequest, response: requests.Response, elapsed: float) -> Dict:
+    content = response.content or b""
+    interaction = {
+        "method": request.method,
+        "url": redact_url(request.url),
+        "status": response.status_code,
+        "headers": [[name, value] for name, value in response.headers.items()
+                    if name.lower() not in SKIPPED_HEADERS],
+        "ms": round(elapsed * 1000, 1),
+    }
+    try:
+        interaction["body"] = content.decode("utf-8")
+    except UnicodeDecodeError:
+        interaction["body_b64"] = base64.b64encode(content).decode("ascii")
+    return interaction
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _serve(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        scheme, _, rest = self.path.lstrip("/").partition("/")
+        url = f"{scheme}://{rest}"
+        interaction = self.server.cassette.match(self.command, url)
+
+        if interaction is None:
+            status, headers = 404, [["Content-Type", "application/json"], ["X-Cassette", "miss"]]
+            body = json.dumps({"error": f"No recorded response for {self.command} {redact_url(url)}"}).encode()
+        else:
+            time.sleep(interaction["ms"] / 1000 * self.server.speed)
+            status, headers = interaction["status"], interaction["headers"]
+            body = (base64.b64decode(interaction["body_b64"]) if "body_b64" in interaction
+                    else interaction.get("body", "").encode("utf-8"))
+
+        self.send_response(status)
+        for name, value in headers:
+            if name.lower() == "location":
+                value = self.server.local_url(urljoin(url, value))
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_PATCH = do_HEAD = _serve
+
+    def log_message(self, format, *args):
+        pass
+
+class ReplayServer:
+    """Local stand-in for every host in a cassette; requests reach it as /<scheme>/<host>/<path>"""
+
+    def __init__(self, cassette: Cassette, speed: float = HTTP_REPLAY_SPEED, host: str = "127.0.0.1", port: int = 0):
+        self.cassette = cassette
+        self.speed = speed
+        self._server = ThreadingHTTPServer((host, port), _ReplayHandler)
+        self._server.daemon_threads = True
+        self._server.cassette = cassette
+        self._server.speed = speed
+        self._server.local_url = self.local_url
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def local_url(self, url: str) -> str:
+        parts = urlsplit(url)
+        local = f"{self.url}/{parts.scheme}/{parts.netloc}{parts.path}"
+        return f"{local}?{parts.query}" if parts.query else local
+
+    def start(self) -> "ReplayServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="http-replay", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def send(self, session: requests.Session, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        if request.url.startswith(self.url):
+            # A redirect the server already pointed back at itself
+            return _original_send(session, request, **kwargs)
+        original_url = request.url
+        request.url = self.local_url(original_url)
+        kwargs["proxies"] = {}
+        try:
+            response = _original_send(session, request, **kwargs)
+        finally:
+            request.url = original_url
+        response.url = original_url
+        return response
+
+_original_send = requests.Session.send
+_recorder: Optional[Cassette] = None
+_replayer: Optional[ReplayServer] = None
+_hosts = HTTP_CASSETTE_HOSTS
+
+def _send(session, request, **kwargs):
+    if not matches_host(request.url, _hosts):
+        return _original_send(session, request, **kwargs)
+    if _replayer is not None:
+        return _replayer.send(session, request, **kwargs)
+    if _recorder is not None:
+        started = time.perf_counter()
+        response = _original_send(session, request, **kwargs)
+        response.content  # read the body so it is part of the timing
+        _recorder.append(record_interaction(request, response, time.perf_counter() - started))
+        return response
+    return _original_send(session, request, **kwargs)
+
+def _install_hook():
+    if requests.Session.send is not _send:
+        requests.Session.send = _send
+
+def start_recording(path: str, hosts=HTTP_CASSETTE_HOSTS) -> Cassette:
+    """Append every HTTP response from hosts to the cassette at path until stop() is called"""
+    global _recorder, _hosts
+    _install_hook()
+    _hosts = tuple(hosts)
+    _recorder = Cassette.load(path) if os.path.exists(path) else Cassette(path)
+    return _recorder
+
+def start_replay(path: str, speed: float = HTTP_REPLAY_SPEED, hosts=HTTP_CASSETTE_HOSTS) -> ReplayServer:
+    """Serve every HTTP request to hosts from the cassette at path until stop() is called"""
+    global _replayer, _hosts
+    _install_hook()
+    _hosts = tuple(hosts)
+    _replayer = ReplayServer(Cassette.load(path), speed).start()
+    return _replayer
+
+def stop():
+    global _recorder, _replayer
+    if _replayer is not None:
+        _replayer.stop()
+    _recorder = _replayer = None
+
+@contextmanager
+def recording(path: str, hosts=HTTP_CASSETTE_HOSTS):
+    cassette = start_recording(path, hosts)
+    try:
+        yield cassette
+    finally:
+        stop()
+
+@contextmanager
+def replaying(path: str, speed: float = HTTP_REPLAY_SPEED, hosts=HTTP_CASSETTE_HOSTS):
+    server = start_replay(path, speed, hosts)
+    try:
+        yield server
+    finally:
+        stop()
+
+def install_from_env():
+    """Start recording or replaying as configured by HTTP_CASSETTE and HTTP_CASSETTE_MODE"""
+    if HTTP_CASSETTE_MODE not in MODES:
+        raise ValueError(f"Unknown HTTP_CASSETTE_MODE '{HTTP_CASSETTE_MODE}'. Expected one of: {', '.join(MODES)}")
+    if HTTP_CASSETTE_MODE == "off" or _recorder is not None or _replayer is not None:
+        return
+    if not HTTP_CASSETTE:
+        raise ValueError(f"HTTP_CASSETTE_MODE={HTTP_CASSETTE_MODE} needs HTTP_CASSETTE set to a cassette path")
+    if HTTP_CASSETTE_MODE == "record":
+        start_recording(HTTP_CASSETTE)
+    else:
+        start_replay(HTTP_CASSETTE)
+
+def get_status() -> Dict:
+    cassette = _replayer.cassette if _replayer is not None else _recorder
+    return {
+        "mode": "replay" if _replayer is not None else "record" if _recorder is not None else "off",
+        "cassette": cassette.path if cassette else None,
+        "hosts": list(_hosts),
+        "interactions": len(cassette.interactions) if cassette else 0,
+        "hits": cassette.hits if cassette else 0,
+        "misses": cassette.misses if cassette else 0,
+    }
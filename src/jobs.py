@@ -0,0 +1,230 @@
+"""
+Background jobs for long analyses
+Submitted jobs return an id immediately and are run by a bounded pool of worker
+tasks. Clients poll a job's status or subscribe to its progress events, and
+finished jobs are kept for a TTL so results survive client reconnects.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from concurrency import LLM_MAX_CONCURRENCY
+from tracing import TRACE_ENABLED, trace
+
+JOB_MAX_WORKERS = int(os.getenv('JOB_MAX_WORKERS', str(LLM_MAX_CONCURRENCY)))
+JOB_MAX_PENDING = int(os.getenv('JOB_MAX_PENDING', '32'))
+JOB_RESULT_TTL = float(os.getenv('JOB_RESULT_TTL', '3600'))
+JOB_MAX_STORED = int(os.getenv('JOB_MAX_STORED', '1000'))
+
+# A runner receives the job parameters and an emit(event, data) callback and returns the result
+Emit = Callable[[str, dict], Awaitable[None]]
+Runner = Callable[[dict, Emit], Awaitable[dict]]
+
+FINISHED = ("succeeded", "failed", "cancelled")
+
+class JobQueueFull(Exception):
+    """Raised when a job cannot be queued; retry_after is a wait estimate in seconds"""
+
+    def __init__(self, retry_after: int):
+        self.retry_after = retry_after
+        super().__init__(f"Job queue is full. Retry after {retry_after}s.")
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    params: dict
+    status: str = "queued"
+    stage: Optional[str] = None
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    # Stage and error events, replayed to late subscribers; tokens are only sent live
+    events: List[dict] = field(default_factory=list)
+    subscribers: List[asyncio.Queue] = field(default_factory=list, repr=False)
+    cancel_requested: bool = False
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED
+
+    def as_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "stage": self.stage,
+            "events": self.events,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+class JobManager:
+    """
+    Queue of background jobs served by max_workers worker tasks
+
+    submit() rejects new work with JobQueueFull once max_pending jobs are waiting.
+    Finished jobs are dropped result_ttl seconds after they finish, or oldest first
+    when more than max_stored jobs are kept.
+    """
+
+    def __init__(self, runners: Dict[str, Runner], max_workers: int = JOB_MAX_WORKERS,
+                 max_pending: int = JOB_MAX_PENDING, result_ttl: float = JOB_RESULT_TTL,
+                 max_stored: int = JOB_MAX_STORED):
+        self.runners = runners
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self.max_stored = max_stored
+        self.jobs: Dict[str, Job] = {}
+        self._queue = None
+        self._workers = []
+        # Smoothed job duration, used for Retry-After estimates
+        self._service_time = 30.0
+
+    def start(self):
+        """Start the worker tasks on the running event loop"""
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.max_workers)]
+
+    async def stop(self):
+        """Cancel the workers and any running jobs"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    @property
+    def pending(self) -> int:
+        return sum(1 for job in self.jobs.values() if job.status == "queued")
+
+    def submit(self, kind: str, params: dict) -> Job:
+        if kind not in self.runners:
+            raise ValueError(f"Unknown job kind '{kind}'. Expected one of: {', '.join(self.runners)}")
+        if self._queue is None:
+            raise RuntimeError("Job workers are not running")
+        self.purge()
+        if self.pending >= self.max_pending:
+            retry_after = max(1, int(self._service_time * (self.pending + 1) / self.max_workers))
+            raise JobQueueFull(retry_after)
+
+        job = Job(id=uuid.uuid4().hex, kind=kind, params=params)
+        self.jobs[job.id] = job
+        self._queue.put_nowait(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self.purge()
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.get(job_id)
+        if job is None or job.done:
+            return job
+        job.cancel_requested = True
+        if job.task is not None:
+            job.task.cancel()
+        else:
+            # Still queued; the worker skips it when it comes up
+            self._finish(job, "cancelled", error="Cancelled")
+        return job
+
+    def subscribe(self, job: Job) -> asyncio.Queue:
+        """Queue of the job's events so far followed by live ones, ending with a 'done' event"""
+        queue = asyncio.Queue()
+        for event in job.events:
+            queue.put_nowait((event["event"], event["data"]))
+        if job.done:
+            queue.put_nowait(("done", job.as_dict()))
+        else:
+            job.subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, job: Job, queue: asyncio.Queue):
+        if queue in job.subscribers:
+            job.subscribers.remove(queue)
+
+    def purge(self):
+        """Drop finished jobs past their TTL, then the oldest finished jobs over max_stored"""
+        now = time.time()
+        for job_id, job in list(self.jobs.items()):
+            if job.done and now - job.finished_at > self.result_ttl:
+                del self.jobs[job_id]
+
+        excess = len(self.jobs) - self.max_stored
+        if excess > 0:
+            finished = sorted((job for job in self.jobs.values() if job.done), key=lambda job: job.finished_at)
+            for job in finished[:excess]:
+                del self.jobs[job.id]
+
+    def _publish(self, job: Job, event: str, data: dict):
+        for queue in job.subscribers:
+            queue.put_nowait((event, data))
+
+    def _emitter(self, job: Job) -> Emit:
+        async def emit(event: str, data: dict):
+            if event != "token":
+                if event == "stage":
+                    job.stage = data.get("stage")
+                job.events.append({"event": event, "data": data, "at": time.time()})
+            self._publish(job, event, data)
+        return emit
+
+    def _finish(self, job: Job, status: str, result: Optional[dict] = None, error: Optional[str] = None):
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished_at = time.time()
+        job.task = None
+        self._publish(job, "done", job.as_dict())
+        job.subscribers.clear()
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            if job.done:
+                continue
+
+            job.status = "running"
+            job.started_at = time.time()
+            # The job's task is created inside the trace, so its spans are collected there
+            with trace(f"job {job.kind}", **{"job.id": job.id}) if TRACE_ENABLED else nullcontext():
+                job.task = asyncio.create_task(self.runners[job.kind](job.params, self._emitter(job)))
+                try:
+                    result = await job.task
+                    self._finish(job, "succeeded", result=result)
+                except asyncio.CancelledError:
+                    self._finish(job, "cancelled", error="Cancelled")
+                    if not job.cancel_requested:
+                        # The worker itself is shutting down
+                        raise
+                except Exception as e:
+                    self._finish(job, "failed", error=str(e))
+                finally:
+                    self._service_time = 0.8 * self._service_time + 0.2 * (time.time() - job.started_at)
+
+    def get_status(self) -> Dict:
+        self.purge()
+        counts = {}
+        for job in self.jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "result_ttl": self.result_ttl,
+            "stored": len(self.jobs),
+            "jobs": counts,
+            "service_time_estimate": round(self._service_time, 3)
+        }
@@ -0,0 +1,162 @@
+"""
+Shared LLM clients
+One LangChain LLM per model and one async client per process, all reusing pooled
+HTTP connections to Ollama, plus a start-up warm-up that loads the models before
+the first real request needs them.
+"""
+
+import asyncio
+import os
+import threading
+from typing import Dict, List
+
+from dotenv import load_dotenv
+
+from concurrency import LLM_MAX_CONCURRENCY
+from context_packer import context_window_for
+from llm_scheduler import LLMScheduler
+from model_router import DEFAULT_ROUTES, Task
+from ollama_client import AsyncOllamaClient, ModelNotFound, pin_model
+from structured_logging import get_logger
+
+# Load environment variables
+load_dotenv()
+
+OLLAMA_BASE_URL = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
+
+log = get_logger("warmup")
+
+# Pooled connections kept open to Ollama for synchronous (LangChain) calls
+LLM_HTTP_POOL_SIZE = int(os.getenv('LLM_HTTP_POOL_SIZE', '8'))
+
+_lock = threading.Lock()
+_http_session = None
+_llms = {}
+_async_client = None
+
+def http_session():
+    """Process-wide requests session, so LangChain calls reuse TCP connections"""
+    global _http_session
+    with _lock:
+        if _http_session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=LLM_HTTP_POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _http_session = session
+        return _http_session
+
+class LazyLLM:
+    """
+    Stand-in for a shared LangChain LLM that builds it on first use
+    Importing LangChain takes seconds, so callers can hold an LLM from start-up
+    without paying for it until the first generation.
+    """
+
+    def __init__(self, model: str, temperature: float, base_url: str = OLLAMA_BASE_URL):
+        self.model = model
+        self.temperature = temperature
+        self.base_url = base_url
+        self._llm = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            if self._llm is None:
+                from pooled_ollama import PooledOllama
+                self._llm = PooledOllama(model=self.model, temperature=self.temperature, base_url=self.base_url)
+            return self._llm
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+def get_llm(task: Task = Task.ANALYSIS) -> LazyLLM:
+    """Shared LangChain LLM for the task's primary model, loaded on first use"""
+    route = DEFAULT_ROUTES[task]
+    key = (route.model, route.temperature)
+    with _lock:
+        if key not in _llms:
+            _llms[key] = LazyLLM(route.model, route.temperature)
+        return _llms[key]
+
+def get_async_client() -> AsyncOllamaClient:
+    """Shared async client (and LLM scheduler) used by the web application"""
+    global _async_client
+    with _lock:
+        if _async_client is None:
+            route = DEFAULT_ROUTES[Task.ANALYSIS]
+            _async_client = AsyncOllamaClient(
+                model=route.model,
+                temperature=route.temperature,
+                base_url=OLLAMA_BASE_URL,
+                scheduler=LLMScheduler(LLM_MAX_CONCURRENCY),
+                num_ctx=context_window_for(route.model)
+            )
+        return _async_client
+
+def warmup_models() -> List[str]:
+    """Models to load at start-up: LLM_WARMUP_MODELS, or every task's primary and fallback model"""
+    configured = os.getenv('LLM_WARMUP_MODELS')
+    if configured is not None:
+        return [model.strip() for model in configured.split(",") if model.strip() and model.strip() != "none"]
+    models = [route.model for route in DEFAULT_ROUTES.values()]
+    models += [route.fallback for route in DEFAULT_ROUTES.values() if route.fallback]
+    return list(dict.fromkeys(models))
+
+class ModelWarmup:
+    """
+    Loads models into Ollama in the background and tracks readiness
+    Failed loads (e.g. Ollama not started yet) are retried with backoff until they succeed.
+    A model Ollama doesn't have is marked "missing" with the `ollama pull` that fixes it,
+    and is still retried so readiness follows once it has been pulled.
+    The models are pinned, so Ollama doesn't unload them after a quiet spell while
+    /ready still reports them loaded.
+    """
+
+    def __init__(self, client: AsyncOllamaClient, models: List[str],
+                 retry_interval: float = 2.0, max_retry_interval: float = 30.0):
+        self.client = client
+        self.models = {model: "pending" for model in models}
+        for model in models:
+            pin_model(model)
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self.error = None
+
+    @property
+    def ready(self) -> bool:
+        return all(state == "ready" for state in self.models.values())
+
+    async def run(self):
+        delay = self.retry_interval
+        while not self.ready:
+            for model, state in self.models.items():
+                if state == "ready":
+                    continue
+                try:
+                    await self.client.load(model)
+                    self.models[model] = "ready"
+                    log.info("model_warmed", model=model)
+                except ModelNotFound as e:
+                    if state != "missing":
+                        log.error("model_missing", model=model, fix=f"ollama pull {model}")
+                    self.models[model] = "missing"
+                    self.error = str(e)
+                except Exception as e:
+                    self.models[model] = "failed"
+                    self.error = f"{model}: {e}"
+            if not self.ready:
+                log.warning("warmup_incomplete", error=self.error, retry_in_s=round(delay))
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_retry_interval)
+        self.error = None
+
+    @property
+    def missing(self) -> List[str]:
+        return [model for model, state in self.models.items() if state == "missing"]
+
+    def get_status(self) -> Dict:
+        return {"ready": self.ready, "models": dict(self.models), "missing": self.missing, "error": self.error}
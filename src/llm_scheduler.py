@@ -0,0 +1,171 @@
+"""
+LLM request scheduler
+Bounded concurrency pool in front of the model server with priority classes,
+queue-depth admission control and queue-wait metrics.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Dict, Optional
+
+class Priority(IntEnum):
+    """Lower values are served first"""
+    INTERACTIVE = 0  # conversation and feedback
+    ANALYSIS = 1     # initial analysis and critique
+    BATCH = 2        # background and batch work
+
+DEFAULT_QUEUE_LIMITS = {
+    Priority.INTERACTIVE: int(os.getenv('LLM_QUEUE_LIMIT_INTERACTIVE', '32')),
+    Priority.ANALYSIS: int(os.getenv('LLM_QUEUE_LIMIT_ANALYSIS', '16')),
+    Priority.BATCH: int(os.getenv('LLM_QUEUE_LIMIT_BATCH', '64')),
+}
+DEFAULT_MAX_QUEUE = int(os.getenv('LLM_MAX_QUEUE', '96'))
+
+class SchedulerOverloaded(Exception):
+    """
+    Raised when a request cannot be admitted
+    status_code is 429 when the priority class's queue is full and 503 when the
+    scheduler as a whole is saturated; retry_after is a wait estimate in seconds.
+    """
+
+    def __init__(self, priority: Priority, retry_after: int, status_code: int):
+        self.priority = priority
+        self.retry_after = retry_after
+        self.status_code = status_code
+        super().__init__(
+            f"LLM queue is full for {priority.name.lower()} requests. Retry after {retry_after}s."
+        )
+
+class _ClassMetrics:
+    def __init__(self, window: int = 512):
+        self.admitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.waits = deque(maxlen=window)
+
+    def snapshot(self, queued: int) -> Dict:
+        waits = sorted(self.waits)
+
+        def percentile(p):
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))], 4)
+
+        return {
+            "queued": queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "queue_wait_p50": percentile(0.50),
+            "queue_wait_p95": percentile(0.95),
+            "queue_wait_max": round(waits[-1], 4) if waits else 0.0
+        }
+
+class LLMScheduler:
+    """
+    Priority scheduler for LLM generations
+
+    check_admission() is called before a request starts (so streaming endpoints can
+    still answer 429/503); slot() then waits for one of max_concurrency slots, with
+    waiting requests served by priority class and then arrival order.
+    """
+
+    def __init__(self, max_concurrency: int, queue_limits: Optional[Dict[Priority, int]] = None,
+                 max_queue: int = DEFAULT_MAX_QUEUE):
+        self.max_concurrency = max(1, max_concurrency)
+        self.queue_limits = {**DEFAULT_QUEUE_LIMITS, **(queue_limits or {})}
+        self.max_queue = max_queue
+        self.active = 0
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._queued = {priority: 0 for priority in Priority}
+        self._metrics = {priority: _ClassMetrics() for priority in Priority}
+        # Smoothed time a generation holds a slot, used for Retry-After estimates
+        self._service_time = 10.0
+
+    @property
+    def queued(self) -> int:
+        return sum(self._queued.values())
+
+    def retry_after(self, priority: Priority) -> int:
+        """Estimated seconds until a new request of this priority would start"""
+        ahead = sum(count for p, count in self._queued.items() if p <= priority)
+        return max(1, math.ceil(self._service_time * (ahead + 1) / self.max_concurrency))
+
+    def check_admission(self, priority: Priority):
+        """Raise SchedulerOverloaded if a new request of this priority should be turned away"""
+        if self.queued >= self.max_queue:
+            self._metrics[priority].rejected += 1
+            raise SchedulerOverloaded(priority, self.retry_after(priority), 503)
+        if self._queued[priority] >= self.queue_limits[priority]:
+            self._metrics[priority].rejected += 1
+            raise SchedulerOverloaded(priority, self.retry_after(priority), 429)
+
+    async def _acquire(self, priority: Priority):
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        entry = [priority, next(self._sequence), future]
+        heapq.heappush(self._waiters, entry)
+        self._queued[priority] += 1
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed to us just as we were cancelled; pass it on
+                self._release()
+            else:
+                entry[2] = None
+            raise
+        finally:
+            self._queued[priority] -= 1
+
+    def _release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if future is not None and not future.done():
+                # Hand the slot straight to the next waiter
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority = Priority.INTERACTIVE):
+        """Hold one generation slot for the duration of the block"""
+        metrics = self._metrics[priority]
+        metrics.admitted += 1
+        queued_at = time.monotonic()
+        await self._acquire(priority)
+        started_at = time.monotonic()
+        metrics.waits.append(started_at - queued_at)
+        try:
+            yield
+        finally:
+            self._service_time = 0.8 * self._service_time + 0.2 * (time.monotonic() - started_at)
+            metrics.completed += 1
+            self._release()
+
+    def get_status(self) -> Dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self.active,
+            "queued": self.queued,
+            "max_queue": self.max_queue,
+            "service_time_estimate": round(self._service_time, 3),
+            "classes": {
+                priority.name.lower(): {
+                    "queue_limit": self.queue_limits[priority],
+                    **self._metrics[priority].snapshot(self._queued[priority])
+                }
+                for priority in Priority
+            }
+        }
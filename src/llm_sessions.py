@@ -0,0 +1,109 @@
+"""
+Session-aware LLM client for ongoing conversations
+Reuses the context Ollama returns after each generation so a follow-up turn only
+sends (and prefills) the new message instead of the whole conversation.
+"""
+
+import hashlib
+from array import array
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from ollama_client import AsyncOllamaClient
+from llm_scheduler import Priority
+
+class SessionAwareOllamaClient:
+    """
+    Maps a conversation transcript to the Ollama context that represents it
+
+    After a turn, the returned context is stored under the key of the transcript the
+    client will send back next time (history + user message + assistant response).
+    When a request arrives with that exact history, only the byte-stable turn prompt
+    is sent along with the stored context.
+    """
+
+    def __init__(self, client: AsyncOllamaClient, max_sessions: int = 256,
+                 max_context_tokens: Optional[int] = None):
+        self.client = client
+        self.max_sessions = max_sessions
+        self.max_context_tokens = max_context_tokens
+        self._contexts = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def transcript_key(scope: str, history: List[dict]) -> str:
+        """Stable key for a conversation scope (e.g. company) and its message history"""
+        digest = hashlib.sha256(scope.upper().encode("utf-8"))
+        for message in history:
+            digest.update(b"\x1e")
+            digest.update(message.get('role', '').encode("utf-8"))
+            digest.update(b"\x1f")
+            digest.update(message.get('content', '').encode("utf-8"))
+        return digest.hexdigest()
+
+    def _lookup(self, key: str) -> Optional[array]:
+        context = self._contexts.get(key)
+        if context is not None:
+            self._contexts.move_to_end(key)
+        return context
+
+    def _store(self, key: str, context: List[int]):
+        # array('i') keeps long token contexts compact
+        self._contexts[key] = array('i', context)
+        self._contexts.move_to_end(key)
+        while len(self._contexts) > self.max_sessions:
+            self._contexts.popitem(last=False)
+
+    async def astream_turn(self, scope: str, history: List[dict], message: str,
+                           turn_prompt: str,
+                           full_prompt: Callable[[], Awaitable[str]],
+                           turn_tokens: int = 0,
+                           stats: Optional[Dict] = None,
+                           priority: Priority = Priority.INTERACTIVE,
+                           model: Optional[str] = None, **options):
+        """
+        Stream the response to a new user message
+
+        turn_prompt: just the new turn, sent when the conversation's context is cached
+        full_prompt: coroutine building the complete prompt, used on a cache miss or
+            when the cached context plus the new turn would exceed max_context_tokens
+        model: model for this turn; contexts are only reused with the model that produced them
+        """
+        stats = stats if stats is not None else {}
+        scope = f"{model or self.client.model}\x1d{scope}"
+        context = self._lookup(self.transcript_key(scope, history))
+
+        if context is not None and (self.max_context_tokens is None
+                                    or len(context) + turn_tokens <= self.max_context_tokens):
+            self.hits += 1
+            prompt = turn_prompt
+            stats["kv_reused"] = True
+        else:
+            self.misses += 1
+            prompt = await full_prompt()
+            context = None
+            stats["kv_reused"] = False
+
+        done = {}
+        parts = []
+        async for text in self.client.astream(prompt, context=context, on_done=done.update,
+                                            priority=priority, model=model, **options):
+            parts.append(text)
+            yield text
+
+        stats["prompt_eval_count"] = done.get("prompt_eval_count")
+        if done.get("context"):
+            stats["context_tokens"] = len(done["context"])
+            next_history = history + [
+                {'role': 'user', 'content': message},
+                {'role': 'assistant', 'content': "".join(parts)}
+            ]
+            self._store(self.transcript_key(scope, next_history), done["context"])
+
+    def get_status(self) -> Dict:
+        return {
+            "sessions": len(self._contexts),
+            "hits": self.hits,
+            "misses": self.misses
+        }
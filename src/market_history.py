@@ -0,0 +1,183 @@
+"""
+OHLCV price history and its wire encodings
+Fetches daily (or intraday) bars from Yahoo Finance into a TTL cache as plain
+columns, and encodes them as JSON, or as chunked Arrow IPC / msgpack streams for
+bulk consumers when pyarrow / msgpack are installed.
+"""
+
+import importlib.util
+import os
+import struct
+import threading
+import time
+from concurrent.futures import Executor, TimeoutError as FutureTimeout
+from typing import Callable, Dict, Iterator, List, Optional
+
+from concurrency import KeyedLocks, history_executor
+
+# Binary encodings are optional; both libraries are only imported when used
+PYARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+MSGPACK_AVAILABLE = importlib.util.find_spec("msgpack") is not None
+
+HISTORY_CACHE_TTL = int(os.getenv('HISTORY_CACHE_TTL', '900'))
+# Rows per Arrow record batch / msgpack chunk in streamed responses
+HISTORY_CHUNK_ROWS = int(os.getenv('HISTORY_CHUNK_ROWS', '5000'))
+# Seconds yfinance waits on Yahoo for each request of a history download
+HISTORY_FETCH_TIMEOUT = float(os.getenv('HISTORY_FETCH_TIMEOUT', '10'))
+
+PERIODS = ["1d", "5d", "1mo", "3mo", "6mo", "1y", "2y", "5y", "10y", "ytd", "max"]
+INTERVALS = ["1m", "5m", "15m", "30m", "60m", "1h", "1d", "1wk", "1mo"]
+
+# timestamp is the bar's start in Unix seconds (UTC)
+COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+
+FORMATS = {
+    "json": "application/json",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "msgpack": "application/x-msgpack",
+}
+
+def yahoo_history(symbol: str, period: str, interval: str,
+                  timeout: float = HISTORY_FETCH_TIMEOUT) -> Dict[str, List]:
+    """Bars from Yahoo Finance as columns; empty columns if there is no data"""
+    import yfinance as yf
+
+    frame = yf.Ticker(symbol).history(period=period, interval=interval, auto_adjust=False, timeout=timeout)
+    if frame.empty:
+        return {column: [] for column in COLUMNS}
+    frame = frame.dropna(subset=["Open", "High", "Low", "Close"])
+    return {
+        "timestamp": [int(index.timestamp()) for index in frame.index],
+        "open": frame["Open"].astype(float).tolist(),
+        "high": frame["High"].astype(float).tolist(),
+        "low": frame["Low"].astype(float).tolist(),
+        "close": frame["Close"].astype(float).tolist(),
+        "volume": frame["Volume"].fillna(0).astype("int64").tolist(),
+    }
+
+class HistoryStore:
+    """
+    TTL cache in front of a history fetcher, keyed by (symbol, period, interval)
+    Concurrent requests for the same key share a single fetch. get_within() bounds
+    how long a caller waits, leaving a slow fetch to fill the cache on the executor.
+    """
+
+    def __init__(self, fetcher: Callable[[str, str, str], Dict[str, List]] = yahoo_history,
+                 ttl: float = HISTORY_CACHE_TTL, max_entries: int = 256,
+                 executor: Executor = history_executor):
+        self.fetcher = fetcher
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.executor = executor
+        self._cache = {}
+        self._lock = threading.Lock()
+        self._fetch_locks = KeyedLocks()
+        self._background = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, key):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and time.time() - entry[1] < self.ttl:
+                self.hits += 1
+                return entry[0]
+            return None
+
+    def get(self, symbol: str, period: str = "1y", interval: str = "1d") -> Dict[str, List]:
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period '{period}'. Expected one of: {', '.join(PERIODS)}")
+        if interval not in INTERVALS:
+            raise ValueError(f"Unknown interval '{interval}'. Expected one of: {', '.join(INTERVALS)}")
+
+        key = (symbol.upper(), period, interval)
+        history = self._cached(key)
+        if history is not None:
+            return history
+
+        self._fetch_locks.acquire(key)
+        try:
+            history = self._cached(key)
+            if history is not None:
+                return history
+            self.misses += 1
+            history = self.fetcher(*key)
+            with self._lock:
+                self._cache[key] = (history, time.time())
+                if len(self._cache) > self.max_entries:
+                    oldest = min(self._cache, key=lambda k: self._cache[k][1])
+                    del self._cache[oldest]
+            return history
+        finally:
+            self._fetch_locks.release(key)
+
+    def _background_done(self, key):
+        with self._lock:
+            self._background.pop(key, None)
+
+    def get_within(self, symbol: str, period: str = "1y", interval: str = "1d",
+                   timeout: float = 0.0) -> Optional[Dict[str, List]]:
+        """
+        Bars available within timeout seconds: fresh from the cache or the fetcher, else
+        the expired cached bars, else None. An unfinished fetch carries on in the background.
+        """
+        key = (symbol.upper(), period, interval)
+        history = self._cached(key)
+        if history is not None:
+            return history
+
+        with self._lock:
+            future = self._background.get(key)
+            started = future is None
+            if started:
+                future = self._background[key] = self.executor.submit(self.get, *key)
+        if started:
+            # Outside the lock: a fetch that already finished runs the callback right away
+            future.add_done_callback(lambda _: self._background_done(key))
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            with self._lock:
+                entry = self._cache.get(key)
+            return entry[0] if entry is not None else None
+
+    def get_status(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._cache), "hits": self.hits, "misses": self.misses, "ttl": self.ttl}
+
+def available_formats() -> List[str]:
+    """Encodings this server can produce"""
+    return [name for name, available in
+            (("json", True), ("arrow", PYARROW_AVAILABLE), ("msgpack", MSGPACK_AVAILABLE)) if available]
+
+def _chunks(history: Dict[str, List], chunk_rows: int) -> Iterator[Dict[str, List]]:
+    rows = len(history["timestamp"])
+    for start in range(0, rows, max(1, chunk_rows)):
+        yield {column: history[column][start:start + chunk_rows] for column in COLUMNS}
+
+def iter_arrow(history: Dict[str, List], chunk_rows: int = HISTORY_CHUNK_ROWS) -> Iterator[bytes]:
+    """Arrow IPC stream: the schema message, one record batch per chunk, then end-of-stream"""
+    import pyarrow as pa
+
+    schema = pa.schema([
+        ("timestamp", pa.timestamp("s", tz="UTC")),
+        ("open", pa.float64()),
+        ("high", pa.float64()),
+        ("low", pa.float64()),
+        ("close", pa.float64()),
+        ("volume", pa.int64()),
+    ])
+    yield schema.serialize().to_pybytes()
+    for chunk in _chunks(history, chunk_rows):
+        batch = pa.record_batch([chunk[column] for column in COLUMNS], schema=schema)
+        yield batch.serialize().to_pybytes()
+    # Continuation marker followed by a zero-length message
+    yield struct.pack("<Ii", 0xFFFFFFFF, 0)
+
+def iter_msgpack(history: Dict[str, List], chunk_rows: int = HISTORY_CHUNK_ROWS, **header) -> Iterator[bytes]:
+    """Concatenated msgpack maps: a header with the column names and row count, then column chunks"""
+    import msgpack
+
+    yield msgpack.packb({**header, "columns": COLUMNS, "rows": len(history["timestamp"])})
+    for chunk in _chunks(history, chunk_rows):
+        yield msgpack.packb(chunk)
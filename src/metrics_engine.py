@@ -0,0 +1,155 @@
+"""
+Numeric metrics engine
+Computes exact valuation, growth, risk and trend metrics from a parsed snapshot and
+OHLCV history columns, so the LLM reads the numbers instead of doing arithmetic.
+"""
+
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from financial_snapshot import derive_metrics
+
+# Index whose history beta is measured against, the annual risk-free rate behind
+# the Sharpe ratio and the history period the risk and trend metrics cover
+METRICS_BENCHMARK = os.getenv('METRICS_BENCHMARK', 'SPY')
+METRICS_RISK_FREE_RATE = float(os.getenv('METRICS_RISK_FREE_RATE', '0.04'))
+METRICS_HISTORY_PERIOD = os.getenv('METRICS_HISTORY_PERIOD', '1y')
+# Seconds the fast path waits for uncached history before computing metrics without it
+METRICS_HISTORY_TIMEOUT = float(os.getenv('METRICS_HISTORY_TIMEOUT', '1.0'))
+
+TRADING_DAYS = 252
+# Trailing returns reported, in trading days
+RETURN_WINDOWS = {"return_1m_pct": 21, "return_3m_pct": 63, "return_6m_pct": 126, "return_1y_pct": 252}
+MOVING_AVERAGES = (20, 50, 200)
+
+def _number(values: Dict, key: str) -> Optional[float]:
+    value = values.get(key)
+    return value if isinstance(value, float) and np.isfinite(value) else None
+
+def valuation_metrics(snapshot: Dict) -> Dict:
+    """Ratios implied by the snapshot's price, P/E, forward P/E, dividend and ROE"""
+    price = _number(snapshot, "price") or _number(snapshot, "close")
+    pe_ratio, forward_pe = _number(snapshot, "pe_ratio"), _number(snapshot, "forward_pe")
+    metrics = {}
+
+    if price and pe_ratio and pe_ratio > 0:
+        metrics["eps"] = price / pe_ratio
+        roe = _number(snapshot, "roe_pct")
+        if roe:
+            # P/B = P/E x E/B
+            metrics["price_to_book"] = pe_ratio * roe / 100
+    if price and forward_pe and forward_pe > 0:
+        metrics["forward_eps"] = price / forward_pe
+        metrics["forward_earnings_yield_pct"] = 100 / forward_pe
+        if pe_ratio and pe_ratio > 0:
+            growth = (pe_ratio / forward_pe - 1) * 100
+            metrics["eps_growth_pct"] = growth
+            if growth > 0:
+                metrics["peg_ratio"] = pe_ratio / growth
+
+    dividend = _number(snapshot, "dividend")
+    if price and dividend:
+        metrics.setdefault("dividend_yield_pct", dividend / price * 100)
+        if metrics.get("eps"):
+            metrics["payout_ratio_pct"] = dividend / metrics["eps"] * 100
+    return metrics
+
+def _returns(close: np.ndarray) -> np.ndarray:
+    return close[1:] / close[:-1] - 1
+
+def history_metrics(history: Dict[str, List], price: Optional[float] = None) -> Dict:
+    """Growth, volatility, drawdown, Sharpe ratio and moving-average distances from daily bars"""
+    close = np.asarray(history.get("close", []), dtype=float)
+    close = close[np.isfinite(close) & (close > 0)]
+    if len(close) < 2:
+        return {}
+    price = price or float(close[-1])
+    returns = _returns(close)
+    metrics = {"history_days": len(close)}
+
+    for key, days in RETURN_WINDOWS.items():
+        # A period's worth of bars spans one day fewer than the period
+        if len(close) >= days:
+            metrics[key] = (close[-1] / close[max(0, len(close) - 1 - days)] - 1) * 100
+    timestamps = history.get("timestamp") or []
+    if len(timestamps) == len(history["close"]) and timestamps[-1] > timestamps[0]:
+        years = (timestamps[-1] - timestamps[0]) / (365.25 * 86400)
+        if years >= 0.5:
+            metrics["cagr_pct"] = ((close[-1] / close[0]) ** (1 / years) - 1) * 100
+
+    if len(returns) >= 2:
+        daily_volatility = returns.std(ddof=1)
+        metrics["volatility_pct"] = daily_volatility * np.sqrt(TRADING_DAYS) * 100
+        if len(returns) > 20:
+            metrics["volatility_20d_pct"] = returns[-20:].std(ddof=1) * np.sqrt(TRADING_DAYS) * 100
+        # Rounding noise in a constant-growth series isn't volatility
+        if not np.isclose(daily_volatility, 0):
+            excess = returns.mean() * TRADING_DAYS - METRICS_RISK_FREE_RATE
+            metrics["sharpe_ratio"] = excess / (daily_volatility * np.sqrt(TRADING_DAYS))
+
+    peaks = np.maximum.accumulate(close)
+    drawdowns = close / peaks - 1
+    trough = int(drawdowns.argmin())
+    metrics["max_drawdown_pct"] = drawdowns[trough] * 100
+    metrics["max_drawdown_days"] = trough - int(close[:trough + 1].argmax())
+    metrics["current_drawdown_pct"] = drawdowns[-1] * 100
+
+    averages = {}
+    for days in MOVING_AVERAGES:
+        if len(close) >= days:
+            averages[days] = float(close[-days:].mean())
+            metrics[f"vs_sma_{days}_pct"] = (price / averages[days] - 1) * 100
+    if 50 in averages and 200 in averages:
+        metrics["sma_50_vs_200_pct"] = (averages[50] / averages[200] - 1) * 100
+    return metrics
+
+def beta_metrics(history: Dict[str, List], benchmark: Dict[str, List]) -> Dict:
+    """Beta and correlation of daily returns against a benchmark, over the days both traded"""
+    common, mine, theirs = np.intersect1d(history.get("timestamp", []), benchmark.get("timestamp", []),
+                                          return_indices=True)
+    if len(common) < 20:
+        return {}
+    close = np.asarray(history["close"], dtype=float)[mine]
+    benchmark_close = np.asarray(benchmark["close"], dtype=float)[theirs]
+    returns, benchmark_returns = _returns(close), _returns(benchmark_close)
+    variance = benchmark_returns.var(ddof=1)
+    if not variance > 0:
+        return {}
+    covariance = np.cov(returns, benchmark_returns)[0, 1]
+    return {
+        "beta": covariance / variance,
+        "correlation": float(np.corrcoef(returns, benchmark_returns)[0, 1]),
+    }
+
+def compute_metrics(snapshot: Dict, history: Optional[Dict[str, List]] = None,
+                    benchmark: Optional[Dict[str, List]] = None) -> Dict:
+    """
+    All metrics available from the inputs; unavailable metrics are omitted
+    Snapshot metrics come first. Moving-average distances from the provider's own
+    averages are kept when present; history supplies the rest.
+    """
+    metrics = derive_metrics(snapshot)
+    metrics.update(valuation_metrics(snapshot))
+    if history:
+        for key, value in history_metrics(history, metrics.get("price")).items():
+            metrics.setdefault(key, value)
+        if benchmark:
+            beta = beta_metrics(history, benchmark)
+            if beta:
+                metrics.update(beta)
+                metrics["beta_benchmark"] = METRICS_BENCHMARK
+    if "beta" not in metrics and _number(snapshot, "beta") is not None:
+        metrics["beta"] = snapshot["beta"]
+    return {key: value for key, value in metrics.items()
+            if not isinstance(value, float) or np.isfinite(value)}
+
+def format_metrics(metrics: Dict) -> str:
+    """One "name: value" line per metric, floats to two decimals"""
+    lines = []
+    for name, value in metrics.items():
+        if isinstance(value, (float, np.floating)):
+            value = f"{float(value):.2f}"
+        lines.append(f"{name}: {value}")
+    return "\n".join(lines)
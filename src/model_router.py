@@ -0,0 +1,188 @@
+"""
+Task-based model routing
+Picks the Ollama model for each kind of generation (the larger model for analyses,
+a smaller one for chat, critique and summaries) and downgrades to a smaller model
+when the LLM queue is deep or a task's latency SLO is at risk.
+"""
+
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+from context_packer import context_window_for
+from llm_scheduler import Priority
+
+# Load environment variables
+load_dotenv()
+
+# Model tiers; per-task overrides use LLM_MODEL_<TASK>, LLM_SLO_<TASK> and LLM_FALLBACK_<TASK>
+LARGE_MODEL = os.getenv('LLM_LARGE_MODEL', 'llama3.1:8b')
+SMALL_MODEL = os.getenv('LLM_SMALL_MODEL', 'llama3.2:3b')
+TINY_MODEL = os.getenv('LLM_TINY_MODEL', 'llama3.2:1b')
+
+# Queued generations at which every task switches to its fallback model
+DOWNGRADE_QUEUE_DEPTH = int(os.getenv('LLM_DOWNGRADE_QUEUE_DEPTH', '4'))
+# While downgraded for latency, retry the primary model this often (seconds)
+PROBE_INTERVAL = float(os.getenv('LLM_ROUTER_PROBE_INTERVAL', '60'))
+
+class Task(str, Enum):
+    ANALYSIS = "analysis"            # initial and improved analyses
+    CRITIQUE = "critique"
+    CONVERSATION = "conversation"
+    FEEDBACK = "feedback"
+    SUMMARIZATION = "summarization"  # rolling conversation summaries
+
+TASK_PRIORITIES = {
+    Task.ANALYSIS: Priority.ANALYSIS,
+    Task.CRITIQUE: Priority.ANALYSIS,
+    Task.CONVERSATION: Priority.INTERACTIVE,
+    Task.FEEDBACK: Priority.INTERACTIVE,
+    Task.SUMMARIZATION: Priority.BATCH,
+}
+
+@dataclass(frozen=True)
+class Route:
+    model: str
+    temperature: float
+    slo_seconds: float              # target end-to-end latency, queueing included
+    fallback: Optional[str] = None  # smaller model used under load; None never downgrades
+
+def _route(task: Task, model: str, temperature: float, slo_seconds: float, fallback: Optional[str]) -> Route:
+    name = task.name
+    return Route(
+        model=os.getenv(f'LLM_MODEL_{name}', model),
+        temperature=temperature,
+        slo_seconds=float(os.getenv(f'LLM_SLO_{name}', str(slo_seconds))),
+        fallback=os.getenv(f'LLM_FALLBACK_{name}', fallback or '') or None
+    )
+
+DEFAULT_ROUTES = {
+    Task.ANALYSIS: _route(Task.ANALYSIS, LARGE_MODEL, 0.7, 90, SMALL_MODEL),
+    Task.CRITIQUE: _route(Task.CRITIQUE, SMALL_MODEL, 0.7, 60, TINY_MODEL),
+    Task.CONVERSATION: _route(Task.CONVERSATION, SMALL_MODEL, 0.7, 20, TINY_MODEL),
+    Task.FEEDBACK: _route(Task.FEEDBACK, SMALL_MODEL, 0.7, 30, TINY_MODEL),
+    Task.SUMMARIZATION: _route(Task.SUMMARIZATION, SMALL_MODEL, 0.2, 15, TINY_MODEL),
+}
+
+@dataclass
+class ModelChoice:
+    """The model picked for one generation, and why"""
+    task: Task
+    model: str
+    temperature: float
+    downgraded: bool = False
+    reason: Optional[str] = None  # "load" or "slo" when downgraded
+
+    def options(self) -> Dict:
+        """Generation options for AsyncOllamaClient.astream"""
+        return {
+            "model": self.model,
+            "temperature": self.temperature,
+            "num_ctx": context_window_for(self.model)
+        }
+
+    def as_dict(self) -> Dict:
+        return {
+            "task": self.task.value,
+            "model": self.model,
+            "downgraded": self.downgraded,
+            "reason": self.reason
+        }
+
+class ModelRouter:
+    """
+    Chooses a model per task and tracks each task/model's observed latency
+    A task falls back to its smaller model when DOWNGRADE_QUEUE_DEPTH generations are
+    queued, or when its smoothed latency on the primary model exceeds the SLO. While
+    downgraded for latency the primary is retried every probe_interval seconds.
+    """
+
+    def __init__(self, client, routes: Optional[Dict[Task, Route]] = None,
+                 downgrade_queue_depth: int = DOWNGRADE_QUEUE_DEPTH,
+                 probe_interval: float = PROBE_INTERVAL):
+        self.client = client
+        self.scheduler = client.scheduler
+        self.routes = {**DEFAULT_ROUTES, **(routes or {})}
+        self.downgrade_queue_depth = downgrade_queue_depth
+        self.probe_interval = probe_interval
+        self._latency = {}
+        self._requests = {}
+        self._last_primary = {}
+        self.downgrades = {task: 0 for task in Task}
+
+    def route_for(self, task: Task) -> Route:
+        return self.routes[task]
+
+    def latency(self, task: Task, model: str) -> Optional[float]:
+        """Smoothed end-to-end latency of a task on a model, None before the first sample"""
+        return self._latency.get((task, model))
+
+    def _downgrade_reason(self, task: Task, route: Route) -> Optional[str]:
+        if self.scheduler.queued >= self.downgrade_queue_depth:
+            return "load"
+        latency = self.latency(task, route.model)
+        if latency is not None and latency > route.slo_seconds:
+            if time.monotonic() - self._last_primary.get(task, 0.0) >= self.probe_interval:
+                return None
+            return "slo"
+        return None
+
+    def choose(self, task: Task) -> ModelChoice:
+        """Pick the model for a new generation of this task"""
+        route = self.routes[task]
+        reason = self._downgrade_reason(task, route) if route.fallback else None
+        if reason:
+            self.downgrades[task] += 1
+            return ModelChoice(task, route.fallback, route.temperature, downgraded=True, reason=reason)
+        self._last_primary[task] = time.monotonic()
+        return ModelChoice(task, route.model, route.temperature)
+
+    def record(self, choice: ModelChoice, seconds: float):
+        key = (choice.task, choice.model)
+        previous = self._latency.get(key)
+        self._latency[key] = seconds if previous is None else 0.7 * previous + 0.3 * seconds
+        self._requests[key] = self._requests.get(key, 0) + 1
+
+    @asynccontextmanager
+    async def timed(self, choice: ModelChoice):
+        """Record the block's duration against the choice if it completes without error"""
+        started_at = time.monotonic()
+        yield
+        self.record(choice, time.monotonic() - started_at)
+
+    async def astream(self, choice: ModelChoice, prompt: str, **kwargs):
+        """Stream a generation with the chosen model, at the task's scheduler priority"""
+        kwargs.setdefault("priority", TASK_PRIORITIES[choice.task])
+        async with self.timed(choice):
+            async for text in self.client.astream(prompt, **choice.options(), **kwargs):
+                yield text
+
+    async def ainvoke(self, choice: ModelChoice, prompt: str, **kwargs) -> str:
+        parts = []
+        async for text in self.astream(choice, prompt, **kwargs):
+            parts.append(text)
+        return "".join(parts)
+
+    def get_status(self) -> Dict:
+        status = {}
+        for task, route in self.routes.items():
+            models = {}
+            for model in filter(None, (route.model, route.fallback)):
+                latency = self.latency(task, model)
+                models[model] = {
+                    "requests": self._requests.get((task, model), 0),
+                    "latency": round(latency, 3) if latency is not None else None
+                }
+            status[task.value] = {
+                "model": route.model,
+                "fallback": route.fallback,
+                "slo_seconds": route.slo_seconds,
+                "downgrades": self.downgrades[task],
+                "models": models
+            }
+        return status
@@ -0,0 +1,178 @@
+"""
+Asynchronous Ollama client
+Streams generations over a shared aiohttp session so request handlers never block the event loop
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+from concurrency import LLM_MAX_CONCURRENCY
+from llm_scheduler import LLMScheduler, Priority
+from tracing import start_span
+
+# How long Ollama keeps the model (and its KV cache) loaded after a request
+LLM_KEEP_ALIVE = os.getenv('LLM_KEEP_ALIVE', '30m')
+# keep_alive for pinned (warmed) models; a negative duration keeps them loaded until Ollama stops
+LLM_PINNED_KEEP_ALIVE = os.getenv('LLM_PINNED_KEEP_ALIVE', '-1m')
+
+_pinned_models = set()
+
+class ModelNotFound(ValueError):
+    """Raised when Ollama doesn't have the requested model; it needs an `ollama pull`"""
+
+    def __init__(self, model: str):
+        self.model = model
+        super().__init__(f"Model {model} is not installed in Ollama; run `ollama pull {model}`")
+
+def pin_model(model: str):
+    """Ask Ollama to keep a model loaded indefinitely on every request that uses it"""
+    _pinned_models.add(model)
+
+def keep_alive_for(model: str, keep_alive: Optional[str] = LLM_KEEP_ALIVE) -> Optional[str]:
+    """keep_alive to send with a request: each request resets the model's unload timer"""
+    return LLM_PINNED_KEEP_ALIVE if model in _pinned_models else keep_alive
+
+class AsyncOllamaClient:
+    """
+    Minimal async client for Ollama's /api/generate endpoint
+    Generations run through an LLMScheduler so a burst of requests queues here,
+    by priority, instead of piling onto the model server.
+    """
+
+    def __init__(self, model: str, temperature: float = 0.7,
+                 base_url: str = "http://localhost:11434",
+                 scheduler: Optional[LLMScheduler] = None,
+                 timeout: Optional[float] = None,
+                 num_ctx: Optional[int] = None,
+                 keep_alive: Optional[str] = LLM_KEEP_ALIVE):
+        self.model = model
+        self.temperature = temperature
+        self.num_ctx = num_ctx
+        self.keep_alive = keep_alive
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.scheduler = scheduler or LLMScheduler(LLM_MAX_CONCURRENCY)
+        self._session = None
+        self._session_loop = None
+
+    @classmethod
+    def from_llm(cls, llm, **kwargs) -> "AsyncOllamaClient":
+        """Build a client with the same model settings as a LangChain Ollama LLM"""
+        return cls(
+            model=llm.model,
+            temperature=llm.temperature if llm.temperature is not None else 0.7,
+            base_url=llm.base_url,
+            timeout=llm.timeout,
+            **kwargs
+        )
+
+    def _get_session(self):
+        """Reuse one HTTP session (and its connection pool) per event loop"""
+        # Imported here so synchronous (CLI) users of this module never load aiohttp
+        import aiohttp
+        
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self._session_loop = loop
+        return self._session
+
+    def _payload(self, prompt: str, context: Optional[List[int]] = None,
+                 model: Optional[str] = None, **options) -> Dict:
+        base_options = {"temperature": self.temperature}
+        if self.num_ctx:
+            base_options["num_ctx"] = self.num_ctx
+        payload = {
+            "model": model or self.model,
+            "prompt": prompt,
+            "stream": True,
+            "options": {**base_options, **options}
+        }
+        if context:
+            payload["context"] = list(context)
+        keep_alive = keep_alive_for(payload["model"], self.keep_alive)
+        if keep_alive:
+            payload["keep_alive"] = keep_alive
+        return payload
+
+    async def astream(self, prompt: str, context: Optional[List[int]] = None,
+                      on_done: Optional[Callable[[Dict], None]] = None,
+                      priority: Priority = Priority.INTERACTIVE,
+                      model: Optional[str] = None, **options) -> AsyncIterator[str]:
+        """
+        Yield generated text chunks as Ollama produces them
+        context continues from a previous generation's returned context; on_done
+        receives the final chunk (with context and eval counts) when generation ends.
+        model overrides the client's default model for this generation.
+        """
+        # Spans are started rather than entered: a generator's context can't be held across yields
+        model = model or self.model
+        queued = start_span("llm.queue", model=model, priority=priority.name)
+        async with self.scheduler.slot(priority):
+            queued.end()
+            generation = start_span("llm.generate", model=model, kv_reused=bool(context))
+            started_at = time.monotonic()
+            first_token = True
+            try:
+                session = self._get_session()
+                async with session.post(f"{self.base_url}/api/generate",
+                                        json=self._payload(prompt, context, model, **options)) as response:
+                    if response.status != 200:
+                        detail = await response.text()
+                        raise ValueError(f"Ollama call failed with status code {response.status}. Details: {detail}")
+
+                    async for line in response.content:
+                        if not line.strip():
+                            continue
+                        chunk = json.loads(line)
+                        if chunk.get("error"):
+                            raise ValueError(f"Ollama error: {chunk['error']}")
+                        if chunk.get("response"):
+                            if first_token:
+                                first_token = False
+                                generation.set(first_token_ms=round((time.monotonic() - started_at) * 1000, 1))
+                            yield chunk["response"]
+                        if chunk.get("done"):
+                            generation.set(prompt_tokens=chunk.get("prompt_eval_count", 0),
+                                           output_tokens=chunk.get("eval_count", 0))
+                            if on_done is not None:
+                                on_done(chunk)
+                            break
+            except Exception as e:
+                generation.fail(f"{type(e).__name__}: {e}")
+                raise
+            finally:
+                generation.end()
+
+    async def load(self, model: Optional[str] = None):
+        """Load a model into memory without generating (Ollama loads on an empty prompt)"""
+        payload = {"model": model or self.model, "stream": False}
+        keep_alive = keep_alive_for(payload["model"], self.keep_alive)
+        if keep_alive:
+            payload["keep_alive"] = keep_alive
+        session = self._get_session()
+        async with session.post(f"{self.base_url}/api/generate", json=payload) as response:
+            detail = await response.text()
+            if response.status == 404:
+                raise ModelNotFound(payload["model"])
+            if response.status != 200:
+                raise ValueError(f"Ollama call failed with status code {response.status}. Details: {detail}")
+
+    async def ainvoke(self, prompt: str, **options) -> str:
+        """Return the complete generation for a prompt"""
+        parts = []
+        async for text in self.astream(prompt, **options):
+            parts.append(text)
+        return "".join(parts)
+
+    async def aclose(self):
+        """Close the shared HTTP session"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
@@ -0,0 +1,63 @@
+"""
+Ollama LLM over a pooled HTTP session
+Kept apart from llm_factory.py because importing LangChain is slow; the factory
+imports this module the first time an LLM is actually used.
+"""
+
+from typing import Any, Iterator, List, Optional
+
+from langchain_community.llms import Ollama
+from langchain_community.llms.ollama import OllamaEndpointNotFoundError
+
+from llm_factory import http_session
+from ollama_client import LLM_KEEP_ALIVE, keep_alive_for
+from tracing import span
+
+class PooledOllama(Ollama):
+    """Ollama LLM that sends requests through the shared session and sets keep_alive"""
+
+    keep_alive: Optional[str] = LLM_KEEP_ALIVE
+    """How long Ollama keeps the model loaded after the request"""
+
+    def _generate(self, prompts: List[str], stop: Optional[List[str]] = None, **kwargs: Any):
+        # Every LangChain call (llm.invoke, agent steps) lands here
+        with span("llm.invoke", model=self.model) as call:
+            result = super()._generate(prompts, stop=stop, **kwargs)
+            info = (result.generations[0][0].generation_info if result.generations else None) or {}
+            call.set(prompt_tokens=info.get("prompt_eval_count", 0), output_tokens=info.get("eval_count", 0))
+            return result
+
+    def _create_stream(self, api_url: str, payload: Any,
+                       stop: Optional[List[str]] = None, **kwargs: Any) -> Iterator[str]:
+        # Same request as Ollama._create_stream, sent over the pooled session
+        if self.stop is not None and stop is not None:
+            raise ValueError("`stop` found in both the input and default params.")
+        stop = self.stop if self.stop is not None else (stop or [])
+
+        params = self._default_params
+        if "model" in kwargs:
+            params["model"] = kwargs["model"]
+        if "options" in kwargs:
+            params["options"] = kwargs["options"]
+        else:
+            params["options"] = {**params["options"], "stop": stop, **kwargs}
+        keep_alive = keep_alive_for(params["model"], self.keep_alive)
+        if keep_alive:
+            params["keep_alive"] = keep_alive
+
+        if payload.get("messages"):
+            request_payload = {"messages": payload.get("messages", []), **params}
+        else:
+            request_payload = {"prompt": payload.get("prompt"), "images": payload.get("images", []), **params}
+
+        response = http_session().post(url=api_url, json=request_payload, stream=True, timeout=self.timeout)
+        response.encoding = "utf-8"
+        if response.status_code == 404:
+            raise OllamaEndpointNotFoundError(
+                f"Ollama call failed with status code 404. Maybe your model is not found "
+                f"and you should pull the model with `ollama pull {self.model}`."
+            )
+        if response.status_code != 200:
+            raise ValueError(f"Ollama call failed with status code {response.status_code}. "
+                             f"Details: {response.json().get('error')}")
+        return response.iter_lines(decode_unicode=True)
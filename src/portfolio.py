@@ -0,0 +1,110 @@
+"""
+Portfolio batch analysis
+Fetches market data for every symbol of a portfolio up front (one concurrent provider
+call per symbol; the providers have no multi-symbol endpoint), then analyzes the symbols
+concurrently under a cap and yields each result as soon as it completes.
+"""
+
+import asyncio
+import os
+from typing import Awaitable, Callable, Dict, List
+
+from concurrency import LLM_MAX_CONCURRENCY
+from context_packer import TokenCounter, prompt_budget, token_counter
+
+# Largest portfolio accepted by one batch request
+BATCH_MAX_SYMBOLS = int(os.getenv('BATCH_MAX_SYMBOLS', '20'))
+# Per-symbol analyses of one batch generated at the same time
+BATCH_MAX_CONCURRENCY = int(os.getenv('BATCH_MAX_CONCURRENCY', str(LLM_MAX_CONCURRENCY)))
+
+def normalize_symbols(symbols: List[str], max_symbols: int = BATCH_MAX_SYMBOLS) -> List[str]:
+    """Uppercase, strip and de-duplicate symbols, keeping their order"""
+    normalized = list(dict.fromkeys(symbol.strip().upper() for symbol in symbols if symbol.strip()))
+    if not normalized:
+        raise ValueError("No symbols given")
+    if len(normalized) > max_symbols:
+        raise ValueError(f"Too many symbols ({len(normalized)}); at most {max_symbols} per batch")
+    return normalized
+
+async def analyze_portfolio(symbols: List[str],
+                            fetch: Callable[[str], Awaitable[str]],
+                            analyze: Callable[[str, str], Awaitable[Dict]],
+                            max_concurrency: int = BATCH_MAX_CONCURRENCY):
+    """
+    Yield {"symbol", "status", ...} for each symbol in completion order
+
+    fetch(symbol) returns the provider text; all symbols are fetched concurrently before
+    any analysis starts. analyze(symbol, data) returns the fields added to a successful
+    result. Symbols whose data could not be fetched are reported without calling the LLM.
+    """
+    fetched = await asyncio.gather(*(fetch(symbol) for symbol in symbols), return_exceptions=True)
+    limiter = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def analyze_one(symbol: str, financial_data) -> Dict:
+        if isinstance(financial_data, Exception):
+            return {"symbol": symbol, "status": "error", "message": str(financial_data)}
+        if financial_data.startswith("Error"):
+            return {"symbol": symbol, "status": "error", "message": financial_data}
+        async with limiter:
+            try:
+                return {"symbol": symbol, "status": "success", **await analyze(symbol, financial_data)}
+            except Exception as e:
+                return {"symbol": symbol, "status": "error", "message": str(e)}
+
+    tasks = [asyncio.ensure_future(analyze_one(symbol, data)) for symbol, data in zip(symbols, fetched)]
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            yield await next_result
+    finally:
+        # Stop outstanding analyses if the caller stops reading
+        for task in tasks:
+            task.cancel()
+
+SUMMARY_PROMPT = """You are a portfolio manager. Based on the following analyses of the holdings in a portfolio ({symbols}), provide a portfolio-level summary:
+
+{sections}
+
+Please provide:
+1. Overall portfolio assessment
+2. Strongest and weakest holdings
+3. Concentration risks (sector, style, correlation)
+4. Suggested rebalancing or actions
+5. Key factors to watch across the portfolio
+
+Be concise and refer to holdings by symbol."""
+
+# Appended to an analysis shortened to fit the summary prompt
+TRUNCATED_MARKER = " [...]"
+
+def _fair_shares(sizes: List[int], available: int) -> List[int]:
+    """Split available tokens so short analyses fit whole and long ones share the rest equally"""
+    shares = [0] * len(sizes)
+    pending = sorted(range(len(sizes)), key=lambda i: sizes[i])
+    while pending:
+        share = max(0, available) // len(pending)
+        index = pending.pop(0)
+        shares[index] = min(sizes[index], share)
+        available -= shares[index]
+    return shares
+
+def build_portfolio_summary_prompt(results: List[Dict], model: str, counter: TokenCounter = token_counter) -> str:
+    """
+    Prompt for a portfolio-level summary of the successful per-symbol analyses
+    The prompt is packed into the model's context window: analyses that don't fit whole
+    are cut to an equal share of the room left, so every holding reaches the summary.
+    """
+    symbols = ", ".join(result['symbol'] for result in results)
+    headers = [f"=== {result['symbol']} ===\n" for result in results]
+    budget = prompt_budget(model)
+    fixed = counter.count(SUMMARY_PROMPT.format(symbols=symbols, sections=""))
+    fixed += sum(counter.count(header) + counter.count(TRUNCATED_MARKER) + 2 for header in headers)
+
+    analyses = [result['analysis'] for result in results]
+    shares = _fair_shares([counter.count(analysis) for analysis in analyses], budget - fixed)
+    sections = []
+    for header, analysis, share in zip(headers, analyses, shares):
+        body = counter.truncate(analysis, share)
+        if body != analysis:
+            body = body.rstrip() + TRUNCATED_MARKER
+        sections.append(header + body)
+    return SUMMARY_PROMPT.format(symbols=symbols, sections="\n\n".join(sections))
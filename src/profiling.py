@@ -0,0 +1,329 @@
+"""
+Opt-in request profiling
+Profiles a request when an admin asks for it (X-Profile-Token header or ?profile=
+query parameter matching PROFILE_TOKEN) or when it is picked by PROFILE_SAMPLE_RATE.
+Provider threads doing the request's work are profiled along with the event loop.
+Two modes:
+- sampling (default): a background thread samples the stacks every PROFILE_INTERVAL_MS
+  and writes collapsed stacks (.folded) for flamegraph.pl, inferno or speedscope
+- deterministic: cProfile records every call and writes pstats (.prof) for snakeviz
+  or flameprof, plus a text summary (.txt)
+"""
+
+import asyncio
+import cProfile
+import functools
+import hmac
+import io
+import os
+import pstats
+import random
+import secrets
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+# Shared secret for on-demand profiling; empty disables it
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN', '')
+# Fraction of requests (and of standalone agent calls) profiled without being asked
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_MODE = os.getenv('PROFILE_MODE', 'sampling')
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', '5'))
+# Profiles running at once; further requests run unprofiled
+PROFILE_MAX_CONCURRENT = int(os.getenv('PROFILE_MAX_CONCURRENT', '1'))
+
+MODES = ("sampling", "deterministic")
+
+# The profile collecting the current request's work; False once a request decided not to profile
+_current: ContextVar = ContextVar("current_profile", default=None)
+
+# Threads under cProfile; a thread can only run one at a time
+_deterministic_threads = set()
+_deterministic_lock = threading.Lock()
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class Profile:
+    """One profiling session and the threads taking part in it"""
+
+    def __init__(self, name: str, mode: str = PROFILE_MODE, interval_ms: float = PROFILE_INTERVAL_MS):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profile mode '{mode}'. Expected one of: {', '.join(MODES)}")
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(3)}"
+        self.name = name
+        self.mode = mode
+        self.interval = max(0.001, interval_ms / 1000)
+        self.started_at = None
+        self.duration = 0.0
+        self.samples = 0
+        self._stacks: Dict[str, int] = {}
+        self._threads: Dict[int, List] = {}   # ident -> [label, depth, cProfile or None]
+        self._stats: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._sampler = None
+
+    def start(self, label: str = "main"):
+        self.started_at = time.perf_counter()
+        self.enter_thread(label)
+        if self.mode == "sampling":
+            self._sampler = threading.Thread(target=self._sample, name=f"profiler-{self.id}", daemon=True)
+            self._sampler.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        # Worker threads still running the request's work release themselves when they finish
+        self._release(threading.get_ident(), force=True)
+        self.duration = time.perf_counter() - self.started_at
+
+    def enter_thread(self, label: Optional[str] = None):
+        ident = threading.get_ident()
+        with self._lock:
+            entry = self._threads.get(ident)
+            if entry is not None:
+                entry[1] += 1
+                return
+            entry = self._threads[ident] = [label or threading.current_thread().name, 1, None]
+        if self.mode == "deterministic":
+            with _deterministic_lock:
+                if ident in _deterministic_threads:
+                    return
+                _deterministic_threads.add(ident)
+            entry[2] = cProfile.Profile()
+            entry[2].enable()
+
+    def exit_thread(self):
+        self._release(threading.get_ident())
+
+    def _release(self, ident: int, force: bool = False):
+        # Only ever called from the thread being released: cProfile is per thread
+        with self._lock:
+            entry = self._threads.get(ident)
+            if entry is None:
+                return
+            entry[1] -= 1
+            if entry[1] > 0 and not force:
+                return
+            del self._threads[ident]
+        profiler = entry[2]
+        if profiler is not None:
+            profiler.disable()
+            with _deterministic_lock:
+                _deterministic_threads.discard(ident)
+            self._stats.append(profiler)
+
+    @contextmanager
+    def thread(self, label: Optional[str] = None):
+        """Include the calling thread in the profile for the duration of the block"""
+        self.enter_thread(label)
+        try:
+            yield
+        finally:
+            self.exit_thread()
+
+    def wrap(self, func):
+        """func, profiled in whichever thread ends up calling it"""
+        @functools.wraps(func)
+        def call(*args, **kwargs):
+            with self.thread():
+                return func(*args, **kwargs)
+        return call
+
+    def _sample(self):
+        own = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                threads = [(ident, entry[0]) for ident, entry in self._threads.items() if ident != own]
+            for ident, label in threads:
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                if stack:
+                    folded = ";".join([label] + stack[::-1])
+                    self._stacks[folded] = self._stacks.get(folded, 0) + 1
+            self.samples += 1
+
+    def write(self, directory: str = PROFILE_DIR) -> List[str]:
+        """Write the profile's output files and return their paths"""
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, self.id)
+        if self.mode == "sampling":
+            path = base + ".folded"
+            with open(path, "w", encoding="utf-8") as f:
+                for stack, count in sorted(self._stacks.items()):
+                    f.write(f"{stack} {count}\n")
+            return [path]
+
+        if not self._stats:
+            return []
+        stats = pstats.Stats(self._stats[0])
+        for profiler in self._stats[1:]:
+            stats.add(profiler)
+        stats.dump_stats(base + ".prof")
+        summary = io.StringIO()
+        summary.write(f"{self.name}: {self.duration * 1000:.1f} ms\n\n")
+        pstats.Stats(base + ".prof", stream=summary).sort_stats("cumulative").print_stats(40)
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write(summary.getvalue())
+        return [base + ".prof", base + ".txt"]
+
+class Profiler:
+    """Decides which requests to profile and bounds how many run at once"""
+
+    def __init__(self, token: str = PROFILE_TOKEN, sample_rate: float = PROFILE_SAMPLE_RATE,
+                 mode: str = PROFILE_MODE, directory: str = PROFILE_DIR,
+                 max_concurrent: int = PROFILE_MAX_CONCURRENT):
+        self.token = token
+        self.sample_rate = sample_rate
+        self.mode = mode
+        self.directory = directory
+        self.max_concurrent = max(1, max_concurrent)
+        self.active = 0
+        self.profiled = 0
+        self.skipped = 0
+        self.recent: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def choose(self, token: Optional[str], mode: Optional[str] = None) -> Optional[str]:
+        """The mode to profile in, or None: on demand with a valid token, otherwise by sampling"""
+        if token and self.token and hmac.compare_digest(token.encode(), self.token.encode()):
+            return mode if mode in MODES else self.mode
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return self.mode
+        return None
+
+    def begin(self, name: str, mode: str) -> Optional[Profile]:
+        with self._lock:
+            if self.active >= self.max_concurrent:
+                self.skipped += 1
+                return None
+            self.active += 1
+        return Profile(name, mode)
+
+    def finish(self, profile: Profile) -> List[str]:
+        """Write a stopped profile's files; safe to run in a worker thread"""
+        try:
+            paths = profile.write(self.directory)
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.profiled += 1
+        with self._lock:
+            self.recent = (self.recent + [{
+                "id": profile.id,
+                "name": profile.name,
+                "mode": profile.mode,
+                "ms": round(profile.duration * 1000, 1),
+                "files": paths
+            }])[-20:]
+        return paths
+
+    @contextmanager
+    def session(self, name: str, mode: str):
+        """Profile the block in the calling thread (for code outside a request)"""
+        profile = self.begin(name, mode)
+        if profile is None:
+            yield None
+            return
+        token = _current.set(profile)
+        profile.start()
+        try:
+            yield profile
+        finally:
+            profile.stop()
+            _current.reset(token)
+            self.finish(profile)
+
+    def get_status(self) -> Dict:
+        with self._lock:
+            return {
+                "on_demand": bool(self.token),
+                "sample_rate": self.sample_rate,
+                "mode": self.mode,
+                "directory": self.directory,
+                "active": self.active,
+                "profiled": self.profiled,
+                "skipped_busy": self.skipped,
+                "recent": list(self.recent)
+            }
+
+profiler = Profiler()
+
+def current_profile() -> Optional[Profile]:
+    return _current.get() or None
+
+def profiled(func):
+    """
+    Profile a method when it runs as part of a profiled request, or on its own
+    (sampled at PROFILE_SAMPLE_RATE) when called outside a request, e.g. from the CLI
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profile = _current.get()
+        if profile:
+            with profile.thread():
+                return func(*args, **kwargs)
+        if profile is None and profiler.sample_rate > 0:
+            mode = profiler.choose(None)
+            if mode is not None:
+                with profiler.session(func.__qualname__, mode):
+                    return func(*args, **kwargs)
+        return func(*args, **kwargs)
+    return wrapper
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles chosen HTTP requests, streamed bodies included
+    Profiled responses get an X-Profile-Id header naming the output files.
+    """
+
+    def __init__(self, app, profiler: Profiler = profiler, exclude_prefixes=("/static",)):
+        self.app = app
+        self.profiler = profiler
+        self.exclude_prefixes = tuple(exclude_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.exclude_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        token = headers.get(b"x-profile-token", b"").decode("latin-1") or query.get("profile", [""])[0]
+        requested_mode = headers.get(b"x-profile-mode", b"").decode("latin-1") or query.get("profile_mode", [""])[0]
+        mode = self.profiler.choose(token, requested_mode)
+        profile = self.profiler.begin(f"{scope['method']} {scope['path']}", mode) if mode else None
+        if profile is None:
+            context_token = _current.set(False)
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                _current.reset(context_token)
+            return
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile.id.encode("latin-1"))]}
+            await send(message)
+
+        context_token = _current.set(profile)
+        profile.start("event-loop")
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profile.stop()
+            _current.reset(context_token)
+            await asyncio.get_running_loop().run_in_executor(None, self.profiler.finish, profile)
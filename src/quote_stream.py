@@ -0,0 +1,170 @@
+"""
+Live quote fan-out
+One upstream poller per watched symbol feeds any number of subscribers, so provider
+load depends on the symbols watched rather than the number of viewers. Pollers share
+a rate limit on provider calls and publish only the fields that changed. Only providers
+whose own quota sustains that rate are polled (see MultiProviderFinancialData). Updates a
+subscriber has not sent yet are coalesced; a subscriber that falls too far behind is
+dropped.
+"""
+
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+# Seconds between upstream fetches of a watched symbol
+QUOTE_POLL_INTERVAL = float(os.getenv('QUOTE_POLL_INTERVAL', '15'))
+# Provider calls per minute shared by all pollers; providers whose quota is smaller aren't polled
+QUOTE_UPSTREAM_PER_MINUTE = int(os.getenv('QUOTE_UPSTREAM_PER_MINUTE', '30'))
+# Symbols one client may watch
+QUOTE_MAX_SYMBOLS = int(os.getenv('QUOTE_MAX_SYMBOLS', '20'))
+# Updates coalesced while a subscriber is still sending before it is dropped
+QUOTE_MAX_LAG = int(os.getenv('QUOTE_MAX_LAG', '10'))
+
+class RateLimiter:
+    """Spaces calls evenly so that at most per_minute start in any minute"""
+
+    def __init__(self, per_minute: int):
+        self.spacing = 60.0 / max(1, per_minute)
+        self._next = 0.0
+
+    async def wait(self):
+        now = time.monotonic()
+        start = max(now, self._next)
+        self._next = start + self.spacing
+        if start > now:
+            await asyncio.sleep(start - now)
+
+class Subscriber:
+    """
+    One client's view of the hub
+    pending holds the changes per symbol not yet sent; lag counts updates merged into
+    pending since the client last caught up.
+    """
+
+    def __init__(self, max_lag: int = QUOTE_MAX_LAG):
+        self.max_lag = max_lag
+        self.symbols: Set[str] = set()
+        self.pending: Dict[str, Dict] = {}
+        self.lag = 0
+        self.closed = False
+        self.dropped = False
+        self._ready = asyncio.Event()
+
+    def push(self, symbol: str, changes: Dict) -> bool:
+        """Queue changes for the client; False if it is now too far behind"""
+        if symbol in self.pending:
+            self.lag += 1
+        self.pending.setdefault(symbol, {}).update(changes)
+        self._ready.set()
+        return self.lag <= self.max_lag
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+    async def next_updates(self) -> Optional[Dict[str, Dict]]:
+        """Wait for pending changes and take them all; None once closed or dropped"""
+        await self._ready.wait()
+        self._ready.clear()
+        if self.closed:
+            return None
+        updates, self.pending, self.lag = self.pending, {}, 0
+        return updates
+
+class QuoteHub:
+    """
+    Runs a poller per symbol while it has subscribers
+
+    fetch(symbol) returns the current quote fields and raises on failure; a failure is
+    published as an "error" field and cleared by the next successful fetch.
+    """
+
+    def __init__(self, fetch: Callable[[str], Awaitable[Dict]],
+                 poll_interval: float = QUOTE_POLL_INTERVAL,
+                 upstream_per_minute: int = QUOTE_UPSTREAM_PER_MINUTE,
+                 max_lag: int = QUOTE_MAX_LAG):
+        self.fetch = fetch
+        self.poll_interval = poll_interval
+        self.max_lag = max_lag
+        self.upstream_per_minute = upstream_per_minute
+        self.limiter = RateLimiter(upstream_per_minute)
+        self._subscribers: Dict[str, Set[Subscriber]] = {}
+        self._pollers: Dict[str, asyncio.Task] = {}
+        self._latest: Dict[str, Dict] = {}
+        self.upstream_calls = 0
+        self.dropped = 0
+
+    def subscriber(self) -> Subscriber:
+        return Subscriber(self.max_lag)
+
+    def subscribe(self, subscriber: Subscriber, symbols: List[str]):
+        for symbol in symbols:
+            subscriber.symbols.add(symbol)
+            self._subscribers.setdefault(symbol, set()).add(subscriber)
+            if symbol in self._latest:
+                # Start the new subscriber from the full current quote
+                subscriber.push(symbol, self._latest[symbol])
+            if symbol not in self._pollers:
+                self._pollers[symbol] = asyncio.create_task(self._poll(symbol))
+
+    def unsubscribe(self, subscriber: Subscriber, symbols: Optional[List[str]] = None):
+        for symbol in list(subscriber.symbols if symbols is None else symbols):
+            subscriber.symbols.discard(symbol)
+            subscriber.pending.pop(symbol, None)
+            watchers = self._subscribers.get(symbol)
+            if watchers is None:
+                continue
+            watchers.discard(subscriber)
+            if not watchers:
+                # Nobody is watching; stop polling the provider for this symbol
+                del self._subscribers[symbol]
+                self._latest.pop(symbol, None)
+                poller = self._pollers.pop(symbol, None)
+                if poller is not None:
+                    poller.cancel()
+
+    def drop(self, subscriber: Subscriber):
+        """Disconnect a subscriber that can't keep up"""
+        self.unsubscribe(subscriber)
+        subscriber.dropped = True
+        subscriber.close()
+        self.dropped += 1
+
+    def _publish(self, symbol: str, changes: Dict):
+        for subscriber in list(self._subscribers.get(symbol, ())):
+            if not subscriber.push(symbol, changes):
+                self.drop(subscriber)
+
+    async def _poll(self, symbol: str):
+        while True:
+            await self.limiter.wait()
+            previous = self._latest.get(symbol, {})
+            try:
+                self.upstream_calls += 1
+                quote = {**await self.fetch(symbol), "error": None}
+            except Exception as e:
+                quote = {**previous, "error": str(e)}
+
+            changes = {key: value for key, value in quote.items() if previous.get(key, ...) != value}
+            if changes and symbol in self._subscribers:
+                self._latest[symbol] = quote
+                self._publish(symbol, changes)
+            await asyncio.sleep(self.poll_interval)
+
+    async def stop(self):
+        pollers = list(self._pollers.values())
+        for poller in pollers:
+            poller.cancel()
+        await asyncio.gather(*pollers, return_exceptions=True)
+        self._pollers.clear()
+
+    def get_status(self) -> Dict:
+        return {
+            "symbols": sorted(self._pollers),
+            "subscribers": len({s for watchers in self._subscribers.values() for s in watchers}),
+            "poll_interval": self.poll_interval,
+            "upstream_calls": self.upstream_calls,
+            "dropped_subscribers": self.dropped
+        }
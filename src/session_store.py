@@ -0,0 +1,239 @@
+"""
+Server-side conversation sessions
+Keeps each conversation's history and derived state (rolling summary, token counts)
+on the server, keyed by session id, so clients only send the new message. Sessions
+expire after a TTL and both the number of sessions and their length are capped.
+Backends: in-process memory (default) or SQLite, selected with SESSION_STORE.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from context_packer import count_tokens
+from structured_logging import get_logger
+
+# Load environment variables
+load_dotenv()
+
+log = get_logger("sessions")
+
+SESSION_STORE = os.getenv('SESSION_STORE', 'memory')
+SESSION_DB_PATH = os.getenv('SESSION_DB_PATH', 'sessions.db')
+SESSION_TTL = float(os.getenv('SESSION_TTL', '86400'))
+SESSION_MAX_SESSIONS = int(os.getenv('SESSION_MAX_SESSIONS', '1000'))
+# Older messages beyond this are dropped; the rolling summary still covers them
+SESSION_MAX_MESSAGES = int(os.getenv('SESSION_MAX_MESSAGES', '200'))
+
+class SessionNotFound(Exception):
+    """Raised when a request names a session that does not exist or has expired"""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        super().__init__(f"Session {session_id} not found or expired")
+
+@dataclass
+class Session:
+    id: str
+    company_name: str
+    history: List[dict] = field(default_factory=list)
+    # Derived state kept across turns, e.g. {"summary": {"turns": n, "text": ...}}
+    state: Dict = field(default_factory=dict)
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+    @property
+    def tokens(self) -> int:
+        return sum(message.get('tokens', 0) for message in self.history)
+
+    def as_dict(self) -> Dict:
+        return {
+            "session_id": self.id,
+            "company_name": self.company_name,
+            "history": [{'role': m['role'], 'content': m['content']} for m in self.history],
+            "messages": len(self.history),
+            "tokens": self.tokens,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
+
+def new_message(role: str, content: str) -> dict:
+    """A history message with its token count, so it is only counted once"""
+    return {'role': role, 'content': content, 'tokens': count_tokens(content)}
+
+class SessionStore:
+    """
+    Common session logic; backends implement _load, _save, _delete, _purge and _count
+
+    append() re-reads the session before adding messages so concurrent turns on the
+    same session don't overwrite each other's messages.
+    """
+
+    def __init__(self, ttl: float = SESSION_TTL, max_sessions: int = SESSION_MAX_SESSIONS,
+                 max_messages: int = SESSION_MAX_MESSAGES):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_messages = max_messages
+        self._lock = threading.Lock()
+
+    def create(self, company_name: str) -> Session:
+        session = Session(id=uuid.uuid4().hex, company_name=company_name.upper())
+        with self._lock:
+            self._purge(time.time() - self.ttl, self.max_sessions - 1)
+            self._save(session)
+        return session
+
+    def get(self, session_id: str) -> Optional[Session]:
+        with self._lock:
+            session = self._load(session_id)
+            if session is not None and time.time() - session.updated_at > self.ttl:
+                self._delete(session_id)
+                return None
+            return session
+
+    def append(self, session_id: str, messages: List[dict], state: Optional[Dict] = None) -> Optional[Session]:
+        """Add messages (and merge derived state) to a session; None if it has expired"""
+        with self._lock:
+            session = self._load(session_id)
+            if session is None:
+                return None
+            session.history.extend(messages)
+            if state:
+                session.state.update(state)
+            self._trim(session)
+            session.updated_at = time.time()
+            self._save(session)
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._delete(session_id)
+
+    def _trim(self, session: Session):
+        excess = len(session.history) - self.max_messages
+        if excess <= 0:
+            return
+        del session.history[:excess]
+        summary = session.state.get("summary")
+        if summary:
+            # The summary still describes the dropped messages, so it is kept even once it
+            # covers none of the remaining ones
+            summary["turns"] = max(0, summary["turns"] - excess)
+
+    def get_status(self) -> Dict:
+        with self._lock:
+            self._purge(time.time() - self.ttl, self.max_sessions)
+            count = self._count()
+        return {
+            "backend": self.backend,
+            "sessions": count,
+            "max_sessions": self.max_sessions,
+            "max_messages": self.max_messages,
+            "ttl": self.ttl
+        }
+
+class MemorySessionStore(SessionStore):
+    """Sessions in an LRU dict; lost when the process restarts"""
+
+    backend = "memory"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._sessions = OrderedDict()
+
+    def _load(self, session_id):
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        self._sessions.move_to_end(session_id)
+        # Callers get their own lists, as they would from SQLite
+        return replace(session, history=list(session.history), state=dict(session.state))
+
+    def _save(self, session):
+        self._sessions[session.id] = session
+        self._sessions.move_to_end(session.id)
+
+    def _delete(self, session_id):
+        return self._sessions.pop(session_id, None) is not None
+
+    def _purge(self, expired_before, keep):
+        for session_id, session in list(self._sessions.items()):
+            if session.updated_at < expired_before:
+                del self._sessions[session_id]
+        while len(self._sessions) > max(keep, 0):
+            self._sessions.popitem(last=False)
+
+    def _count(self):
+        return len(self._sessions)
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions in a SQLite database, shared between workers and kept across restarts"""
+
+    backend = "sqlite"
+
+    def __init__(self, path: str = SESSION_DB_PATH, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS sessions (
+            id TEXT PRIMARY KEY,
+            company_name TEXT NOT NULL,
+            history TEXT NOT NULL,
+            state TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)")
+        self._db.commit()
+
+    def _load(self, session_id):
+        row = self._db.execute(
+            "SELECT id, company_name, history, state, created_at, updated_at FROM sessions WHERE id = ?",
+            (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return Session(id=row[0], company_name=row[1], history=json.loads(row[2]), state=json.loads(row[3]),
+                       created_at=row[4], updated_at=row[5])
+
+    def _save(self, session):
+        self._db.execute(
+            "INSERT OR REPLACE INTO sessions (id, company_name, history, state, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (session.id, session.company_name, json.dumps(session.history), json.dumps(session.state),
+             session.created_at, session.updated_at)
+        )
+        self._db.commit()
+
+    def _delete(self, session_id):
+        deleted = self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,)).rowcount
+        self._db.commit()
+        return deleted > 0
+
+    def _purge(self, expired_before, keep):
+        self._db.execute("DELETE FROM sessions WHERE updated_at < ?", (expired_before,))
+        self._db.execute(
+            "DELETE FROM sessions WHERE id NOT IN (SELECT id FROM sessions ORDER BY updated_at DESC LIMIT ?)",
+            (max(keep, 0),)
+        )
+        self._db.commit()
+
+    def _count(self):
+        return self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+def create_session_store(backend: str = SESSION_STORE) -> SessionStore:
+    """Session store for the configured backend ("memory" or "sqlite")"""
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    if backend != "memory":
+        log.warning("unknown_session_store", backend=backend)
+    return MemorySessionStore()
@@ -0,0 +1,207 @@
+"""
+Structured logging for the hot paths
+Provider and cache events are logged as an event name plus key/value fields. Records
+below LOG_LEVEL are discarded before anything is formatted. The rest are handed to a
+bounded queue and written by a background thread, so request threads never wait on
+stdout; when the queue is full, records are dropped and counted instead of blocking.
+Repetitive INFO/DEBUG events are sampled: each event passes LOG_SAMPLE_BURST times
+per LOG_SAMPLE_WINDOW seconds, and the next one that passes reports how many were
+suppressed.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+from tracing import current_trace
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+# "text" for key=value lines, "json" for one JSON object per line
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()
+# Write to this file instead of stderr
+LOG_FILE = os.getenv('LOG_FILE', '')
+# Records waiting to be written before new ones are dropped
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+# INFO/DEBUG records let through per event and window; 0 disables sampling
+LOG_SAMPLE_BURST = int(os.getenv('LOG_SAMPLE_BURST', '20'))
+LOG_SAMPLE_WINDOW = float(os.getenv('LOG_SAMPLE_WINDOW', '60'))
+
+ROOT_LOGGER = "financial_agent"
+
+class SamplingFilter(logging.Filter):
+    """Lets `burst` records per (logger, event) through each window; WARNING and above always pass"""
+
+    def __init__(self, burst: int = LOG_SAMPLE_BURST, window: float = LOG_SAMPLE_WINDOW):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.suppressed = 0
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.burst <= 0 or record.levelno >= logging.WARNING:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            window_start, passed, suppressed = self._counts.get(key, (now, 0, 0))
+            if now - window_start >= self.window:
+                window_start, passed = now, 0
+            if passed >= self.burst:
+                self._counts[key] = (window_start, passed, suppressed + 1)
+                self.suppressed += 1
+                return False
+            self._counts[key] = (window_start, passed + 1, 0)
+        if suppressed:
+            record.fields = {**getattr(record, "fields", {}), "suppressed": suppressed}
+        return True
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records when the queue is full rather than blocking or raising"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Fields are plain values; only tracebacks need rendering before the record leaves the thread
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def _format_value(value) -> str:
+    text = str(value)
+    return json.dumps(text) if not text or any(c in text for c in ' ="\n') else text
+
+class TextFormatter(logging.Formatter):
+    """`time LEVEL logger event key=value ...`"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", {})
+        line = " ".join(
+            [self.formatTime(record, "%H:%M:%S"), f"{record.levelname:<7}", record.name, record.getMessage()]
+            + [f"{key}={_format_value(value)}" for key, value in fields.items()]
+        )
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, logger, event and the fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+            **getattr(record, "fields", {})
+        }
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class StructuredLogger:
+    """
+    log.info("event_name", key=value, ...)
+    Fields are only collected when the level is enabled; the current trace id is added
+    so log lines can be matched to exported traces.
+    """
+
+    def __init__(self, logger: logging.Logger):
+        self.logger = logger
+
+    def _log(self, level: int, event: str, fields: Dict, exc_info=None):
+        if not self.logger.isEnabledFor(level):
+            return
+        active = current_trace()
+        if active is not None:
+            fields["trace_id"] = active.trace_id
+        self.logger.log(level, event, extra={"fields": fields}, exc_info=exc_info)
+
+    def debug(self, event: str, **fields):
+        self._log(logging.DEBUG, event, fields)
+
+    def info(self, event: str, **fields):
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event: str, **fields):
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event: str, exc_info=None, **fields):
+        self._log(logging.ERROR, event, fields, exc_info=exc_info)
+
+    def is_enabled(self, level: int) -> bool:
+        return self.logger.isEnabledFor(level)
+
+_lock = threading.Lock()
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[DroppingQueueHandler] = None
+_sampler: Optional[SamplingFilter] = None
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, path: str = LOG_FILE,
+                      stream=None, queue_size: int = LOG_QUEUE_SIZE,
+                      sample_burst: int = LOG_SAMPLE_BURST, sample_window: float = LOG_SAMPLE_WINDOW):
+    """(Re)build the handler pipeline for the application loggers; called on first get_logger"""
+    global _listener, _queue_handler, _sampler
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+
+        output = logging.FileHandler(path, encoding="utf-8") if path else logging.StreamHandler(stream or sys.stderr)
+        output.setFormatter(JSONFormatter() if fmt == "json" else TextFormatter())
+
+        log_queue = queue.Queue(maxsize=max(1, queue_size))
+        _queue_handler = DroppingQueueHandler(log_queue)
+        _sampler = SamplingFilter(sample_burst, sample_window)
+        _queue_handler.addFilter(_sampler)
+
+        root = logging.getLogger(ROOT_LOGGER)
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_queue_handler)
+        root.setLevel(getattr(logging, level.upper(), logging.INFO))
+        # Keep application records out of whatever the host (uvicorn, tests) configured on the root logger
+        root.propagate = False
+
+        _listener = logging.handlers.QueueListener(log_queue, output)
+        _listener.start()
+
+def shutdown_logging():
+    """Write out queued records and stop the writer thread"""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+atexit.register(shutdown_logging)
+
+def get_logger(name: str) -> StructuredLogger:
+    """Logger under the application namespace, e.g. get_logger("providers")"""
+    if _listener is None:
+        configure_logging()
+    return StructuredLogger(logging.getLogger(f"{ROOT_LOGGER}.{name}"))
+
+def get_status() -> Dict:
+    return {
+        "level": logging.getLevelName(logging.getLogger(ROOT_LOGGER).level),
+        "queued": _queue_handler.queue.qsize() if _queue_handler else 0,
+        "dropped": _queue_handler.dropped if _queue_handler else 0,
+        "sampled_out": _sampler.suppressed if _sampler else 0
+    }
@@ -0,0 +1,314 @@
+"""
+Request tracing
+Records timed spans (cache lookups, provider attempts, yfinance retries, LLM queueing
+and generation) for each request using context variables, so spans opened in worker
+threads or nested calls attach to the request that caused them. Finished traces are
+summarized in a Server-Timing header and can be appended to a file as OTLP/JSON, the
+format read by the OpenTelemetry Collector's otlpjsonfile receiver. The file is written
+by a background thread, so requests never wait on it.
+"""
+
+import atexit
+import json
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+# Record spans for HTTP requests and background jobs
+TRACE_ENABLED = os.getenv('TRACE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+# Append finished traces to this file as OTLP/JSON, one export request per line; empty disables
+TRACE_EXPORT_PATH = os.getenv('TRACE_EXPORT_PATH', '')
+TRACE_SERVICE_NAME = os.getenv('TRACE_SERVICE_NAME', 'financial-agent')
+# Finished traces waiting to be written before new ones are dropped
+TRACE_EXPORT_QUEUE_SIZE = int(os.getenv('TRACE_EXPORT_QUEUE_SIZE', '1000'))
+# Spans kept per trace; later spans are counted but not stored
+TRACE_MAX_SPANS = int(os.getenv('TRACE_MAX_SPANS', '1000'))
+
+_TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+class Span:
+    """One timed operation; attributes are plain str/int/float/bool values"""
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict):
+        self.trace = trace
+        self.name = name
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def fail(self, message: str):
+        """Mark the operation as failed without raising (e.g. a provider's error string)"""
+        self.error = message
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self.trace.add(self)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def as_otlp(self, kind: int = 1) -> Dict:
+        otlp = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": _otlp_attributes(self.attributes),
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1}
+        }
+        if self.parent_id:
+            otlp["parentSpanId"] = self.parent_id
+        return otlp
+
+class _NoopSpan:
+    """Returned outside a trace so instrumented code needn't check"""
+    span_id = None
+
+    def set(self, **attributes):
+        pass
+
+    def fail(self, message: str):
+        pass
+
+    def end(self):
+        pass
+
+NOOP_SPAN = _NoopSpan()
+
+class Trace:
+    """
+    The spans of one request or job
+    trace_id and parent_id continue an incoming W3C traceparent when there is one.
+    """
+
+    def __init__(self, name: str, trace_id: Optional[str] = None, parent_id: Optional[str] = None,
+                 max_spans: int = TRACE_MAX_SPANS, **attributes):
+        self.trace_id = trace_id or secrets.token_hex(16)
+        self.max_spans = max_spans
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self.root = Span(self, name, parent_id, attributes)
+
+    def add(self, span: Span):
+        if span is self.root:
+            return
+        with self._lock:
+            if len(self.spans) < self.max_spans:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+
+    def timings(self) -> Dict[str, Dict]:
+        """Total milliseconds and count of finished spans per name"""
+        with self._lock:
+            spans = list(self.spans)
+        timings = {}
+        for span in spans:
+            entry = timings.setdefault(span.name, {"ms": 0.0, "count": 0})
+            entry["ms"] += span.duration_ms
+            entry["count"] += 1
+        return timings
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: one metric per span name plus the elapsed total"""
+        metrics = []
+        for name, entry in self.timings().items():
+            metric = f"{name};dur={entry['ms']:.1f}"
+            if entry["count"] > 1:
+                metric += f';desc="{entry["count"]} calls"'
+            metrics.append(metric)
+        metrics.append(f"total;dur={self.root.duration_ms:.1f}")
+        return ", ".join(metrics)
+
+    def as_otlp(self) -> Dict:
+        """An OTLP/JSON ExportTraceServiceRequest holding this trace"""
+        with self._lock:
+            spans = [self.root.as_otlp(kind=2)] + [span.as_otlp() for span in self.spans]
+        return {"resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": TRACE_SERVICE_NAME})},
+            "scopeSpans": [{"scope": {"name": "financial-agent.tracing"}, "spans": spans}]
+        }]}
+
+def _otlp_attributes(attributes: Dict) -> List[Dict]:
+    encoded = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            encoded.append({"key": key, "value": {"boolValue": value}})
+        elif isinstance(value, int):
+            encoded.append({"key": key, "value": {"intValue": str(value)}})
+        elif isinstance(value, float):
+            encoded.append({"key": key, "value": {"doubleValue": value}})
+        elif value is not None:
+            encoded.append({"key": key, "value": {"stringValue": str(value)}})
+    return encoded
+
+class TraceExporter:
+    """
+    Appends traces to a file as OTLP/JSON lines
+    export() only queues the trace; a background thread serializes and writes whatever
+    has queued up in one append. When the queue is full, traces are dropped and counted
+    rather than blocking the request.
+    """
+
+    def __init__(self, path: str, queue_size: int = TRACE_EXPORT_QUEUE_SIZE):
+        self.path = path
+        self.exported = 0
+        self.failures = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        threading.Thread(target=self._write_loop, name="trace-export", daemon=True).start()
+
+    def export(self, trace: Trace):
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Wait until every queued trace has been written"""
+        self._queue.join()
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                lines = "".join(json.dumps(trace.as_otlp(), separators=(",", ":")) + "\n" for trace in batch)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(lines)
+                self.exported += len(batch)
+            except OSError as e:
+                self.failures += len(batch)
+                # structured_logging imports this module for trace ids
+                from structured_logging import get_logger
+                get_logger("tracing").warning("trace_export_failed", path=self.path, traces=len(batch), error=str(e))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+exporter = TraceExporter(TRACE_EXPORT_PATH) if TRACE_EXPORT_PATH else None
+if exporter is not None:
+    atexit.register(exporter.flush)
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+def start_span(name: str, **attributes):
+    """
+    Start a span under the current one without making it current
+    For async generators and other code that can't hold a context manager open;
+    call end() when the operation finishes.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return NOOP_SPAN
+    parent = _current_span.get() or trace.root
+    return Span(trace, name, parent.span_id, attributes)
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time the block as a child of the current span; exceptions mark it failed"""
+    active = start_span(name, **attributes)
+    if active is NOOP_SPAN:
+        yield active
+        return
+    token = _current_span.set(active)
+    try:
+        yield active
+    except BaseException as e:
+        active.fail(f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        _current_span.reset(token)
+        active.end()
+
+def parse_traceparent(header: Optional[str]):
+    """(trace_id, parent_span_id) from a W3C traceparent header, or (None, None)"""
+    match = _TRACEPARENT.match((header or "").strip().lower())
+    if not match or set(match.group(1)) == {"0"}:
+        return None, None
+    return match.group(1), match.group(2)
+
+@contextmanager
+def trace(name: str, traceparent: Optional[str] = None, **attributes):
+    """Collect the spans opened in this block (and in tasks or threads it starts) into one trace"""
+    trace_id, parent_id = parse_traceparent(traceparent)
+    active = Trace(name, trace_id, parent_id, **attributes)
+    trace_token = _current_trace.set(active)
+    span_token = _current_span.set(active.root)
+    try:
+        yield active
+    except BaseException as e:
+        active.root.fail(f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        active.root.end()
+        if exporter is not None:
+            exporter.export(active)
+
+class TracingMiddleware:
+    """
+    ASGI middleware that traces each HTTP request
+    The response gets a Server-Timing header with the spans finished before the
+    headers were sent (for streamed responses, the work done before the first byte)
+    and an X-Trace-Id header; the whole trace is exported once the body is complete.
+    """
+
+    def __init__(self, app, exclude_prefixes=("/static",)):
+        self.app = app
+        self.exclude_prefixes = tuple(exclude_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if not TRACE_ENABLED or scope["type"] != "http" or scope["path"].startswith(self.exclude_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        traceparent = headers.get(b"traceparent", b"").decode("latin-1")
+        with trace(f"{scope['method']} {scope['path']}", traceparent,
+                   **{"http.method": scope["method"], "http.target": scope["path"]}) as active:
+            async def send_with_timing(message):
+                if message["type"] == "http.response.start":
+                    active.root.set(**{"http.status_code": message["status"]})
+                    message = {**message, "headers": list(message.get("headers", [])) + [
+                        (b"server-timing", active.server_timing().encode("latin-1")),
+                        (b"x-trace-id", active.trace_id.encode("latin-1")),
+                    ]}
+                await send(message)
+
+            await self.app(scope, receive, send_with_timing)
+
+def get_status() -> Dict:
+    return {
+        "enabled": TRACE_ENABLED,
+        "export_path": TRACE_EXPORT_PATH or None,
+        "exported": exporter.exported if exporter else 0,
+        "export_failures": exporter.failures if exporter else 0,
+        "export_dropped": exporter.dropped if exporter else 0
+    }
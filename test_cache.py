@@ -8,19 +8,15 @@ import time
 sys.path.append('src')
 
 from financial_agents import FinancialAnalysisAgent
-from langchain_community.llms import Ollama
+from llm_factory import get_llm
 
 def test_caching():
     """Test the caching functionality"""
     print("🧪 Testing Financial Data Caching")
     print("=" * 50)
     
-    # Initialize the agent with Llama 3.1
-    llm = Ollama(
-        model="llama3.1:8b",
-        temperature=0.7,
-        base_url="http://localhost:11434"
-    )
+    # Initialize the agent with the shared analysis LLM
+    llm = get_llm()
     
     agent = FinancialAnalysisAgent(llm)
     
@@ -0,0 +1,321 @@
+"""
+Deterministic fakes for offline tests and benchmarks
+FakeProvider stands in for a market data provider with a configurable latency and
+failure profile; FakeTicker replaces yfinance.Ticker with a synthetic price history so
+the Yahoo provider's indicator code runs offline; FakeLLM models an Ollama server's
+prefill and token rates, for both LangChain-style invoke() and the async client, and
+FakeOllamaServer serves the same model over Ollama's HTTP API.
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+def _seed(*parts) -> int:
+    return int.from_bytes(hashlib.sha256(":".join(map(str, parts)).encode()).digest()[:8], "big")
+
+def synthetic_financial_data(symbol: str, source: str = "Fake Provider") -> str:
+    """Provider-style "Label: value" text for a symbol; the same symbol always gives the same values"""
+    rng = random.Random(_seed("quote", symbol.upper()))
+    price = round(rng.uniform(20, 500), 2)
+    previous = round(price * rng.uniform(0.97, 1.03), 2)
+    return "\n".join([
+        f"Financial Data for {symbol.upper()} ({symbol.upper()} Corp.):",
+        f"Data Source: {source}",
+        f"Sector: {rng.choice(['Technology', 'Healthcare', 'Energy', 'Financials'])}",
+        "",
+        "Latest Trading Data:",
+        f"Current Price: ${price:.2f}",
+        f"Day High: ${price * 1.01:.2f}",
+        f"Day Low: ${price * 0.99:.2f}",
+        f"Open: ${previous * 1.002:.2f}",
+        f"Volume: {rng.randint(1_000_000, 80_000_000):,}",
+        f"Previous Close: ${previous:.2f}",
+        f"Change: {(price / previous - 1) * 100:.2f}%",
+        f"Market Cap: ${price * rng.randint(100_000_000, 10_000_000_000):,.0f}",
+        f"50-day Average: ${price * rng.uniform(0.9, 1.1):.2f}",
+        f"200-day Average: ${price * rng.uniform(0.8, 1.2):.2f}",
+        "",
+        "Technical Indicators:",
+        f"20-day SMA: ${price * rng.uniform(0.95, 1.05):.2f}",
+        f"50-day SMA: ${price * rng.uniform(0.9, 1.1):.2f}",
+        f"14-day RSI: {rng.uniform(20, 80):.2f}",
+        "",
+        "Fundamental Data:",
+        f"P/E Ratio: {rng.uniform(8, 60):.2f}",
+        f"Dividend Yield: {rng.uniform(0, 4):.2f}%",
+        f"Beta: {rng.uniform(0.5, 2):.2f}",
+    ])
+
+@dataclass
+class LatencyProfile:
+    """
+    How a fake provider behaves
+    latency_ms +/- jitter_ms per call; failure_rate of calls fail, either with the
+    provider convention of an "Error: ..." string or by raising.
+    """
+    latency_ms: float = 50.0
+    jitter_ms: float = 0.0
+    failure_rate: float = 0.0
+    failure: str = "error"  # "error" or "exception"
+
+class FakeProvider:
+    """Market data provider with a deterministic latency and failure sequence"""
+
+    def __init__(self, name: str = "Fake Provider", profile: Optional[LatencyProfile] = None,
+                 seed: int = 0, sleep: Callable[[float], None] = time.sleep):
+        self.name = name
+        self.rate_limit = "Unlimited (fake)"
+        self.profile = profile or LatencyProfile()
+        self.sleep = sleep
+        self.calls = 0
+        self.failures = 0
+        self._rng = random.Random(_seed("provider", name, seed))
+
+    def get_financial_data(self, symbol: str) -> str:
+        self.calls += 1
+        profile = self.profile
+        latency = profile.latency_ms + self._rng.uniform(-profile.jitter_ms, profile.jitter_ms)
+        failed = self._rng.random() < profile.failure_rate
+        if latency > 0:
+            self.sleep(latency / 1000)
+        if failed:
+            self.failures += 1
+            if profile.failure == "exception":
+                raise ConnectionError(f"{self.name} timed out for {symbol}")
+            return f"Error: {self.name} returned no data for {symbol}"
+        return synthetic_financial_data(symbol, self.name)
+
+def synthetic_history(symbol: str, days: int = 252):
+    """Daily OHLCV DataFrame following a seeded random walk (imports pandas)"""
+    import pandas as pd
+
+    rng = random.Random(_seed("history", symbol.upper()))
+    close = rng.uniform(20, 500)
+    rows = []
+    for _ in range(days):
+        open_price = close
+        close = max(1.0, close * (1 + rng.gauss(0, 0.015)))
+        rows.append({
+            "Open": open_price,
+            "High": max(open_price, close) * (1 + abs(rng.gauss(0, 0.005))),
+            "Low": min(open_price, close) * (1 - abs(rng.gauss(0, 0.005))),
+            "Close": close,
+            "Volume": rng.randint(1_000_000, 50_000_000),
+        })
+    index = pd.bdate_range(end="2024-06-28", periods=days, tz="America/New_York")
+    return pd.DataFrame(rows, index=index)
+
+class FakeTicker:
+    """Replacement for yfinance.Ticker: synthetic history, fast_info and info, no network"""
+
+    periods = {"5d": 5, "1mo": 22, "3mo": 66, "1y": 252}
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol.upper()
+        self._history = synthetic_history(self.symbol)
+
+    def history(self, period: str = "1y", **kwargs):
+        return self._history.tail(self.periods.get(period, 252)).copy()
+
+    @property
+    def fast_info(self) -> Dict:
+        last, previous = self._history["Close"].iloc[-1], self._history["Close"].iloc[-2]
+        return {
+            "lastPrice": float(last),
+            "previousClose": float(previous),
+            "dayHigh": float(self._history["High"].iloc[-1]),
+            "dayLow": float(self._history["Low"].iloc[-1]),
+            "open": float(self._history["Open"].iloc[-1]),
+            "lastVolume": float(self._history["Volume"].iloc[-1]),
+            "marketCap": float(last) * 1e9,
+        }
+
+    @property
+    def info(self) -> Dict:
+        return {"longName": f"{self.symbol} Corp.", "sector": "Technology", "trailingPE": 25.0,
+                "dividendYield": 0.01, "beta": 1.1}
+
+class FakeLLM:
+    """
+    Token-rate model of an Ollama server
+    A generation waits first_token_ms plus the prompt's prefill time (prompt tokens /
+    prefill_tokens_per_second), then produces output_tokens at tokens_per_second. Prompt
+    tokens are approximated as characters / 4.
+    """
+
+    def __init__(self, tokens_per_second: float = 2000.0, prefill_tokens_per_second: float = 20000.0,
+                 first_token_ms: float = 5.0, output_tokens: int = 64, chunk_tokens: int = 8):
+        self.tokens_per_second = tokens_per_second
+        self.prefill_tokens_per_second = prefill_tokens_per_second
+        self.first_token_ms = first_token_ms
+        self.output_tokens = output_tokens
+        self.chunk_tokens = max(1, chunk_tokens)
+        self.model = "fake-llm"
+        self.temperature = 0.0
+        self.calls = 0
+
+    def prefill_seconds(self, prompt: str) -> float:
+        return self.first_token_ms / 1000 + (len(prompt) / 4) / self.prefill_tokens_per_second
+
+    def _chunks(self, prompt: str) -> List[str]:
+        words = [f"token{i}" for i in range(self.output_tokens)]
+        return [" ".join(words[i:i + self.chunk_tokens]) + " "
+                for i in range(0, len(words), self.chunk_tokens)]
+
+    def invoke(self, prompt, **kwargs) -> str:
+        """LangChain-style blocking call"""
+        self.calls += 1
+        prompt = str(prompt)
+        time.sleep(self.prefill_seconds(prompt) + self.output_tokens / self.tokens_per_second)
+        return "".join(self._chunks(prompt)).strip()
+
+    async def astream(self, prompt: str, context=None, on_done=None, priority=None,
+                      model: Optional[str] = None, scheduler=None, **options):
+        """Same interface as AsyncOllamaClient.astream"""
+        async def generate():
+            self.calls += 1
+            await asyncio.sleep(self.prefill_seconds(prompt))
+            chunks = self._chunks(prompt)
+            for chunk in chunks:
+                await asyncio.sleep(min(self.chunk_tokens, self.output_tokens) / self.tokens_per_second)
+                yield chunk
+            if on_done is not None:
+                on_done({"done": True, "context": [len(prompt), self.output_tokens],
+                         "prompt_eval_count": len(prompt) // 4, "eval_count": self.output_tokens})
+
+        if scheduler is None:
+            async for chunk in generate():
+                yield chunk
+            return
+        async with scheduler.slot(priority) if priority is not None else scheduler.slot():
+            async for chunk in generate():
+                yield chunk
+
+    def install(self, client):
+        """Serve an AsyncOllamaClient's generations from this model, through the client's scheduler"""
+        async def astream(prompt, context=None, on_done=None, priority=None, model=None, **options):
+            async for chunk in self.astream(prompt, context, on_done, priority, model,
+                                            scheduler=client.scheduler, **options):
+                yield chunk
+
+        async def load(model=None):
+            return None
+
+        client.astream = astream
+        client.load = load
+        return client
+
+class _OllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _send_json(self, payload: Dict, status: int = 200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.startswith("/api/tags") or self.path.startswith("/api/ps"):
+            self._send_json({"models": [{"name": self.server.llm.model}]})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.startswith("/api/generate"):
+            self._send_json({"error": "not found"}, 404)
+            return
+
+        llm, prompt, model = self.server.llm, request.get("prompt") or "", request.get("model", "fake-llm")
+        if not prompt:
+            # Ollama loads the model on an empty prompt
+            self._send_json({"model": model, "response": "", "done": True})
+            return
+
+        with self.server.slots:
+            try:
+                time.sleep(llm.prefill_seconds(prompt))
+                chunks = llm._chunks(prompt)
+                done = {"model": model, "response": "", "done": True,
+                        "context": list(range(len(prompt) // 4 + llm.output_tokens))[-2048:],
+                        "prompt_eval_count": len(prompt) // 4, "eval_count": llm.output_tokens}
+                if request.get("stream") is False:
+                    time.sleep(llm.output_tokens / llm.tokens_per_second)
+                    self._send_json({**done, "response": "".join(chunks)})
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                def write(payload):
+                    line = (json.dumps(payload) + "\n").encode()
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                    self.wfile.flush()
+
+                for chunk in chunks:
+                    time.sleep(min(llm.chunk_tokens, llm.output_tokens) / llm.tokens_per_second)
+                    write({"model": model, "response": chunk, "done": False})
+                write(done)
+                self.wfile.write(b"0\r\n\r\n")
+            finally:
+                self.server.generations += 1
+
+    def log_message(self, format, *args):
+        pass
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients closing pooled connections aren't worth a traceback
+        if not isinstance(sys.exc_info()[1], (ConnectionError, TimeoutError)):
+            super().handle_error(request, client_address)
+
+class FakeOllamaServer:
+    """
+    Ollama's /api/generate over HTTP, timed by a FakeLLM
+    At most `parallel` generations run at once (like OLLAMA_NUM_PARALLEL); the rest
+    wait their turn, so the server saturates the way a single GPU does.
+    """
+
+    def __init__(self, llm: Optional[FakeLLM] = None, parallel: int = 1, host: str = "127.0.0.1", port: int = 0):
+        self.llm = llm or FakeLLM()
+        self._server = _QuietHTTPServer((host, port), _OllamaHandler)
+        self._server.llm = self.llm
+        self._server.slots = threading.BoundedSemaphore(max(1, parallel))
+        self._server.generations = 0
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def generations(self) -> int:
+        return self._server.generations
+
+    def start(self) -> "FakeOllamaServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -1,116 +1,243 @@
 """
-Simple fallback provider that creates mock data for testing
+Synthetic market data for testing
+SyntheticMarketProvider generates any number of symbols from a seed: daily OHLCV
+history following geometric Brownian motion, fundamentals, and intraday ticks. The
+same (seed, symbol) always gives the same data. It answers in the providers' text
+format, so it plugs into MultiProviderFinancialData (see synthetic_multi_provider) for
+load and scale testing of the data cache, the indicator code and batch endpoints with
+10k+ symbols, and its history() can stand in for the HistoryStore fetcher.
 """
 
+import hashlib
+import string
 import time
-from datetime import datetime
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional
 
-class SimpleFallbackProvider:
+import numpy as np
+
+TRADING_DAYS = 252
+# Trading days per history period, as accepted by /history
+PERIOD_DAYS = {"5d": 5, "1mo": 21, "3mo": 63, "6mo": 126, "1y": 252, "2y": 504, "5y": 1260, "max": 1260}
+# sector: (annual drift, annual volatility, P/E range, dividend yield range)
+SECTORS = {
+    "Technology": (0.12, 0.35, (18, 60), (0.0, 0.01)),
+    "Healthcare": (0.08, 0.25, (14, 35), (0.0, 0.025)),
+    "Financial Services": (0.07, 0.22, (8, 18), (0.015, 0.045)),
+    "Energy": (0.05, 0.30, (6, 16), (0.025, 0.06)),
+    "Consumer Cyclical": (0.09, 0.30, (12, 40), (0.0, 0.02)),
+    "Utilities": (0.04, 0.15, (12, 22), (0.025, 0.05)),
+    "Industrials": (0.07, 0.22, (12, 28), (0.01, 0.03)),
+}
+SESSION_OPEN = (13, 30)   # 9:30 New York in UTC (EST offset ignored)
+SESSION_MINUTES = 390
+
+def _seed(*parts) -> int:
+    return int.from_bytes(hashlib.sha256(":".join(map(str, parts)).encode()).digest()[:8], "big")
+
+def synthetic_symbols(count: int) -> List[str]:
+    """count distinct four-letter tickers: AAAA, AAAB, ... (456,976 available)"""
+    letters = string.ascii_uppercase
+    symbols = []
+    for i in range(count):
+        symbol = ""
+        for _ in range(4):
+            i, digit = divmod(i, 26)
+            symbol = letters[digit] + symbol
+        symbols.append(symbol)
+    return symbols
+
+def _trading_days(end: date, count: int) -> List[date]:
+    days = []
+    day = end
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day)
+        day -= timedelta(days=1)
+    return days[::-1]
+
+class SyntheticMarketProvider:
+    """
+    Provider over a reproducible synthetic market
+    Daily history ends at `end` (`days` bars by default, up to five years on request).
+    With live=True the current price walks through the next session's intraday ticks,
+    one per tick_seconds of wall-clock time, so repeated quotes move like a live feed.
+    latency_ms makes each get_financial_data call take as long as a real provider's.
+    """
+
+    def __init__(self, seed: int = 0, days: int = TRADING_DAYS, end: date = date(2024, 6, 28),
+                 live: bool = False, tick_seconds: float = 1.0, latency_ms: float = 0.0):
+        self.name = "Synthetic Market"
+        self.rate_limit = "Unlimited (synthetic)"
+        self.seed = seed
+        self.days = days
+        self.end = end
+        self.live = live
+        self.tick_seconds = tick_seconds
+        self.latency_ms = latency_ms
+        self._dates = _trading_days(end, max(days, max(PERIOD_DAYS.values())))
+        self._timestamps = np.array([int(datetime(d.year, d.month, d.day, 20, tzinfo=timezone.utc).timestamp())
+                                     for d in self._dates])
+        self._started = time.monotonic()
+
+    def profile(self, symbol: str) -> Dict:
+        """Fundamentals and the GBM parameters behind a symbol's prices"""
+        symbol = symbol.upper()
+        rng = np.random.default_rng(_seed(self.seed, "profile", symbol))
+        sector = list(SECTORS)[rng.integers(len(SECTORS))]
+        drift, volatility, pe_range, yield_range = SECTORS[sector]
+        shares = 10 ** rng.uniform(7.5, 10)
+        return {
+            "symbol": symbol,
+            "name": f"{symbol.title()} {rng.choice(['Inc.', 'Corp.', 'Holdings', 'Group'])}",
+            "sector": sector,
+            "initial_price": float(np.exp(rng.uniform(np.log(5), np.log(800)))),
+            "drift": drift + rng.normal(0, 0.05),
+            "volatility": volatility * rng.uniform(0.7, 1.5),
+            "shares": shares,
+            "base_volume": shares * rng.uniform(0.002, 0.01),
+            "pe_ratio": rng.uniform(*pe_range),
+            "dividend_yield": rng.uniform(*yield_range),
+            "beta": rng.uniform(0.5, 1.8),
+        }
+
+    def bars(self, symbol: str, days: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """The last `days` daily bars as numpy columns; shorter requests are the tail of the same path"""
+        days = min(days or self.days, len(self._dates))
+        profile = self.profile(symbol)
+        total = len(self._dates)
+        rng = np.random.default_rng(_seed(self.seed, "history", profile["symbol"]))
+        dt = 1 / TRADING_DAYS
+        sigma = profile["volatility"] * np.sqrt(dt)
+        returns = (profile["drift"] - profile["volatility"] ** 2 / 2) * dt + sigma * rng.standard_normal(total)
+        close = profile["initial_price"] * np.exp(np.cumsum(returns))
+        previous = np.concatenate(([profile["initial_price"]], close[:-1]))
+        open_ = previous * np.exp(sigma * 0.2 * rng.standard_normal(total))
+        high = np.maximum(open_, close) * np.exp(np.abs(sigma * 0.5 * rng.standard_normal(total)))
+        low = np.minimum(open_, close) * np.exp(-np.abs(sigma * 0.5 * rng.standard_normal(total)))
+        volume = profile["base_volume"] * rng.lognormal(0, 0.3, total) * (1 + 5 * np.abs(returns))
+        return {
+            "timestamp": self._timestamps[-days:],
+            "open": open_[-days:],
+            "high": high[-days:],
+            "low": low[-days:],
+            "close": close[-days:],
+            "volume": volume[-days:].astype("int64"),
+        }
+
+    def history(self, symbol: str, period: str = "1y", interval: str = "1d") -> Dict[str, List]:
+        """Daily bars as columns, with the same signature and shape as market_history.yahoo_history"""
+        if interval != "1d":
+            raise ValueError(f"Synthetic history only has daily bars, not '{interval}'")
+        if period not in PERIOD_DAYS:
+            raise ValueError(f"Unknown period '{period}'. Expected one of: {', '.join(PERIOD_DAYS)}")
+        return {column: values.tolist() for column, values in self.bars(symbol, PERIOD_DAYS[period]).items()}
+
+    def ticks(self, symbol: str, count: int = SESSION_MINUTES) -> Iterator[Dict]:
+        """Intraday trades for the session after the last daily bar, one per minute from the open"""
+        profile = self.profile(symbol)
+        last_close = float(self.bars(symbol, 1)["close"][-1])
+        rng = np.random.default_rng(_seed(self.seed, "ticks", profile["symbol"], self.end))
+        sigma = profile["volatility"] * np.sqrt(1 / (TRADING_DAYS * SESSION_MINUTES))
+        # Drawn for a whole session at least, so a shorter request is a prefix of a longer one
+        generated = max(count, SESSION_MINUTES)
+        prices = last_close * np.exp(np.cumsum(sigma * rng.standard_normal(generated)))
+        sizes = np.maximum(1, rng.lognormal(4, 1, generated)).astype(int) * 10
+        session = self.end + timedelta(days=3 if self.end.weekday() == 4 else 1)
+        opening = datetime(session.year, session.month, session.day, *SESSION_OPEN, tzinfo=timezone.utc)
+        for i in range(count):
+            yield {
+                "timestamp": int((opening + timedelta(minutes=i)).timestamp()),
+                "price": round(float(prices[i]), 4),
+                "size": int(sizes[i]),
+            }
+
+    def _live_price(self, symbol: str) -> float:
+        index = int((time.monotonic() - self._started) / self.tick_seconds) % SESSION_MINUTES
+        for tick in self.ticks(symbol, index + 1):
+            price = tick["price"]
+        return price
+
+    def get_financial_data(self, symbol: str) -> str:
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000)
+        symbol = symbol.upper()
+        profile = self.profile(symbol)
+        bars = self.bars(symbol, TRADING_DAYS)
+        close = bars["close"]
+        latest = float(close[-1])
+        price = self._live_price(symbol) if self.live else latest
+        # Live prices are part of the next session, so today's bar is its previous close
+        previous_close = latest if self.live else float(close[-2])
+
+        delta = np.diff(close[-15:])
+        gain, loss = delta.clip(min=0).mean(), (-delta).clip(min=0).mean()
+        rsi = 100.0 if loss == 0 else 100 - 100 / (1 + gain / loss)
+        year = close[-TRADING_DAYS:]
+        eps = latest / profile["pe_ratio"]
+
+        lines = [
+            f"Financial Data for {symbol} ({profile['name']}):",
+            f"Data Source: {self.name}",
+            f"Sector: {profile['sector']}",
+            "",
+            f"Latest Trading Data ({self._dates[-1].isoformat()}):",
+            f"Current Price: ${price:.2f}",
+            f"Day High: ${max(price, float(bars['high'][-1])):.2f}",
+            f"Day Low: ${min(price, float(bars['low'][-1])):.2f}",
+            f"Open: ${float(bars['open'][-1]):.2f}",
+            f"Volume: {int(bars['volume'][-1]):,}",
+            f"Average Volume: {int(bars['volume'][-50:].mean()):,}",
+            f"Previous Close: ${previous_close:.2f}",
+            f"Change: {(price / previous_close - 1) * 100:.2f}%",
+            f"52-Week High: ${float(year.max()):.2f}",
+            f"52-Week Low: ${float(year.min()):.2f}",
+            f"50-day Average: ${float(close[-50:].mean()):.2f}",
+            f"200-day Average: ${float(close[-200:].mean()):.2f}",
+            "",
+            "Performance:",
+            f"1 Week Change: {(latest / float(close[-5]) - 1) * 100:.2f}%",
+            f"1 Month Change: {(latest / float(close[-22]) - 1) * 100:.2f}%",
+            f"1 Year Change: {(latest / float(year[0]) - 1) * 100:.2f}%",
+            "",
+            "Technical Indicators:",
+            f"20-day SMA: ${float(close[-20:].mean()):.2f}",
+            f"50-day SMA: ${float(close[-50:].mean()):.2f}",
+            f"14-day RSI: {rsi:.2f}",
+            "",
+            "Fundamental Data:",
+            f"Market Cap: ${price * profile['shares']:,.0f}",
+            f"P/E Ratio: {price / eps:.2f}",
+            f"Dividend Yield: {profile['dividend_yield'] * 100:.2f}%",
+            f"Beta: {profile['beta']:.2f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+def synthetic_multi_provider(seed: int = 0, **options):
+    """A MultiProviderFinancialData serving only the synthetic market"""
+    from financial_data_providers import MultiProviderFinancialData
+
+    multi = MultiProviderFinancialData()
+    multi.providers = [SyntheticMarketProvider(seed, **options)]
+    return multi
+
+class SimpleFallbackProvider(SyntheticMarketProvider):
     """
-    Simple fallback provider that creates realistic mock data for testing
+    Last-resort mock provider for tests/test_provider_system.py
+    Synthetic data, clearly marked as mock data in its output
     """
-    
-    def __init__(self):
+
+    def __init__(self, seed: int = 0):
+        super().__init__(seed)
         self.name = "Mock Data Provider"
         self.rate_limit = "Unlimited (for testing)"
-    
+
     def get_financial_data(self, symbol: str) -> str:
-        """
-        Generate mock but realistic financial data for testing
-        """
         try:
-            # Mock data based on common stocks
-            mock_data = {
-                'AAPL': {
-                    'name': 'Apple Inc.',
-                    'sector': 'Technology',
-                    'price': 185.50,
-                    'high': 188.20,
-                    'low': 183.90,
-                    'volume': 45000000,
-                    'market_cap': 2900000000000,
-                    'pe_ratio': 28.5,
-                    'dividend_yield': 0.005
-                },
-                'MSFT': {
-                    'name': 'Microsoft Corporation',
-                    'sector': 'Technology',
-                    'price': 375.80,
-                    'high': 378.50,
-                    'low': 372.10,
-                    'volume': 32000000,
-                    'market_cap': 2800000000000,
-                    'pe_ratio': 32.1,
-                    'dividend_yield': 0.0067
-                },
-                'GOOGL': {
-                    'name': 'Alphabet Inc.',
-                    'sector': 'Technology',
-                    'price': 142.30,
-                    'high': 145.20,
-                    'low': 140.80,
-                    'volume': 28000000,
-                    'market_cap': 1800000000000,
-                    'pe_ratio': 25.8,
-                    'dividend_yield': 0.0
-                },
-                'TSLA': {
-                    'name': 'Tesla Inc.',
-                    'sector': 'Automotive',
-                    'price': 248.90,
-                    'high': 252.70,
-                    'low': 245.30,
-                    'volume': 85000000,
-                    'market_cap': 780000000000,
-                    'pe_ratio': 62.5,
-                    'dividend_yield': 0.0
-                }
-            }
-            
-            # Use mock data if available, otherwise generate generic data
-            if symbol.upper() in mock_data:
-                data = mock_data[symbol.upper()]
-            else:
-                # Generate generic mock data
-                data = {
-                    'name': f'{symbol} Corporation',
-                    'sector': 'Unknown',
-                    'price': 100.00,
-                    'high': 102.50,
-                    'low': 98.75,
-                    'volume': 1000000,
-                    'market_cap': 50000000000,
-                    'pe_ratio': 20.0,
-                    'dividend_yield': 0.02
-                }
-            
-            # Format response
-            response = f"Financial Data for {symbol} ({data['name']}):\n"
-            response += f"Data Source: {self.name} (MOCK DATA - FOR TESTING ONLY)\n"
-            response += f"Sector: {data['sector']}\n\n"
-            
-            response += f"Latest Trading Data ({datetime.now().strftime('%Y-%m-%d')}):\n"
-            response += f"Current Price: ${data['price']:.2f}\n"
-            response += f"Day High: ${data['high']:.2f}\n"
-            response += f"Day Low: ${data['low']:.2f}\n"
-            response += f"Volume: {data['volume']:,}\n"
-            
-            # Calculate mock change
-            prev_close = data['price'] * 0.995  # Mock -0.5% from previous
-            change_pct = ((data['price'] - prev_close) / prev_close) * 100
-            response += f"Previous Close: ${prev_close:.2f}\n"
-            response += f"Change: {change_pct:.2f}%\n"
-            
-            response += f"\nFundamental Data:\n"
-            response += f"Market Cap: ${data['market_cap']:,.0f}\n"
-            response += f"P/E Ratio: {data['pe_ratio']:.2f}\n"
-            if data['dividend_yield'] > 0:
-                response += f"Dividend Yield: {data['dividend_yield']*100:.2f}%\n"
-            
-            response += f"\n⚠️  NOTE: This is MOCK DATA for testing purposes only.\n"
-            response += f"Real financial data providers are currently unavailable.\n"
-            
+            response = super().get_financial_data(symbol)
+            response = response.replace(f"Data Source: {self.name}", f"Data Source: {self.name} (MOCK DATA - FOR TESTING ONLY)")
+            response += "\n⚠️  NOTE: This is MOCK DATA for testing purposes only.\n"
+            response += "Real financial data providers are currently unavailable.\n"
             return response
-            
         except Exception as e:
-            return f"Error in fallback provider: {str(e)}" 
\ No newline at end of file
+            return f"Error in fallback provider: {str(e)}"
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test script for the offline benchmark fakes and harness
+Runs offline; the fakes stand in for the data providers, yfinance and Ollama
+"""
+
+import sys
+import os
+import json
+import asyncio
+import subprocess
+import tempfile
+import time
+# Add parent directory's src folder to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from fakes import FakeLLM, FakeProvider, LatencyProfile, synthetic_financial_data
+from financial_snapshot import derive_metrics, parse_financial_data
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+def test_deterministic_fakes():
+    """The same seed should give the same data, latencies and failures on every run"""
+    print("🧪 Testing fake provider determinism...")
+    profile = LatencyProfile(latency_ms=10, jitter_ms=5, failure_rate=0.4)
+    slept_a, slept_b = [], []
+    first = FakeProvider("Flaky", profile, sleep=slept_a.append)
+    second = FakeProvider("Flaky", profile, sleep=slept_b.append)
+    outcomes_a = [first.get_financial_data(f"S{i}") for i in range(20)]
+    outcomes_b = [second.get_financial_data(f"S{i}") for i in range(20)]
+
+    if outcomes_a != outcomes_b or slept_a != slept_b:
+        print("❌ Two providers with the same seed diverged")
+        return False
+    if not 0 < first.failures < 20 or not all(5 <= s * 1000 <= 15 for s in slept_a):
+        print(f"❌ Profile not respected: {first.failures} failures, latencies {slept_a}")
+        return False
+
+    snapshot = parse_financial_data(synthetic_financial_data("AAPL"))
+    metrics = derive_metrics(snapshot)
+    if not snapshot.get("price") or "rsi_signal" not in metrics:
+        print(f"❌ Synthetic data doesn't parse: {snapshot}")
+        return False
+
+    print(f"✅ Identical runs: {first.failures}/20 failures, latencies within 10±5 ms")
+    print(f"✅ Synthetic data parses: price {snapshot['price']}, RSI {metrics['rsi_signal']}")
+    return True
+
+def test_fake_llm_timing():
+    """The fake LLM should take prefill plus output tokens at its token rate"""
+    print("\n🧪 Testing fake LLM token-rate model...")
+    llm = FakeLLM(tokens_per_second=1000, prefill_tokens_per_second=10000, first_token_ms=10, output_tokens=100)
+    prompt = "x" * 4000  # ~1000 prompt tokens -> 0.1 s prefill
+    expected = 0.01 + 0.1 + 0.1
+    done = []
+
+    async def stream():
+        return [chunk async for chunk in llm.astream(prompt, on_done=done.append)]
+
+    started = time.perf_counter()
+    chunks = asyncio.run(stream())
+    elapsed = time.perf_counter() - started
+
+    if not expected * 0.9 <= elapsed <= expected * 2:
+        print(f"❌ Took {elapsed:.3f}s, expected about {expected:.3f}s")
+        return False
+    if len(" ".join(chunks).split()) != 100 or not done or done[0]["eval_count"] != 100:
+        print(f"❌ Unexpected output: {len(chunks)} chunks, done={done}")
+        return False
+
+    print(f"✅ {elapsed * 1000:.0f} ms for 1000 prompt + 100 output tokens (model: {expected * 1000:.0f} ms)")
+    return True
+
+def test_benchmark_run():
+    """A quick run should complete without errors and save comparable results"""
+    print("\n🧪 Testing a quick benchmark run...")
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, "results.json")
+        command = [sys.executable, os.path.join(ROOT_DIR, "benchmark.py"), "cache", "indicators",
+                   "--quick", "--output", output]
+        first = subprocess.run(command, capture_output=True, text=True, timeout=300)
+        second = subprocess.run(command[:-1] + [output + ".2", "--compare", output],
+                                capture_output=True, text=True, timeout=300)
+        results = json.load(open(output))["results"] if os.path.exists(output) else {}
+
+    if first.returncode != 0 or second.returncode != 0:
+        print(f"❌ Benchmark failed:\n{first.stdout[-1000:]}{first.stderr[-1000:]}{second.stderr[-1000:]}")
+        return False
+    expected = {"cache.hit", "cache.miss", "indicators.parse_and_derive", "indicators.yahoo_sma_rsi"}
+    if not expected <= results.keys() or "Compared with" not in second.stdout:
+        print(f"❌ Missing results or comparison: {sorted(results)}")
+        return False
+
+    hit, miss = results["cache.hit"], results["cache.miss"]
+    print(f"✅ cache hit p50 {hit['p50_ms']} ms vs miss p50 {miss['p50_ms']} ms")
+    print("✅ Results saved and compared")
+    return True
+
+def main():
+    print("🚀 Benchmark Harness Test Suite")
+    print("=" * 50)
+
+    results = {
+        "Deterministic Fakes": test_deterministic_fakes(),
+        "Fake LLM Timing": test_fake_llm_timing(),
+        "Benchmark Run": test_benchmark_run()
+    }
+
+    print("\n📊 Test Results Summary:")
+    print("=" * 30)
+    for name, passed in results.items():
+        print(f"{name}: {'✅ PASS' if passed else '❌ FAIL'}")
+
+    return all(results.values())
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
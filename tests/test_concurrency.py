@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Test script for the concurrency helpers and the async Ollama client
+Runs offline with a fake provider and a fake Ollama server
+"""
+
+import sys
+import os
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+# Add parent directory's src folder to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from concurrency import KeyedLocks, run_blocking
+from financial_agents import FinancialAnalysisAgent
+from llm_scheduler import LLMScheduler
+from ollama_client import AsyncOllamaClient
+from fakes import FakeLLM, FakeOllamaServer, FakeProvider, LatencyProfile
+
+request_id: ContextVar[str] = ContextVar("request_id", default="none")
+
+def test_run_blocking_context():
+    """Blocking work should see the caller's context variables and leave the loop free"""
+    print("🧪 Testing run_blocking context propagation...")
+
+    def blocking_work():
+        time.sleep(0.2)
+        return request_id.get(), threading.current_thread().name
+
+    async def handle(name):
+        request_id.set(name)
+        return await run_blocking(blocking_work)
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        results = await asyncio.gather(handle("first"), handle("second"))
+        task.cancel()
+        return results, ticks
+
+    results, ticks = asyncio.run(run())
+
+    if [seen for seen, _ in results] != ["first", "second"]:
+        print(f"❌ Context not carried into the worker threads: {results}")
+        return False
+    if not all(thread.startswith("provider") for _, thread in results) or request_id.get() != "none":
+        print(f"❌ Unexpected threads or leaked context: {results}, {request_id.get()}")
+        return False
+    if ticks < 10:
+        print(f"❌ Event loop blocked while the work ran: {ticks} ticks")
+        return False
+
+    print(f"✅ Each request's context reached its provider thread; the loop ticked {ticks} times meanwhile")
+    return True
+
+def test_keyed_locks():
+    """Concurrent fetches of one symbol should share a fetch, and leave no lock behind"""
+    print("\n🧪 Testing per-symbol fetch locks...")
+    agent = FinancialAnalysisAgent(FakeLLM())
+    agent.data_provider = FakeProvider(profile=LatencyProfile(latency_ms=100))
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        results = list(pool.map(agent.get_financial_data, ["AAPL"] * 4 + ["MSFT"] * 2))
+
+    if agent.data_provider.calls != 2 or len(set(results[:4])) != 1:
+        print(f"❌ Expected one fetch per symbol, got {agent.data_provider.calls}")
+        return False
+    if len(agent._fetch_locks):
+        print(f"❌ {len(agent._fetch_locks)} fetch locks left behind")
+        return False
+
+    locks = KeyedLocks()
+    locks.acquire("AAPL")
+    waiter = threading.Thread(target=lambda: (locks.acquire("AAPL"), locks.release("AAPL")))
+    waiter.start()
+    time.sleep(0.05)
+    held = len(locks)
+    locks.release("AAPL")
+    waiter.join(timeout=1)
+    if held != 1 or len(locks) or waiter.is_alive():
+        print(f"❌ Lock dropped while a thread waited for it: {held} held, {len(locks)} left")
+        return False
+
+    print("✅ 6 requests for 2 symbols made 2 provider calls; no locks kept afterwards")
+    return True
+
+def test_async_ollama_client():
+    """The async client should stream from Ollama, report the final chunk and queue behind its scheduler"""
+    print("\n🧪 Testing async Ollama client...")
+    server = FakeOllamaServer(FakeLLM(output_tokens=12, chunk_tokens=3), parallel=4).start()
+    client = AsyncOllamaClient(model="fake-llm", base_url=server.url, scheduler=LLMScheduler(1))
+    done = []
+
+    async def run():
+        await client.load()
+        chunks = [chunk async for chunk in client.astream("Analyze AAPL", on_done=done.append)]
+        started = time.perf_counter()
+        texts = await asyncio.gather(*(client.ainvoke(f"Analyze {symbol}") for symbol in ("AAPL", "MSFT", "NVDA")))
+        status = client.scheduler.get_status()
+        await client.aclose()
+        return chunks, texts, time.perf_counter() - started, status
+
+    try:
+        chunks, texts, elapsed, status = asyncio.run(run())
+    finally:
+        server.stop()
+
+    if len(chunks) != 4 or "".join(chunks) != texts[0] or not done or not done[0].get("context"):
+        print(f"❌ Unexpected stream: {chunks}, final chunk {done}")
+        return False
+    if server.generations != 4 or status["active"] != 0 or status["classes"]["interactive"]["completed"] != 4:
+        print(f"❌ Unexpected generations or scheduler state: {server.generations}, {status}")
+        return False
+    if status["classes"]["interactive"]["queue_wait_max"] < 0.015:
+        print(f"❌ Generations didn't queue for the single slot: {status['classes']['interactive']}")
+        return False
+
+    print(f"✅ Streamed {len(chunks)} chunks with a final context")
+    print(f"✅ 3 generations took turns on 1 slot in {elapsed * 1000:.0f} ms, "
+          f"longest wait {status['classes']['interactive']['queue_wait_max'] * 1000:.0f} ms")
+    return True
+
+def main():
+    print("🚀 Concurrency Test Suite")
+    print("=" * 50)
+
+    results = {
+        "run_blocking Context": test_run_blocking_context(),
+        "Keyed Locks": test_keyed_locks(),
+        "Async Ollama Client": test_async_ollama_client()
+    }
+
+    print("\n📊 Test Results Summary:")
+    print("=" * 30)
+    for name, passed in results.items():
+        print(f"{name}: {'✅ PASS' if passed else '❌ FAIL'}")
+
+    return all(results.values())
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
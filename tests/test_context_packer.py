@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test script for the token-budgeted context packer
+Runs offline; no LLM or data providers required
+"""
+
+import sys
+import os
+# Add parent directory's src folder to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from context_packer import (RESPONSE_RESERVE_TOKENS, TOKEN_SAFETY_MARGIN, ContextPacker, RollingSummaryCache,
+                            context_window_for, count_tokens)
+
+def make_history(turns, words_per_turn=40):
+    history = []
+    for i in range(turns):
+        role = 'user' if i % 2 == 0 else 'assistant'
+        history.append({'role': role, 'content': f"Turn {i}. " + "detail " * words_per_turn})
+    return history
+
+def test_prompt_stays_within_budget():
+    """Long histories should be packed under the budget with older turns summarized"""
+    print("🧪 Testing prompt stays within budget...")
+    packer = ContextPacker("llama3.1:8b", budget=600)
+    packed = packer.pack("You are a financial analyst.", make_history(40), "\nUser's current message: hi\n")
+
+    if packed.tokens > packed.budget:
+        print(f"❌ Prompt has {packed.tokens} tokens, budget is {packed.budget}")
+        return False
+    if packed.summarized_turns == 0 or "Summary of earlier conversation" not in packed.prompt:
+        print("❌ Expected older turns to be summarized")
+        return False
+    if "Turn 39." not in packed.prompt:
+        print("❌ Most recent turn is missing")
+        return False
+
+    print(f"✅ {packed.tokens}/{packed.budget} tokens, {packed.included_turns} recent turns, "
+          f"{packed.summarized_turns} summarized")
+    return True
+
+def test_short_history_kept_verbatim():
+    """Short exchanges should use the budget instead of being cut to a fixed message count"""
+    print("\n🧪 Testing short history kept verbatim...")
+    packer = ContextPacker("llama3.1:8b", budget=4000)
+    history = make_history(12, words_per_turn=5)
+    packed = packer.pack("You are a financial analyst.", history, "\nUser's current message: hi\n")
+
+    if packed.included_turns != len(history) or packed.summarized_turns != 0:
+        print(f"❌ Expected all {len(history)} turns verbatim, got {packed.included_turns}")
+        return False
+
+    print("✅ All turns included verbatim")
+    return True
+
+def test_data_snapshot_priority():
+    """The data snapshot should be included ahead of conversation turns"""
+    print("\n🧪 Testing data snapshot priority...")
+    packer = ContextPacker("llama3.1:8b", budget=300)
+    snapshot = "Financial Data for AAPL:\nCurrent Price: $185.50\n"
+    packed = packer.pack("You are a financial analyst.", make_history(20), "\nUser: hi\n", data_snapshot=snapshot)
+
+    if not packed.data_included or "Current Price: $185.50" not in packed.prompt:
+        print("❌ Data snapshot was dropped")
+        return False
+
+    print("✅ Data snapshot included")
+    return True
+
+def test_rolling_summary_is_cached():
+    """Extending the conversation should only summarize the new turns"""
+    print("\n🧪 Testing rolling summary cache...")
+    cache = RollingSummaryCache()
+    calls = []
+
+    def summarizer(previous, turns):
+        calls.append(len(turns))
+        return (previous + " " if previous else "") + "|".join(t['content'][:6] for t in turns)
+
+    history = make_history(10)
+    first = cache.summarize(history[:6], summarizer)
+    second = cache.summarize(history[:8], summarizer)
+    repeat = cache.summarize(history[:8], summarizer)
+
+    if calls != [6, 2] or not second.startswith(first) or repeat != second:
+        print(f"❌ Unexpected summarizer calls: {calls}")
+        return False
+
+    print("✅ Only new turns were summarized")
+    return True
+
+def test_token_counting():
+    """Token counts should grow with the text"""
+    print("\n🧪 Testing token counting...")
+    short = count_tokens("Current Price: $185.50")
+    long = count_tokens("Current Price: $185.50 " * 10)
+
+    if not (0 < short < long):
+        print(f"❌ Unexpected counts: {short}, {long}")
+        return False
+
+    print(f"✅ Token counts: {short} < {long}")
+    return True
+
+def test_safety_margin():
+    """The default budget should hold back the safety margin for token-count error"""
+    print("\n🧪 Testing budget safety margin...")
+    model = "llama3.1:8b"
+    available = context_window_for(model) - RESPONSE_RESERVE_TOKENS
+    budget = ContextPacker(model).budget
+
+    if TOKEN_SAFETY_MARGIN > 0 and not budget < available or budget < available * (1 - TOKEN_SAFETY_MARGIN) - 1:
+        print(f"❌ Budget {budget} for {available} available tokens")
+        return False
+
+    print(f"✅ Budget {budget} of {available} tokens ({TOKEN_SAFETY_MARGIN:.0%} held back)")
+    return True
+
+def main():
+    print("🚀 Context Packer Test Suite")
+    print("=" * 50)
+
+    results = {
+        "Within Budget": test_prompt_stays_within_budget(),
+        "Short History": test_short_history_kept_verbatim(),
+        "Data Priority": test_data_snapshot_priority(),
+        "Summary Cache": test_rolling_summary_is_cached(),
+        "Token Counting": test_token_counting(),
+        "Safety Margin": test_safety_margin()
+    }
+
+    print("\n📊 Test Results Summary:")
+    print("=" * 30)
+    for name, passed in results.items():
+        print(f"{name}: {'✅ PASS' if passed else '❌ FAIL'}")
+
+    return all(results.values())
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test script for the staged /critique pipeline and its partial results
+Runs offline against the web app with a fake provider and a fake LLM
+"""
+
+import sys
+import os
+import asyncio
+# Add parent directory's src folder to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import httpx
+import app as web
+from session_store import new_message
+from fakes import FakeLLM, FakeProvider, LatencyProfile
+
+STAGE_PROMPTS = {"critique": "You are a critical financial analyst", "improved_analysis": "Based on the following critique"}
+
+def install_llm(failing_stage=None):
+    """Serve generations from a fake LLM; the prompt of failing_stage raises instead"""
+    client = FakeLLM(output_tokens=8).install(web.llm_client)
+    astream = client.astream
+
+    async def failing_astream(prompt, **kwargs):
+        if failing_stage and prompt.startswith(STAGE_PROMPTS[failing_stage]):
+            raise RuntimeError(f"{failing_stage} model crashed")
+        async for chunk in astream(prompt, **kwargs):
+            yield chunk
+
+    client.astream = failing_astream
+
+def critique(history=(), failing_stage=None):
+    """POST /critique in a new session holding history; returns (status code, body, messages added)"""
+    install_llm(failing_stage)
+    web.financial_agent.data_provider = FakeProvider(profile=LatencyProfile(latency_ms=0))
+    web.financial_agent.clear_cache()
+
+    async def run():
+        transport = httpx.ASGITransport(app=web.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            session_id = (await client.post("/sessions", json={"company_name": "AAPL"})).json()["session"]["session_id"]
+            web.session_store.append(session_id, [new_message(m["role"], m["content"]) for m in history])
+            response = await client.post("/critique", json={"session_id": session_id})
+            stored = (await client.get(f"/sessions/{session_id}")).json()["session"]
+        return response.status_code, response.json(), stored["history"][len(history):]
+
+    return asyncio.run(run())
+
+def test_staged_pipeline():
+    """Without a previous analysis the pipeline should analyze, critique and improve, recording each stage"""
+    print("🧪 Testing staged critique pipeline...")
+    status, body, history = critique()
+
+    if status != 200 or body["partial"] or not all(body.get(stage) for stage in ("analysis", "critique", "improved_analysis")):
+        print(f"❌ Unexpected response: {status} {body}")
+        return False
+    if set(body["models"]) != {"analysis", "critique", "improved_analysis"}:
+        print(f"❌ Stage models missing: {body['models']}")
+        return False
+    if [message["content"] for message in history] != [body["analysis"], body["critique"], body["improved_analysis"]]:
+        print(f"❌ Session should hold the analysis, critique and improvement: {history}")
+        return False
+
+    print(f"✅ Three stages completed and recorded in the session, data {body['data_tokens']['compact_tokens']} tokens")
+    return True
+
+def test_critique_failure():
+    """A failed critique after a fresh analysis should still return and record the analysis"""
+    print("\n🧪 Testing critique failure after a fresh analysis...")
+    status, body, history = critique(failing_stage="critique")
+
+    if status != 200 or not body.get("analysis") or body.get("critique_error") != "critique model crashed":
+        print(f"❌ Analysis not returned with the critique error: {status} {body}")
+        return False
+    if not body["partial"] or [message["content"] for message in history] != [body["analysis"]]:
+        print(f"❌ Analysis not recorded in the session: {history}")
+        return False
+
+    existing = [{"role": "assistant", "content": "Earlier analysis of AAPL: hold."}]
+    status, body, history = critique(existing, failing_stage="critique")
+    if status != 500 or body["status"] != "error" or history:
+        print(f"❌ Failure with nothing new to return should be an error: {status} {body}")
+        return False
+
+    print("✅ Fresh analysis returned with critique_error and kept in the session")
+    print("✅ Critique of an existing analysis that fails is a 500")
+    return True
+
+def test_improvement_failure():
+    """A failed improvement should return the critique as a partial result"""
+    print("\n🧪 Testing improvement failure...")
+    existing = [{"role": "assistant", "content": "Earlier analysis of AAPL: hold."}]
+    status, body, history = critique(existing, failing_stage="improved_analysis")
+
+    if status != 200 or not body["partial"] or not body["critique"] or body["improved_analysis"] is not None:
+        print(f"❌ Unexpected partial result: {status} {body}")
+        return False
+    if body["analysis"] is not None or [message["content"] for message in history] != [body["critique"]]:
+        print(f"❌ Only the critique should be recorded: {history}")
+        return False
+
+    print("✅ Critique returned with partial=true and recorded; no improved analysis")
+    return True
+
+def main():
+    print("🚀 Critique Pipeline Test Suite")
+    print("=" * 50)
+
+    results = {
+        "Staged Pipeline": test_staged_pipeline(),
+        "Critique Failure": test_critique_failure(),
+        "Improvement Failure": test_improvement_failure()
+    }
+
+    print("\n📊 Test Results Summary:")
+    print("=" * 30)
+    for name, passed in results.items():
+        print(f"{name}: {'✅ PASS' if passed else '❌ FAIL'}")
+
+    return all(results.values())
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
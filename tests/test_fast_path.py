@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test script for the deterministic fast-path analysis
+Runs offline with a scripted LLM and a stubbed data provider
+"""
+
+import sys
+import os
+# Add parent directory's src folder to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from langchain_community.llms.fake import FakeListLLM
+from financial_agents import FinancialAnalysisAgent, NEED_MORE_DATA
+from market_history import HistoryStore
+from simple_fallback_provider import SyntheticMarketProvider
+
+MOCK_DATA = """Financial Data for AAPL (Apple Inc.):
+Data Source: Mock Data Provider
+Current Price: $185.50
+Day High: $188.20
+Day Low: $183.90
+Previous Close: $184.00
+20-day SMA: $182.10
+14-day RSI: 72.40
+P/E Ratio: 28.50
+"""
+
+AGENT_STEPS = [
+    "Thought: I need the data\nAction: GetFinancialData\nAction Input: AAPL",
+    "Thought: I now know the final answer\nFinal Answer: Agent loop analysis."
+]
+
+def build_agent(responses, data=MOCK_DATA):
+    # FakeListLLM wraps its index after the last response; the trailing entry keeps llm.i a call count
+    llm = FakeListLLM(responses=responses + ["UNUSED"])
+    agent = FinancialAnalysisAgent(llm)
+    agent.data_provider.get_financial_data = lambda symbol: data
+    agent.history_store = HistoryStore(fetcher=SyntheticMarketProvider().history)
+    return agent, llm
+
+def test_single_llm_call():
+    """With data available the analysis should take exactly one LLM call"""
+    print("🧪 Testing fast path uses a single LLM call...")
+    agent, llm = build_agent(["Fast path analysis."])
+    result = agent.analyze_with_steps("AAPL")
+
+    if not result["fast_path"] or result["output"] != "Fast path analysis." or llm.i != 1:
+        print(f"❌ Unexpected result: {result}, LLM calls: {llm.i}")
+        return False
+    if "rsi_signal: overbought" not in result["observations"]:
+        print("❌ Computed metrics missing from observations")
+        return False
+
+    print("✅ One LLM call, metrics included")
+    return True
+
+def test_falls_back_when_model_asks():
+    """A NEED_MORE_DATA reply should hand over to the agent loop"""
+    print("\n🧪 Testing fallback when the model asks for more...")
+    agent, _ = build_agent([f"{NEED_MORE_DATA}: peer valuations"] + AGENT_STEPS)
+    result = agent.analyze_with_steps("AAPL")
+
+    if result["fast_path"] or result["output"] != "Agent loop analysis.":
+        print(f"❌ Unexpected result: {result}")
+        return False
+
+    print("✅ Fell back to the agent loop")
+    return True
+
+def test_falls_back_when_data_missing():
+    """If data can't be fetched (e.g. a company name) the agent loop should run directly"""
+    print("\n🧪 Testing fallback when data is unavailable...")
+    agent, llm = build_agent(AGENT_STEPS, data="Error: No data available for Apple")
+    result = agent.analyze_with_steps("Apple")
+
+    if result["fast_path"] or llm.i != 2:
+        print(f"❌ Unexpected result: {result}, LLM calls: {llm.i}")
+        return False
+
+    print("✅ Agent loop ran without a wasted fast-path call")
+    return True
+
+def test_calculate_metrics():
+    """CalculateMetrics should return exact derived numbers"""
+    print("\n🧪 Testing calculate_metrics...")
+    agent, _ = build_agent([])
+    metrics = agent.calculate_metrics(MOCK_DATA)
+
+    expected = ["price: 185.50", "change_pct: 0.82", "vs_sma_20_pct: 1.87", "earnings_yield_pct: 3.51",
+                "eps: 6.51", "volatility_pct:", "max_drawdown_pct:", "beta_benchmark: SPY"]
+    missing = [line for line in expected if line not in metrics]
+    if missing:
+        print(f"❌ Missing metrics {missing} in:\n{metrics}")
+        return False
+
+    print("✅ Metrics calculated")
+    return True
+
+def main():
+    print("🚀 Fast Path Test Suite")
+    print("=" * 50)
+
+    results = {
+        "Single LLM Call": test_single_llm_call(),
+        "Model Fallback": test_falls_back_when_model_asks(),
+        "Data Fallback": test_falls_back_when_data_missing(),
+        "Calculate Metrics": test_calculate_metrics()
+    }
+
+    print("\n📊 Test Results Summary:")
+    print("=" * 30)
+    for name, passed in results.items():
+        print(f"{name}: {'✅ PASS' if passed else '❌ FAIL'}")
+
+    return all(results.values())
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
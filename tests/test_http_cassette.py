@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Test script for provider HTTP record/replay
+Runs offline against a local origin server standing in for a provider API
+"""
+
+import sys
+import os
+import gzip
+import json
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+# Add parent directory's src folder to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import requests
+import http_cassette
+from http_cassette import Cassette
+from financial_data_providers import FinnhubProvider
+
+ORIGIN_DELAY = 0.15
+
+class OriginHandler(BaseHTTPRequestHandler):
+    """A slow provider API: /quote returns JSON, /old redirects to /quote"""
+    calls = 0
+
+    def do_GET(self):
+        OriginHandler.calls += 1
+        time.sleep(ORIGIN_DELAY)
+        if self.path.startswith("/old"):
+            self.send_response(302)
+            self.send_header("Location", "/quote?symbol=MSFT")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = json.dumps({"path": self.path.split("?")[0], "price": 123.45}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def test_record_and_replay():
+    """Replayed responses should match the originals, keep their timing and need no origin"""
+    print("🧪 Testing record and replay...")
+    origin = ThreadingHTTPServer(("127.0.0.1", 0), OriginHandler)
+    threading.Thread(target=origin.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{origin.server_address[1]}"
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "providers.jsonl.gz")
+        with http_cassette.recording(path, hosts=("127.0.0.1",)):
+            recorded = requests.get(f"{base}/quote", params={"symbol": "AAPL", "apikey": "secret-key"}).json()
+            redirected = requests.get(f"{base}/old").json()
+        origin.shutdown()
+        origin.server_close()
+        with gzip.open(path, "rt") as f:
+            raw = f.read()
+
+        calls_before = OriginHandler.calls
+        with http_cassette.replaying(path, hosts=("127.0.0.1",)):
+            started = time.perf_counter()
+            replayed = requests.get(f"{base}/quote", params={"apikey": "other-key", "symbol": "AAPL"})
+            elapsed = time.perf_counter() - started
+            replayed_redirect = requests.get(f"{base}/old").json()
+            missing = requests.get(f"{base}/unknown")
+            status = http_cassette.get_status()
+
+    if "secret-key" in raw or raw.count("\n") != 3:
+        print(f"❌ Unexpected cassette contents:\n{raw}")
+        return False
+    if replayed.json() != recorded or replayed.url != f"{base}/quote?apikey=other-key&symbol=AAPL":
+        print(f"❌ Replayed {replayed.json()} from {replayed.url}, recorded {recorded}")
+        return False
+    if replayed_redirect != redirected or OriginHandler.calls != calls_before:
+        print(f"❌ Redirect replayed as {replayed_redirect}, origin called {OriginHandler.calls - calls_before} times")
+        return False
+    if not ORIGIN_DELAY <= elapsed < ORIGIN_DELAY * 3:
+        print(f"❌ Replay took {elapsed * 1000:.0f} ms, recorded about {ORIGIN_DELAY * 1000:.0f} ms")
+        return False
+    if missing.status_code != 404 or status["misses"] != 1 or status["mode"] != "replay":
+        print(f"❌ Unrecorded request: {missing.status_code}, {status}")
+        return False
+
+    print("✅ 3 interactions recorded without the API key")
+    print(f"✅ Replayed in {elapsed * 1000:.0f} ms with no origin, redirect included; misses get 404")
+    return True
+
+def test_provider_replay():
+    """A real provider should run unchanged against a cassette of an HTTPS API"""
+    print("\n🧪 Testing provider against a cassette...")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "finnhub.jsonl")
+        Cassette(path).append({
+            "method": "GET",
+            "url": "https://finnhub.io/api/v1/quote?symbol=NVDA",
+            "status": 200,
+            "headers": [["Content-Type", "application/json"]],
+            "body": json.dumps({"c": 120.5, "h": 122.0, "l": 118.25, "o": 119.0, "pc": 118.0}),
+            "ms": 40.0
+        })
+        provider = FinnhubProvider()
+        provider.api_key = "not-a-real-key"
+        with http_cassette.replaying(path, speed=0):
+            result = provider.get_financial_data("NVDA")
+
+    if "Current Price: $120.50" not in result or "Change: 2.12%" not in result:
+        print(f"❌ Unexpected provider output:\n{result}")
+        return False
+
+    print("✅ Finnhub provider parsed the replayed HTTPS response")
+    return True
+
+def test_query_matching():
+    """A different symbol must miss; only volatile parameters like yfinance's time range may differ"""
+    print("\n🧪 Testing query parameter matching...")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "queries.jsonl")
+        cassette = Cassette(path)
+        for url, body in (("https://finnhub.io/api/v1/quote?symbol=AAPL", {"c": 185.5}),
+                          ("https://query2.finance.yahoo.com/v8/finance/chart/AAPL?interval=1d&period1=100&period2=200",
+                           {"chart": "AAPL"})):
+            cassette.append({"method": "GET", "url": url, "status": 200,
+                             "headers": [["Content-Type", "application/json"]], "body": json.dumps(body), "ms": 0})
+        with http_cassette.replaying(path, speed=0):
+            other_symbol = requests.get("https://finnhub.io/api/v1/quote", params={"symbol": "MSFT", "token": "k"})
+            same_symbol = requests.get("https://finnhub.io/api/v1/quote", params={"symbol": "AAPL", "token": "k"})
+            later_range = requests.get("https://query2.finance.yahoo.com/v8/finance/chart/AAPL",
+                                       params={"interval": "1d", "period1": 500, "period2": 600})
+            other_interval = requests.get("https://query2.finance.yahoo.com/v8/finance/chart/AAPL",
+                                          params={"interval": "1wk", "period1": 100, "period2": 200})
+            status = http_cassette.get_status()
+
+    if other_symbol.status_code != 404 or other_interval.status_code != 404:
+        print(f"❌ Mismatched queries answered: {other_symbol.status_code} {other_symbol.text}, "
+              f"{other_interval.status_code} {other_interval.text}")
+        return False
+    if same_symbol.json() != {"c": 185.5} or later_range.json() != {"chart": "AAPL"}:
+        print(f"❌ Matching requests not replayed: {same_symbol.text}, {later_range.text}")
+        return False
+    if status["hits"] != 2 or status["misses"] != 2:
+        print(f"❌ Unexpected counts: {status}")
+        return False
+
+    print("✅ MSFT and a different interval missed (404); AAPL and a shifted yfinance time range replayed")
+    return True
+
+def test_passthrough():
+    """Requests to other hosts, such as Ollama, should reach the network and stay out of the cassette"""
+    print("\n🧪 Testing pass-through of non-provider hosts...")
+    origin = ThreadingHTTPServer(("127.0.0.1", 0), OriginHandler)
+    threading.Thread(target=origin.serve_forever, daemon=True).start()
+    ollama = f"http://127.0.0.1:{origin.server_address[1]}"
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "providers.jsonl")
+        Cassette(path).append({"method": "GET", "url": "https://finnhub.io/api/v1/quote?symbol=NVDA", "status": 200,
+                               "headers": [], "body": "{}", "ms": 0})
+        calls_before = OriginHandler.calls
+        with http_cassette.recording(path):
+            recorded = requests.get(f"{ollama}/api/tags")
+        with http_cassette.replaying(path, speed=0):
+            replayed = requests.get(f"{ollama}/api/tags")
+            status = http_cassette.get_status()
+        with open(path) as f:
+            written = "/api/tags" in f.read()
+    origin.shutdown()
+    origin.server_close()
+
+    if written or OriginHandler.calls - calls_before != 2:
+        print(f"❌ Recorded: {written}, origin called {OriginHandler.calls - calls_before} times")
+        return False
+    if replayed.status_code != 200 or replayed.url != f"{ollama}/api/tags" or status["misses"]:
+        print(f"❌ Request redirected during replay: {replayed.status_code} {replayed.url}, {status}")
+        return False
+    if recorded.json() != replayed.json() or "finnhub.io" not in status["hosts"]:
+        print(f"❌ Unexpected responses or hosts: {recorded.text}, {replayed.text}, {status['hosts']}")
+        return False
+
+    print("✅ Local Ollama-style request served by its origin in both modes and never written to the cassette")
+    return True
+
+def main():
+    print("🚀 HTTP Cassette Test Suite")
+    print("=" * 50)
+
+    results = {
+        "Record and Replay": test_record_and_replay(),
+        "Provider Replay": test_provider_replay(),
+        "Query Matching": test_query_matching(),
+        "Pass-through": test_passthrough()
+    }
+
+    print("\n📊 Test Results Summary:")
+    print("=" * 30)
+    for name, passed in results.items():
+        print(f"{name}: {'✅ PASS' if passed else '❌ FAIL'}")
+
+    return all(results.values())
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
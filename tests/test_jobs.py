@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Test script for the background job subsystem
+Runs offline with simulated job runners
+"""
+
+import sys
+import os
+import asyncio
+# Add parent directory's src folder to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from jobs import JobManager, JobQueueFull
+
+async def staged_runner(params, emit):
+    """Reports two stages with a token each, like the analysis pipeline"""
+    for stage in ("data", "analysis"):
+        await emit("stage", {"stage": stage})
+        await asyncio.sleep(params.get("delay", 0.01))
+        await emit("token", {"stage": stage, "text": stage})
+    return {"final_analysis": f"analysis of {params['company_name']}"}
+
+async def failing_runner(params, emit):
+    await emit("stage", {"stage": "data"})
+    raise RuntimeError("provider unavailable")
+
+RUNNERS = {"analysis": staged_runner, "broken": failing_runner}
+
+async def wait_until_done(job, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not job.done and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(0.01)
+
+def test_poll_for_result():
+    """A submitted job should return at once and finish in the background"""
+    print("🧪 Testing submit and poll...")
+    outcome = {}
+
+    async def run():
+        manager = JobManager(RUNNERS, max_workers=1)
+        manager.start()
+        job = manager.submit("analysis", {"company_name": "AAPL"})
+        outcome["initial"] = job.status
+        await wait_until_done(job)
+        broken = manager.submit("broken", {"company_name": "AAPL"})
+        await wait_until_done(broken)
+        outcome["job"] = manager.get(job.id).as_dict()
+        outcome["broken"] = broken.as_dict()
+        await manager.stop()
+
+    asyncio.run(run())
+    job, broken = outcome["job"], outcome["broken"]
+
+    if outcome["initial"] != "queued" or job["status"] != "succeeded":
+        print(f"❌ Unexpected job lifecycle: {outcome['initial']} -> {job['status']}")
+        return False
+    if [e["data"]["stage"] for e in job["events"]] != ["data", "analysis"] or job["result"] is None:
+        print(f"❌ Unexpected progress or result: {job}")
+        return False
+    if broken["status"] != "failed" or broken["error"] != "provider unavailable":
+        print(f"❌ Failure not recorded: {broken}")
+        return False
+
+    print("✅ Job queued, ran in the background and recorded stages; failures recorded")
+    return True
+
+def test_subscriber_replay():
+    """A subscriber joining mid-run should get earlier stages, then live events and 'done'"""
+    print("\n🧪 Testing progress subscription...")
+    received = []
+
+    async def run():
+        manager = JobManager(RUNNERS, max_workers=1)
+        manager.start()
+        job = manager.submit("analysis", {"company_name": "AAPL", "delay": 0.05})
+        await asyncio.sleep(0.03)
+        events = manager.subscribe(job)
+        while True:
+            event, data = await asyncio.wait_for(events.get(), timeout=2)
+            received.append(event)
+            if event == "done":
+                break
+        await manager.stop()
+
+    asyncio.run(run())
+
+    if received != ["stage", "token", "stage", "token", "done"]:
+        print(f"❌ Unexpected events: {received}")
+        return False
+
+    print(f"✅ Received {received}")
+    return True
+
+def test_backpressure_cancel_and_ttl():
+    """Full queues reject new jobs; cancelled jobs stop; finished jobs expire"""
+    print("\n🧪 Testing queue limit, cancellation and TTL...")
+    outcome = {}
+
+    async def run():
+        manager = JobManager(RUNNERS, max_workers=1, max_pending=1, result_ttl=0.05)
+        manager.start()
+        running = manager.submit("analysis", {"company_name": "A", "delay": 1})
+        await asyncio.sleep(0.01)
+        queued = manager.submit("analysis", {"company_name": "B"})
+        try:
+            manager.submit("analysis", {"company_name": "C"})
+            outcome["rejected"] = False
+        except JobQueueFull:
+            outcome["rejected"] = True
+
+        manager.cancel(queued.id)
+        manager.cancel(running.id)
+        await wait_until_done(running)
+        outcome["statuses"] = (running.status, queued.status)
+        await asyncio.sleep(0.1)
+        outcome["expired"] = manager.get(running.id) is None
+        await manager.stop()
+
+    asyncio.run(run())
+
+    if not outcome["rejected"] or outcome["statuses"] != ("cancelled", "cancelled") or not outcome["expired"]:
+        print(f"❌ Unexpected outcome: {outcome}")
+        return False
+
+    print("✅ Rejected over the limit, cancelled both jobs and expired the results")
+    return True
+
+def main():
+    print("🚀 Job Subsystem Test Suite")
+    print("=" * 50)
+
+    results = {
+        "Submit and Poll": test_poll_for_result(),
+        "Progress Subscription": test_subscriber_replay(),
+        "Limits, Cancel and TTL": test_backpressure_cancel_and_ttl()
+    }
+
+    print("\n📊 Test Results Summary:")
+    print("=" * 30)
+    for name, passed in results.items():
+        print(f"{name}: {'✅ PASS' if passed else '❌ FAIL'}")
+
+    return all(results.values())
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared LLM clients and model warm-up
+Runs offline; model loads are simulated
+"""
+
+import sys
+import os
+import asyncio
+# Add parent directory's src folder to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from llm_factory import ModelWarmup, get_async_client, get_llm, warmup_models
+from model_router import DEFAULT_ROUTES, Task
+from ollama_client import LLM_KEEP_ALIVE, LLM_PINNED_KEEP_ALIVE, AsyncOllamaClient, ModelNotFound
+
+class FlakyLoader:
+    """Fails the first load of each model, as when Ollama is still starting"""
+    def __init__(self):
+        self.attempts = {}
+
+    async def load(self, model):
+        self.attempts[model] = self.attempts.get(model, 0) + 1
+        if self.attempts[model] == 1:
+            raise ConnectionError("Cannot connect to host localhost:11434")
+
+class UnpulledLoader:
+    """Reports a model as not found until it has been asked for `pulled_after` times"""
+    def __init__(self, model, pulled_after):
+        self.model = model
+        self.pulled_after = pulled_after
+        self.attempts = 0
+
+    async def load(self, model):
+        if model == self.model:
+            self.attempts += 1
+            if self.attempts <= self.pulled_after:
+                raise ModelNotFound(model)
+
+def test_clients_are_shared():
+    """Callers asking for the same model should get the same client"""
+    print("🧪 Testing shared clients...")
+    same_model = get_llm(Task.ANALYSIS) is get_llm(Task.ANALYSIS)
+    same_async = get_async_client() is get_async_client()
+
+    if not same_model or not same_async:
+        print("❌ A new client was built for a repeated request")
+        return False
+    if get_llm(Task.CONVERSATION).model != DEFAULT_ROUTES[Task.CONVERSATION].model:
+        print("❌ Conversation LLM does not use the routed model")
+        return False
+
+    print("✅ LLM and async client are shared")
+    return True
+
+def test_warmup_models():
+    """By default every distinct primary and fallback model is warmed once"""
+    print("\n🧪 Testing warm-up model list...")
+    models = warmup_models()
+    expected = list(dict.fromkeys([route.model for route in DEFAULT_ROUTES.values()] +
+                                  [route.fallback for route in DEFAULT_ROUTES.values() if route.fallback]))
+
+    if models != expected:
+        print(f"❌ Expected {expected}, got {models}")
+        return False
+
+    print(f"✅ Warming {models}")
+    return True
+
+def test_warmup_retries_until_ready():
+    """Readiness should stay false until every model loads, retrying failures"""
+    print("\n🧪 Testing warm-up retries and readiness...")
+    loader = FlakyLoader()
+    warmup = ModelWarmup(loader, ["big", "small"], retry_interval=0.01)
+
+    async def run():
+        task = asyncio.create_task(warmup.run())
+        await asyncio.sleep(0)
+        before = warmup.get_status()
+        await asyncio.wait_for(task, timeout=2)
+        return before
+
+    before = asyncio.run(run())
+
+    if before["ready"] or not warmup.ready or loader.attempts != {"big": 2, "small": 2}:
+        print(f"❌ Unexpected warm-up: before={before}, attempts={loader.attempts}")
+        return False
+
+    print("✅ Not ready until both models loaded after a retry")
+    return True
+
+def test_missing_model():
+    """A model Ollama doesn't have should be reported with the pull that fixes it"""
+    print("\n🧪 Testing a model that hasn't been pulled...")
+    loader = UnpulledLoader("tiny", pulled_after=2)
+    warmup = ModelWarmup(loader, ["big", "tiny"], retry_interval=0.01)
+
+    async def run():
+        task = asyncio.create_task(warmup.run())
+        await asyncio.sleep(0)
+        missing = warmup.get_status()
+        await asyncio.wait_for(task, timeout=2)
+        return missing
+
+    missing = asyncio.run(run())
+
+    if missing["ready"] or missing["missing"] != ["tiny"] or "ollama pull tiny" not in missing["error"]:
+        print(f"❌ Missing model not reported: {missing}")
+        return False
+    if not warmup.ready or warmup.get_status()["missing"]:
+        print(f"❌ Not ready once the model was pulled: {warmup.get_status()}")
+        return False
+
+    print(f"✅ Reported: {missing['error']}")
+    print("✅ Ready once the model turned up")
+    return True
+
+def test_warmed_models_stay_loaded():
+    """Requests for warmed models should pin them; other models keep the default keep_alive"""
+    print("\n🧪 Testing keep_alive for warmed models...")
+    ModelWarmup(FlakyLoader(), ["pinned-model"])
+    client = AsyncOllamaClient(model="pinned-model")
+    pinned = client._payload("hi")["keep_alive"]
+    other = client._payload("hi", model="other-model")["keep_alive"]
+
+    if pinned != LLM_PINNED_KEEP_ALIVE or other != LLM_KEEP_ALIVE:
+        print(f"❌ Unexpected keep_alive: warmed {pinned}, other {other}")
+        return False
+
+    print(f"✅ Warmed model sent keep_alive {pinned}; other models {other}")
+    return True
+
+def main():
+    print("🚀 LLM Factory Test Suite")
+    print("=" * 50)
+
+    results = {
+        "Shared Clients": test_clients_are_shared(),
+        "Warm-up Models": test_warmup_models(),
+        "Warm-up Retries": test_warmup_retries_until_ready(),
+        "Missing Model": test_missing_model(),
+        "Warmed Models Pinned": test_warmed_models_stay_loaded()
+    }
+
+    print("\n📊 Test Results Summary:")
+    print("=" * 30)
+    for name, passed in results.items():
+        print(f"{name}: {'✅ PASS' if passed else '❌ FAIL'}")
+
+    return all(results.values())
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
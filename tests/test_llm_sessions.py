@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Test script for Ollama KV-context reuse across conversation turns
+Runs offline with a fake Ollama client that returns token contexts
+"""
+
+import sys
+import os
+import asyncio
+# Add parent directory's src folder to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from llm_sessions import SessionAwareOllamaClient
+
+class FakeOllamaClient:
+    """Streams a numbered reply; the returned context is the given context plus one token per word"""
+    model = "llama3.1:8b"
+
+    def __init__(self):
+        self.calls = []
+
+    async def astream(self, prompt, context=None, on_done=None, priority=None, model=None, **options):
+        self.calls.append({"prompt": prompt, "context": list(context) if context is not None else None, "model": model})
+        reply = f"Reply {len(self.calls)}."
+        yield reply
+        on_done({"context": list(context or []) + [len(word) for word in (prompt + " " + reply).split()],
+                 "prompt_eval_count": len(prompt.split())})
+
+def turn(sessions, history, message, scope="AAPL", model=None, turn_tokens=0):
+    """Run one turn; returns (response, stats, whether the full prompt was built)"""
+    built = []
+
+    async def full_prompt():
+        built.append(True)
+        transcript = " ".join(item["content"] for item in history)
+        return f"{transcript} {message}"
+
+    async def run():
+        stats = {}
+        parts = [text async for text in sessions.astream_turn(
+            scope, history, message, turn_prompt=message, full_prompt=full_prompt,
+            turn_tokens=turn_tokens, stats=stats, model=model)]
+        return "".join(parts), stats
+
+    response, stats = asyncio.run(run())
+    return response, stats, bool(built)
+
+def follow_up(history, message, response):
+    return history + [{"role": "user", "content": message}, {"role": "assistant", "content": response}]
+
+def test_context_reuse():
+    """A follow-up with the exact returned transcript should send only the new turn with the stored context"""
+    print("🧪 Testing context reuse on a follow-up turn...")
+    client = FakeOllamaClient()
+    sessions = SessionAwareOllamaClient(client)
+    history = [{"role": "assistant", "content": "Analysis of AAPL: hold."}]
+
+    first, first_stats, first_built = turn(sessions, history, "What about margins?")
+    history = follow_up(history, "What about margins?", first)
+    _, second_stats, second_built = turn(sessions, history, "And the dividend?")
+
+    sent = client.calls[1]
+    if not first_built or first_stats["kv_reused"] or second_built or not second_stats["kv_reused"]:
+        print(f"❌ Expected a miss then a hit: {first_stats}, {second_stats}")
+        return False
+    if client.calls[0]["context"] is not None or sent["prompt"] != "And the dividend?" or not sent["context"]:
+        print(f"❌ Follow-up didn't reuse the stored context: {client.calls}")
+        return False
+    if sessions.get_status() != {"sessions": 2, "hits": 1, "misses": 1}:
+        print(f"❌ Unexpected status: {sessions.get_status()}")
+        return False
+
+    print(f"✅ Follow-up sent only the new message with {len(sent['context'])} context tokens")
+    return True
+
+def test_mismatch():
+    """An edited transcript, another model or another company should miss and rebuild the full prompt"""
+    print("\n🧪 Testing transcript, model and scope mismatches...")
+    client = FakeOllamaClient()
+    sessions = SessionAwareOllamaClient(client)
+    history = [{"role": "assistant", "content": "Analysis of AAPL: hold."}]
+    response, _, _ = turn(sessions, history, "What about margins?")
+    history = follow_up(history, "What about margins?", response)
+
+    edited = history[:-1] + [{"role": "assistant", "content": response + " (edited)"}]
+    cases = {
+        "edited transcript": turn(sessions, edited, "Next?"),
+        "other model": turn(sessions, history, "Next?", model="llama3.2:3b"),
+        "other company": turn(sessions, history, "Next?", scope="MSFT"),
+    }
+    reused = [name for name, (_, stats, built) in cases.items() if stats["kv_reused"] or not built]
+    if reused or any(call["context"] is not None for call in client.calls[1:]):
+        print(f"❌ Context reused for: {reused}")
+        return False
+
+    print(f"✅ {', '.join(cases)} all missed and sent the full prompt without a context")
+    return True
+
+def test_overflow():
+    """A cached context that can't fit the new turn should fall back to the full prompt"""
+    print("\n🧪 Testing fallback when the context would overflow...")
+    client = FakeOllamaClient()
+    history = [{"role": "assistant", "content": "Analysis of AAPL: hold."}]
+    sessions = SessionAwareOllamaClient(client, max_context_tokens=50)
+    response, _, _ = turn(sessions, history, "What about margins?")
+    history = follow_up(history, "What about margins?", response)
+    # One token per word of the full prompt and the two-word reply
+    stored = len(client.calls[0]["prompt"].split()) + 2
+
+    _, fits, fits_built = turn(sessions, history, "Short?", turn_tokens=50 - stored)
+    _, overflow, overflow_built = turn(sessions, history, "Long?", turn_tokens=50)
+
+    if not fits["kv_reused"] or fits_built:
+        print(f"❌ A turn that fits wasn't reused: {fits}")
+        return False
+    if overflow["kv_reused"] or not overflow_built or client.calls[-1]["context"] is not None:
+        print(f"❌ Overflowing turn reused the context: {overflow}")
+        return False
+
+    print(f"✅ Turn of {50 - stored} tokens reused {stored} cached tokens; a 50-token turn sent the full prompt")
+    return True
+
+def test_lru_eviction():
+    """Only the most recently used max_sessions conversations should keep their contexts"""
+    print("\n🧪 Testing LRU eviction...")
+    client = FakeOllamaClient()
+    sessions = SessionAwareOllamaClient(client, max_sessions=2)
+    histories = {}
+    for scope in ("AAPL", "MSFT", "NVDA"):
+        history = [{"role": "assistant", "content": f"Analysis of {scope}."}]
+        response, _, _ = turn(sessions, history, "Why?", scope=scope)
+        histories[scope] = follow_up(history, "Why?", response)
+
+    _, evicted, _ = turn(sessions, histories["AAPL"], "Still there?", scope="AAPL")
+    _, kept, _ = turn(sessions, histories["NVDA"], "Still there?", scope="NVDA")
+    if evicted["kv_reused"] or not kept["kv_reused"] or sessions.get_status()["sessions"] != 2:
+        print(f"❌ Unexpected eviction: AAPL {evicted}, NVDA {kept}, {sessions.get_status()}")
+        return False
+
+    print("✅ Oldest conversation evicted; the most recent one still reused its context")
+    return True
+
+def main():
+    print("🚀 LLM Session Context Test Suite")
+    print("=" * 50)
+
+    results = {
+        "Context Reuse": test_context_reuse(),
+        "Mismatch": test_mismatch(),
+        "Overflow": test_overflow(),
+        "LRU Eviction": test_lru_eviction()
+    }
+
+    print("\n📊 Test Results Summary:")
+    print("=" * 30)
+    for name, passed in results.items():
+        print(f"{name}: {'✅ PASS' if passed else '❌ FAIL'}")
+
+    return all(results.values())
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Test script for the load-test harness and its stand-ins
+Runs offline; the end-to-end check starts an app worker against a fake Ollama server
+"""
+
+import sys
+import os
+import json
+import asyncio
+import subprocess
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+# Add parent directory's src folder to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import requests
+from concurrency import LoopLagMonitor
+from fakes import FakeLLM, FakeOllamaServer
+from loadtest import Workload, parse_mix, saturated, summarize
+from simple_fallback_provider import synthetic_symbols
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+def test_loop_lag():
+    """Blocking the event loop should show up as lag"""
+    print("🧪 Testing event-loop lag monitor...")
+    monitor = LoopLagMonitor(interval_ms=20, window=10)
+
+    async def scenario():
+        monitor.start()
+        await asyncio.sleep(0.2)
+        quiet = monitor.get_status()
+        time.sleep(0.25)  # blocking call on the loop
+        await asyncio.sleep(0.1)
+        await monitor.stop()
+        return quiet, monitor.get_status()
+
+    quiet, blocked = asyncio.run(scenario())
+    if quiet["lag_max_ms"] > 50 or blocked["lag_max_ms"] < 200:
+        print(f"❌ quiet={quiet}, blocked={blocked}")
+        return False
+
+    print(f"✅ Idle loop max lag {quiet['lag_max_ms']} ms; after a 250 ms blocking call {blocked['lag_max_ms']} ms")
+    return True
+
+def test_fake_ollama():
+    """The fake Ollama server should stream generations and queue beyond its parallel limit"""
+    print("\n🧪 Testing fake Ollama server...")
+    server = FakeOllamaServer(FakeLLM(tokens_per_second=400, output_tokens=40, first_token_ms=0), parallel=1).start()
+
+    def generate(_):
+        started = time.perf_counter()
+        response = requests.post(f"{server.url}/api/generate", json={"model": "m", "prompt": "hi"}, stream=True)
+        lines = [json.loads(line) for line in response.iter_lines() if line]
+        return time.perf_counter() - started, lines
+
+    try:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            (first, lines), (second, _) = sorted(pool.map(generate, range(2)), key=lambda result: result[0])
+    finally:
+        server.stop()
+
+    text = "".join(line["response"] for line in lines)
+    if not lines[-1]["done"] or len(text.split()) != 40 or lines[-1]["eval_count"] != 40:
+        print(f"❌ Unexpected stream: {lines[-1]}")
+        return False
+    if second < first * 1.7:
+        print(f"❌ Second generation wasn't queued: {first:.3f}s and {second:.3f}s")
+        return False
+
+    print(f"✅ Streamed 40 tokens in {first * 1000:.0f} ms; the queued generation finished at {second * 1000:.0f} ms")
+    return True
+
+def test_workload():
+    """Symbol popularity should follow the Zipf skew and the mix its weights"""
+    print("\n🧪 Testing workload generation...")
+    workload = Workload(parse_mix("analyze=1,cache-status=3"), synthetic_symbols(1000), zipf=1.1, turns=4)
+    requests_made = [workload.next_request() for _ in range(4000)]
+    endpoints = Counter(request[0] for request in requests_made)
+    symbols = Counter(request[3]["data"]["company_name"] for request in requests_made if request[0] == "analyze")
+    top_share = symbols.most_common(1)[0][1] / sum(symbols.values())
+    histories = [len(workload.history("AAAA")) // 2 for _ in range(2000)]
+
+    if not 2.5 < endpoints["cache-status"] / endpoints["analyze"] < 3.5:
+        print(f"❌ Mix not respected: {endpoints}")
+        return False
+    if symbols.most_common(1)[0][0] != "AAAA" or top_share < 0.1:
+        print(f"❌ Popularity not skewed: {symbols.most_common(3)}")
+        return False
+    if not 3 < sum(histories) / len(histories) < 5:
+        print(f"❌ Mean conversation length {sum(histories) / len(histories):.1f} turns")
+        return False
+
+    print(f"✅ Mix {dict(endpoints)}; top symbol gets {top_share:.0%} of requests")
+    print(f"✅ Mean conversation length {sum(histories) / len(histories):.1f} turns")
+    return True
+
+def test_saturation():
+    """Slow responses after the arrival window shouldn't count against throughput; failures should"""
+    print("\n🧪 Testing saturation criteria...")
+    # 15 s at 2 req/s, every request answered with a 2 s p99
+    keeping_up = {"rate": 2.0, **summarize([(0.5 + (i % 10) * 0.17, 200) for i in range(30)], 15)}
+    # Same arrivals, but a fifth of them time out
+    falling_behind = {"rate": 2.0, **summarize([(1.0, 200)] * 24 + [(60.0, "timeout")] * 6, 15)}
+
+    if keeping_up["throughput"] != 2.0 or saturated(keeping_up, max_error_rate=0.01, slo_ms=30000):
+        print(f"❌ A worker keeping up was flagged: {keeping_up}")
+        return False
+    if not saturated(falling_behind, max_error_rate=1.0, slo_ms=120000):
+        print(f"❌ A worker losing 20% of requests wasn't flagged: {falling_behind}")
+        return False
+
+    print(f"✅ {keeping_up['throughput']} req/s with p99 {keeping_up['p99_ms']:.0f} ms is sustained; "
+          "losing 20% of requests is saturated")
+    return True
+
+def test_end_to_end():
+    """A short ramp against a local worker should complete and report lag for each rate"""
+    print("\n🧪 Testing a short load test...")
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, "loadtest.json")
+        run = subprocess.run([sys.executable, os.path.join(ROOT_DIR, "loadtest.py"), "--rates", "1,2", "--duration", "3",
+                              "--tokens-per-second", "2000", "--provider-latency-ms", "5", "--output", output],
+                             capture_output=True, text=True, timeout=300)
+        steps = json.load(open(output))["steps"] if os.path.exists(output) else []
+
+    if run.returncode != 0 or not steps:
+        print(f"❌ Load test failed:\n{run.stdout[-2000:]}{run.stderr[-2000:]}")
+        return False
+    if any(step["ok"] == 0 or not step.get("event_loop") or not step.get("scheduler") for step in steps):
+        print(f"❌ Missing results: {steps}")
+        return False
+
+    for step in steps:
+        print(f"✅ {step['rate']:g} req/s offered: {step['throughput']} req/s, p99 {step['p99_ms']} ms, "
+              f"loop lag p99 {step['event_loop']['lag_p99_ms']} ms")
+    return True
+
+def main():
+    print("🚀 Load Test Harness Test Suite")
+    print("=" * 50)
+
+    results = {
+        "Event-loop Lag": test_loop_lag(),
+        "Fake Ollama": test_fake_ollama(),
+        "Workload": test_workload(),
+        "Saturation": test_saturation(),
+        "End to End": test_end_to_end()
+    }
+
+    print("\n📊 Test Results Summary:")
+    print("=" * 30)
+    for name, passed in results.items():
+        print(f"{name}: {'✅ PASS' if passed else '❌ FAIL'}")
+
+    return all(results.values())
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Test script for OHLCV history caching and encodings
+Runs offline with a simulated history fetcher; binary formats are checked when
+pyarrow / msgpack are installed
+"""
+
+import sys
+import os
+import io
+import threading
+import time
+# Add parent directory's src folder to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from market_history import (MSGPACK_AVAILABLE, PYARROW_AVAILABLE, COLUMNS, HistoryStore,
+                            iter_arrow, iter_msgpack)
+
+def fake_history(rows):
+    return {
+        "timestamp": [1700000000 + 86400 * i for i in range(rows)],
+        "open": [100.0 + i for i in range(rows)],
+        "high": [101.0 + i for i in range(rows)],
+        "low": [99.0 + i for i in range(rows)],
+        "close": [100.5 + i for i in range(rows)],
+        "volume": [1000 * i for i in range(rows)],
+    }
+
+def test_history_cache():
+    """Repeated requests should be served from the cache; bad parameters rejected"""
+    print("🧪 Testing history cache...")
+    calls = []
+
+    def fetcher(symbol, period, interval):
+        calls.append((symbol, period, interval))
+        return fake_history(3)
+
+    store = HistoryStore(fetcher=fetcher, ttl=60)
+    store.get("aapl", "1y", "1d")
+    store.get("AAPL", "1y", "1d")
+    store.get("AAPL", "5d", "1d")
+
+    try:
+        store.get("AAPL", "2d", "1d")
+        rejected = False
+    except ValueError:
+        rejected = True
+
+    if calls != [("AAPL", "1y", "1d"), ("AAPL", "5d", "1d")] or not rejected:
+        print(f"❌ Unexpected fetches {calls}, rejected={rejected}")
+        return False
+
+    print(f"✅ {store.get_status()['hits']} cache hit, unknown period rejected")
+    return True
+
+def test_bounded_wait():
+    """get_within should stop waiting for a slow fetch, then serve what it cached, stale or fresh"""
+    print("\n🧪 Testing bounded history wait...")
+    calls, threads = [], set()
+
+    def slow_fetcher(symbol, period, interval):
+        calls.append(symbol)
+        threads.add(threading.current_thread().name.split("_")[0])
+        time.sleep(0.3)
+        return fake_history(len(calls) + 1)
+
+    store = HistoryStore(fetcher=slow_fetcher, ttl=0.5)
+    started = time.perf_counter()
+    pending = store.get_within("SPY", "1y", "1d", timeout=0.05)
+    waited = time.perf_counter() - started
+    time.sleep(0.4)
+    cached = store.get_within("SPY", "1y", "1d", timeout=0.05)
+    time.sleep(0.5)
+    stale = store.get_within("SPY", "1y", "1d", timeout=0.05)
+    time.sleep(0.4)
+    refreshed = store.get_within("SPY", "1y", "1d", timeout=0.05)
+
+    if pending is not None or waited > 0.2 or cached is None or len(cached["close"]) != 2:
+        print(f"❌ Slow fetch not left to the background: waited {waited:.2f}s, then {cached}")
+        return False
+    if stale is not cached or len(refreshed["close"]) != 3 or calls != ["SPY", "SPY"]:
+        print(f"❌ Expired bars not served during the refresh: {calls}")
+        return False
+    if threads != {"history"} or store._background or len(store._fetch_locks):
+        print(f"❌ Fetched on {threads} instead of the history pool, {len(store._background)} fetches "
+              f"and {len(store._fetch_locks)} locks left behind")
+        return False
+
+    print(f"✅ Gave up after {waited * 1000:.0f} ms; later calls got the cached bars, then expired bars while refreshing")
+    return True
+
+def test_arrow_stream():
+    """The Arrow stream should round-trip in record batches of the chunk size"""
+    print("\n🧪 Testing Arrow IPC stream...")
+    if not PYARROW_AVAILABLE:
+        print("⏭️  pyarrow not installed, skipping")
+        return True
+    import pyarrow as pa
+
+    history = fake_history(25)
+    table = pa.ipc.open_stream(b"".join(iter_arrow(history, chunk_rows=10))).read_all()
+
+    if table.column_names != COLUMNS or table.num_rows != 25 or len(table.to_batches()) != 3:
+        print(f"❌ Unexpected table: {table.schema}, {table.num_rows} rows")
+        return False
+    if table.column("close").to_pylist() != history["close"]:
+        print("❌ Close prices did not round-trip")
+        return False
+
+    print("✅ 25 rows in 3 record batches")
+    return True
+
+def test_msgpack_stream():
+    """The msgpack stream should be a header followed by column chunks"""
+    print("\n🧪 Testing msgpack stream...")
+    if not MSGPACK_AVAILABLE:
+        print("⏭️  msgpack not installed, skipping")
+        return True
+    import msgpack
+
+    history = fake_history(25)
+    objects = list(msgpack.Unpacker(io.BytesIO(b"".join(iter_msgpack(history, chunk_rows=10, symbol="AAPL")))))
+    header, chunks = objects[0], objects[1:]
+    volume = [value for chunk in chunks for value in chunk["volume"]]
+
+    if header != {"symbol": "AAPL", "columns": COLUMNS, "rows": 25} or len(chunks) != 3 or volume != history["volume"]:
+        print(f"❌ Unexpected stream: {header}, {len(chunks)} chunks")
+        return False
+
+    print("✅ Header and 3 column chunks")
+    return True
+
+def main():
+    print("🚀 Market History Test Suite")
+    print("=" * 50)
+
+    results = {
+        "History Cache": test_history_cache(),
+        "Bounded Wait": test_bounded_wait(),
+        "Arrow Stream": test_arrow_stream(),
+        "Msgpack Stream": test_msgpack_stream()
+    }
+
+    print("\n📊 Test Results Summary:")
+    print("=" * 30)
+    for name, passed in results.items():
+        print(f"{name}: {'✅ PASS' if passed else '❌ FAIL'}")
+
+    return all(results.values())
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Test script for the numeric metrics engine and the CalculateMetrics tool
+Runs offline on hand-built price series and the synthetic market
+"""
+
+import sys
+import os
+import time
+import numpy as np
+# Add parent directory's src folder to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import metrics_engine
+from metrics_engine import beta_metrics, compute_metrics, history_metrics, valuation_metrics
+from financial_agents import FinancialAnalysisAgent
+from market_history import HistoryStore
+from simple_fallback_provider import synthetic_multi_provider
+
+DAY = 86400
+
+def columns(close, start=1_700_000_000):
+    return {"timestamp": [start + i * DAY for i in range(len(close))], "close": list(map(float, close))}
+
+def test_valuation():
+    """Valuation ratios should follow from price, P/E, forward P/E, dividend and ROE"""
+    print("🧪 Testing valuation ratios...")
+    metrics = valuation_metrics({"price": 100.0, "pe_ratio": 25.0, "forward_pe": 20.0,
+                                 "dividend": 1.0, "roe_pct": 40.0})
+    expected = {"eps": 4.0, "forward_eps": 5.0, "eps_growth_pct": 25.0, "peg_ratio": 1.0,
+                "price_to_book": 10.0, "dividend_yield_pct": 1.0, "payout_ratio_pct": 25.0}
+
+    wrong = {key: metrics.get(key) for key, value in expected.items() if not np.isclose(metrics.get(key, np.nan), value)}
+    if wrong:
+        print(f"❌ Wrong values: {wrong}")
+        return False
+
+    print(f"✅ {len(metrics)} valuation ratios, e.g. PEG {metrics['peg_ratio']:.2f}, P/B {metrics['price_to_book']:.2f}")
+    return True
+
+def test_history():
+    """Growth, drawdown, volatility and moving averages should match hand-computed values"""
+    print("\n🧪 Testing history metrics...")
+    # Up 1% a day for 150 days, down 20% over 50 days, flat for 53
+    close = [100 * 1.01 ** i for i in range(151)]
+    close += [close[-1] * (0.8 ** (1 / 50)) ** i for i in range(1, 51)]
+    close += [close[-1]] * 53
+    metrics = history_metrics(columns(close))
+
+    steady = history_metrics(columns([100 * 1.001 ** i for i in range(253)]))
+    checks = {
+        "history_days": (metrics["history_days"], 254),
+        "return_1y_pct": (metrics["return_1y_pct"], (close[-1] / close[-253] - 1) * 100),
+        "max_drawdown_pct": (metrics["max_drawdown_pct"], -20.0),
+        "max_drawdown_days": (metrics["max_drawdown_days"], 50),
+        "current_drawdown_pct": (metrics["current_drawdown_pct"], -20.0),
+        "vs_sma_20_pct": (metrics["vs_sma_20_pct"], 0.0),
+        "vs_sma_200_pct": (metrics["vs_sma_200_pct"], (close[-1] / np.mean(close[-200:]) - 1) * 100),
+        "steady volatility": (steady["volatility_pct"], 0.0),
+        "steady drawdown": (steady["max_drawdown_pct"], 0.0),
+    }
+    wrong = {name: values for name, values in checks.items() if not np.isclose(*values, atol=1e-6)}
+    if wrong:
+        print(f"❌ Wrong values (got, expected): {wrong}")
+        return False
+    if "sharpe_ratio" in steady or "cagr_pct" not in metrics:
+        print(f"❌ Sharpe defined for zero volatility or CAGR missing: {steady}")
+        return False
+
+    print(f"✅ Max drawdown {metrics['max_drawdown_pct']:.2f}% over {metrics['max_drawdown_days']} days, "
+          f"CAGR {metrics['cagr_pct']:.2f}%")
+    return True
+
+def test_beta():
+    """A stock moving twice as much as its benchmark should have beta 2, on the days both traded"""
+    print("\n🧪 Testing beta...")
+    rng = np.random.default_rng(0)
+    benchmark_returns = rng.normal(0, 0.01, 300)
+    benchmark = columns(100 * np.cumprod(1 + benchmark_returns))
+    stock = columns(50 * np.cumprod(1 + 2 * benchmark_returns))
+    # The stock misses the benchmark's first 50 days and a holiday
+    stock = {key: values[50:150] + values[151:] for key, values in stock.items()}
+    beta = beta_metrics(stock, benchmark)
+
+    if not np.isclose(beta["beta"], 2.0, atol=0.01) or not np.isclose(beta["correlation"], 1.0, atol=0.01):
+        print(f"❌ Unexpected beta: {beta}")
+        return False
+
+    metrics = compute_metrics({"symbol": "LEV", "price": 60.0, "beta": 1.1}, stock, benchmark)
+    if not np.isclose(metrics["beta"], beta["beta"]) or metrics["beta_benchmark"] != "SPY":
+        print(f"❌ Provider beta not replaced: {metrics}")
+        return False
+
+    print(f"✅ Beta {beta['beta']:.3f}, correlation {beta['correlation']:.3f} over {len(stock['close'])} shared days")
+    return True
+
+def test_tool():
+    """CalculateMetrics should be a registered tool returning snapshot and history metrics"""
+    print("\n🧪 Testing CalculateMetrics tool...")
+    agent = FinancialAnalysisAgent(llm=None)
+    agent.data_provider = synthetic_multi_provider(seed=7)
+    agent.history_store = HistoryStore(fetcher=agent.data_provider.providers[0].history)
+
+    tools = {tool.name: tool for tool in agent.tools}
+    if "CalculateMetrics" not in tools:
+        print(f"❌ Tool not registered: {list(tools)}")
+        return False
+
+    output = tools["CalculateMetrics"].run("MSFT")
+    lines = dict(line.split(": ", 1) for line in output.splitlines())
+    expected = {"price", "eps", "return_1y_pct", "volatility_pct", "max_drawdown_pct", "sharpe_ratio",
+                "beta", "beta_benchmark", "vs_sma_200_pct", "rsi_signal"}
+    if not expected <= lines.keys():
+        print(f"❌ Missing {expected - lines.keys()} in:\n{output}")
+        return False
+
+    without_history = FinancialAnalysisAgent(llm=None)
+    without_history.history_store = HistoryStore(fetcher=lambda *key: {"timestamp": [], "close": []})
+    fallback = without_history.calculate_metrics(agent.get_financial_data("MSFT"))
+    if "price:" not in fallback or "volatility_pct" in fallback:
+        print(f"❌ Unexpected output without history:\n{fallback}")
+        return False
+
+    print(f"✅ {len(lines)} metrics for MSFT, Sharpe {lines['sharpe_ratio']}, beta {lines['beta']} vs {lines['beta_benchmark']}")
+    print("✅ Snapshot metrics still returned when history is unavailable")
+    return True
+
+def test_fast_path_history():
+    """The fast path shouldn't wait on slow history; the background fetch serves later calls"""
+    print("\n🧪 Testing fast-path history timeout...")
+    market = synthetic_multi_provider(seed=7)
+    fetched = []
+
+    def slow_history(symbol, period, interval):
+        fetched.append(symbol)
+        time.sleep(0.3)
+        return market.providers[0].history(symbol, period, interval)
+
+    agent = FinancialAnalysisAgent(llm=None)
+    agent.data_provider = market
+    agent.history_store = HistoryStore(fetcher=slow_history)
+    data = agent.get_financial_data("MSFT")
+    metrics_engine.METRICS_HISTORY_TIMEOUT = 0.05
+    try:
+        agent.prefetch_benchmark()
+        started = time.perf_counter()
+        first = agent.calculate_metrics(data, wait_for_history=False)
+        elapsed = time.perf_counter() - started
+        time.sleep(0.4)
+        second = agent.calculate_metrics(data, wait_for_history=False)
+    finally:
+        metrics_engine.METRICS_HISTORY_TIMEOUT = 1.0
+
+    if elapsed > 0.2 or "price:" not in first or "volatility_pct" in first:
+        print(f"❌ Waited {elapsed:.2f}s for history:\n{first}")
+        return False
+    if "volatility_pct" not in second or "beta_benchmark: SPY" not in second or sorted(fetched) != ["MSFT", "SPY"]:
+        print(f"❌ History not cached for the next call (fetched {fetched}):\n{second}")
+        return False
+
+    print(f"✅ First analysis computed snapshot metrics in {elapsed * 1000:.0f} ms; "
+          f"the next had history and beta; {len(fetched)} history fetches")
+    return True
+
+def main():
+    print("🚀 Metrics Engine Test Suite")
+    print("=" * 50)
+
+    results = {
+        "Valuation": test_valuation(),
+        "History": test_history(),
+        "Beta": test_beta(),
+        "CalculateMetrics Tool": test_tool(),
+        "Fast-path History": test_fast_path_history()
+    }
+
+    print("\n📊 Test Results Summary:")
+    print("=" * 30)
+    for name, passed in results.items():
+        print(f"{name}: {'✅ PASS' if passed else '❌ FAIL'}")
+
+    return all(results.values())
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test script for task-based model routing
+Runs offline against a fake streaming client
+"""
+
+import sys
+import os
+import asyncio
+# Add parent directory's src folder to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from llm_scheduler import LLMScheduler
+from model_router import ModelRouter, Route, Task
+
+class FakeClient:
+    """Records the options of each generation and answers with the model name"""
+    def __init__(self, delay=0.0):
+        self.scheduler = LLMScheduler(max_concurrency=1)
+        self.delay = delay
+        self.calls = []
+
+    async def astream(self, prompt, priority=None, **options):
+        async with self.scheduler.slot(priority):
+            self.calls.append(options)
+            await asyncio.sleep(self.delay)
+            yield options["model"]
+
+ROUTES = {
+    Task.ANALYSIS: Route("big", 0.7, slo_seconds=0.05, fallback="small"),
+    Task.CONVERSATION: Route("small", 0.7, slo_seconds=10, fallback="tiny"),
+}
+
+def test_routes_by_task():
+    """Each task should use its own primary model and temperature"""
+    print("🧪 Testing per-task routing...")
+    client = FakeClient()
+    router = ModelRouter(client, routes=ROUTES)
+
+    async def run():
+        return [await router.ainvoke(router.choose(task), "prompt") for task in (Task.ANALYSIS, Task.CONVERSATION)]
+
+    models = asyncio.run(run())
+    if models != ["big", "small"] or client.calls[0]["temperature"] != 0.7 or "num_ctx" not in client.calls[0]:
+        print(f"❌ Unexpected routing: {models}, {client.calls}")
+        return False
+
+    print(f"✅ Routed to {models}")
+    return True
+
+def test_downgrade_under_load():
+    """A deep queue should send new work to the fallback model"""
+    print("\n🧪 Testing downgrade under load...")
+    client = FakeClient(delay=0.05)
+    router = ModelRouter(client, routes=ROUTES, downgrade_queue_depth=2)
+    outcome = {}
+
+    async def run():
+        tasks = [asyncio.create_task(router.ainvoke(router.choose(Task.CONVERSATION), "p")) for _ in range(4)]
+        await asyncio.sleep(0.01)
+        outcome["choice"] = router.choose(Task.CONVERSATION)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    choice = outcome["choice"]
+
+    if choice.model != "tiny" or choice.reason != "load":
+        print(f"❌ Expected a load downgrade, got {choice}")
+        return False
+
+    print("✅ Downgraded to the fallback model under load")
+    return True
+
+def test_downgrade_when_slo_at_risk():
+    """Latency over the SLO should downgrade until the probe interval passes"""
+    print("\n🧪 Testing SLO downgrade and probing...")
+    client = FakeClient(delay=0.1)
+    router = ModelRouter(client, routes=ROUTES, probe_interval=0.2)
+
+    async def run():
+        await router.ainvoke(router.choose(Task.ANALYSIS), "p")
+        downgraded = router.choose(Task.ANALYSIS)
+        await asyncio.sleep(0.2)
+        probe = router.choose(Task.ANALYSIS)
+        return downgraded, probe
+
+    downgraded, probe = asyncio.run(run())
+
+    if downgraded.model != "small" or downgraded.reason != "slo" or probe.model != "big":
+        print(f"❌ Unexpected choices: {downgraded}, {probe}")
+        return False
+
+    status = router.get_status()["analysis"]
+    if status["downgrades"] != 1 or status["models"]["big"]["requests"] != 1:
+        print(f"❌ Unexpected status: {status}")
+        return False
+
+    print("✅ Downgraded while over the SLO and probed the primary later")
+    return True
+
+def main():
+    print("🚀 Model Router Test Suite")
+    print("=" * 50)
+
+    results = {
+        "Per-task Routing": test_routes_by_task(),
+        "Load Downgrade": test_downgrade_under_load(),
+        "SLO Downgrade": test_downgrade_when_slo_at_risk()
+    }
+
+    print("\n📊 Test Results Summary:")
+    print("=" * 30)
+    for name, passed in results.items():
+        print(f"{name}: {'✅ PASS' if passed else '❌ FAIL'}")
+
+    return all(results.values())
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
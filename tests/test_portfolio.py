@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Test script for portfolio batch analysis
+Runs offline with simulated data fetches and analyses
+"""
+
+import sys
+import os
+import asyncio
+# Add parent directory's src folder to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from portfolio import analyze_portfolio, build_portfolio_summary_prompt, normalize_symbols
+from context_packer import count_tokens, prompt_budget
+
+# Simulated analysis time per symbol; MSFT is slowest so it should arrive last
+DELAYS = {"AAPL": 0.02, "MSFT": 0.06, "NVDA": 0.01}
+
+def test_normalize_symbols():
+    """Symbols should be cleaned and de-duplicated, and bad batches rejected"""
+    print("🧪 Testing symbol normalization...")
+    symbols = normalize_symbols(["aapl", " MSFT ", "AAPL", ""])
+
+    rejected = 0
+    for bad in ([], ["A", "B", "C"]):
+        try:
+            normalize_symbols(bad, max_symbols=2)
+        except ValueError:
+            rejected += 1
+
+    if symbols != ["AAPL", "MSFT"] or rejected != 2:
+        print(f"❌ Unexpected normalization: {symbols}, rejected {rejected}/2")
+        return False
+
+    print(f"✅ Normalized to {symbols} and rejected empty/oversized batches")
+    return True
+
+def test_batch_fetch_and_streaming():
+    """All data should be fetched before analyses start, results arrive in completion order"""
+    print("\n🧪 Testing batch fetch, concurrency cap and streaming order...")
+    log = []
+    active = {"now": 0, "peak": 0}
+
+    async def fetch(symbol):
+        log.append(("fetch", symbol))
+        return "Error: no data" if symbol == "ZZZZ" else f"{symbol} price: 100"
+
+    async def analyze(symbol, data):
+        log.append(("analyze", symbol))
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        await asyncio.sleep(DELAYS[symbol])
+        active["now"] -= 1
+        return {"analysis": f"analysis of {data}"}
+
+    async def run():
+        return [result async for result in analyze_portfolio(
+            ["AAPL", "MSFT", "NVDA", "ZZZZ"], fetch, analyze, max_concurrency=2
+        )]
+
+    results = asyncio.run(run())
+    order = [result["symbol"] for result in results]
+    first_analysis = next(i for i, (kind, _) in enumerate(log) if kind == "analyze")
+
+    if first_analysis != 4:
+        print(f"❌ Analyses started before all data was fetched: {log}")
+        return False
+    if active["peak"] != 2:
+        print(f"❌ Expected at most 2 concurrent analyses, saw {active['peak']}")
+        return False
+    if order[0] != "ZZZZ" or order[-1] != "MSFT" or results[0]["status"] != "error":
+        print(f"❌ Unexpected results: {results}")
+        return False
+
+    print(f"✅ Results streamed in completion order {order}")
+    return True
+
+def test_summary_prompt():
+    """The portfolio summary prompt should include every analyzed holding"""
+    print("\n🧪 Testing portfolio summary prompt...")
+    prompt = build_portfolio_summary_prompt([
+        {"symbol": "AAPL", "analysis": "Strong cash flow."},
+        {"symbol": "MSFT", "analysis": "Cloud growth."}
+    ], "llama3.1:8b")
+
+    if "=== AAPL ===" not in prompt or "Cloud growth." not in prompt or "(AAPL, MSFT)" not in prompt:
+        print(f"❌ Holdings missing from prompt:\n{prompt}")
+        return False
+
+    print("✅ Summary prompt covers all holdings")
+    return True
+
+def test_summary_prompt_budget():
+    """A full batch of long analyses should be cut to fit the context window, keeping every holding"""
+    print("\n🧪 Testing portfolio summary prompt budget...")
+    model = "llama3.1:8b"
+    long_analysis = "Revenue grew steadily while margins expanded across segments. " * 80
+    results = [{"symbol": f"SYM{i}", "analysis": f"Recommendation for SYM{i}: hold. " + long_analysis} for i in range(19)]
+    results.append({"symbol": "TINY", "analysis": "Short and complete."})
+    prompt = build_portfolio_summary_prompt(results, model)
+    budget = prompt_budget(model)
+
+    unpacked = sum(count_tokens(result["analysis"]) for result in results)
+    if count_tokens(prompt) > budget:
+        print(f"❌ Prompt uses {count_tokens(prompt)} tokens, budget {budget}")
+        return False
+    missing = [result["symbol"] for result in results if f"Recommendation for {result['symbol']}" not in prompt
+               and result["symbol"] != "TINY"]
+    if missing or "Short and complete." not in prompt or "Be concise" not in prompt:
+        print(f"❌ Holdings lost from the prompt: {missing}")
+        return False
+
+    print(f"✅ {unpacked} tokens of analyses packed into {count_tokens(prompt)}/{budget}; all 20 holdings kept")
+    return True
+
+def main():
+    print("🚀 Portfolio Batch Test Suite")
+    print("=" * 50)
+
+    results = {
+        "Symbol Normalization": test_normalize_symbols(),
+        "Batch Fetch and Streaming": test_batch_fetch_and_streaming(),
+        "Summary Prompt": test_summary_prompt(),
+        "Summary Prompt Budget": test_summary_prompt_budget()
+    }
+
+    print("\n📊 Test Results Summary:")
+    print("=" * 30)
+    for name, passed in results.items():
+        print(f"{name}: {'✅ PASS' if passed else '❌ FAIL'}")
+
+    return all(results.values())
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Test script for opt-in request profiling
+Runs offline with a minimal FastAPI app; profiles are written to a temporary directory
+"""
+
+import sys
+import os
+import glob
+import tempfile
+import time
+# Add parent directory's src folder to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import profiling
+from concurrency import run_blocking
+from profiling import Profiler, ProfilingMiddleware, profiled
+
+def busy_provider_call(seconds: float = 0.1) -> int:
+    """Stands in for CPU-bound provider work (parsing, pandas)"""
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(500))
+    return total
+
+def test_choose():
+    """Only a matching token or the sampling rate should turn profiling on"""
+    print("🧪 Testing profile selection...")
+    on_demand = Profiler(token="secret", sample_rate=0)
+    sampled = Profiler(token="", sample_rate=1.0, mode="deterministic")
+
+    checks = {
+        "valid token": on_demand.choose("secret") == "sampling",
+        "mode override": on_demand.choose("secret", "deterministic") == "deterministic",
+        "wrong token": on_demand.choose("guess") is None,
+        "no token configured": Profiler(token="", sample_rate=0).choose("") is None,
+        "sampled": sampled.choose(None) == "deterministic",
+    }
+    failed = [name for name, ok in checks.items() if not ok]
+    if failed:
+        print(f"❌ Failed checks: {failed}")
+        return False
+
+    print("✅ Token, mode override and sampling rate respected")
+    return True
+
+def test_request_profiles():
+    """A profiled request should cover its worker threads and write flame-graph input"""
+    print("\n🧪 Testing request profiles...")
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    with tempfile.TemporaryDirectory() as directory:
+        test_profiler = Profiler(token="secret", sample_rate=0, directory=directory)
+        app = FastAPI()
+        app.add_middleware(ProfilingMiddleware, profiler=test_profiler)
+
+        @app.get("/work")
+        async def work():
+            return {"total": await run_blocking(busy_provider_call)}
+
+        client = TestClient(app)
+        sampled = client.get("/work", headers={"X-Profile-Token": "secret"})
+        deterministic = client.get("/work?profile=secret&profile_mode=deterministic")
+        unprofiled = client.get("/work")
+
+        folded_path = os.path.join(directory, f"{sampled.headers.get('x-profile-id')}.folded")
+        folded = open(folded_path).read() if os.path.exists(folded_path) else ""
+        summary_path = os.path.join(directory, f"{deterministic.headers.get('x-profile-id')}.txt")
+        summary = open(summary_path).read() if os.path.exists(summary_path) else ""
+        files = len(glob.glob(os.path.join(directory, "*")))
+
+    worker_stacks = [line for line in folded.splitlines() if line.startswith("provider") and "busy_provider_call" in line]
+    if not worker_stacks or not folded.startswith("event-loop;"):
+        print(f"❌ Worker thread missing from sampled profile:\n{folded[:500]}")
+        return False
+    if "busy_provider_call" not in summary:
+        print("❌ Worker thread missing from deterministic profile")
+        return False
+    if "x-profile-id" in unprofiled.headers or files != 3:
+        print(f"❌ Unexpected profiles: {files} files")
+        return False
+
+    samples = sum(int(line.rsplit(" ", 1)[1]) for line in worker_stacks)
+    print(f"✅ Sampled profile: {samples} samples in the provider thread")
+    print("✅ Deterministic profile: .prof and summary written")
+    return True
+
+def test_standalone_method():
+    """Decorated agent methods called outside a request should be sampled on their own"""
+    print("\n🧪 Testing profiled methods outside requests...")
+
+    class Agent:
+        @profiled
+        def analyze(self):
+            return self.fetch()
+
+        @profiled
+        def fetch(self):
+            return busy_provider_call(0.05)
+
+    with tempfile.TemporaryDirectory() as directory:
+        original = profiling.profiler
+        profiling.profiler = Profiler(token="", sample_rate=1.0, mode="deterministic", directory=directory)
+        try:
+            Agent().analyze()
+            status = profiling.profiler.get_status()
+        finally:
+            profiling.profiler = original
+
+    if status["profiled"] != 1 or status["recent"][0]["name"] != "test_standalone_method.<locals>.Agent.analyze":
+        print(f"❌ Expected one profile for the outer call, got {status}")
+        return False
+
+    print(f"✅ One profile for the outer call: {status['recent'][0]['ms']} ms")
+    return True
+
+def main():
+    print("🚀 Profiling Test Suite")
+    print("=" * 50)
+
+    results = {
+        "Profile Selection": test_choose(),
+        "Request Profiles": test_request_profiles(),
+        "Standalone Methods": test_standalone_method()
+    }
+
+    print("\n📊 Test Results Summary:")
+    print("=" * 30)
+    for name, passed in results.items():
+        print(f"{name}: {'✅ PASS' if passed else '❌ FAIL'}")
+
+    return all(results.values())
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
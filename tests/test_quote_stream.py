@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Test script for live quote fan-out
+Runs offline against a simulated quote source
+"""
+
+import sys
+import os
+import asyncio
+import time
+# Add parent directory's src folder to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from quote_stream import QuoteHub, RateLimiter
+from financial_data_providers import DAY, MINUTE, MultiProviderFinancialData
+from fakes import FakeProvider
+
+class FakeQuotes:
+    """Price rises by one on every fetch; the sector never changes"""
+    def __init__(self):
+        self.calls = {}
+
+    async def fetch(self, symbol):
+        self.calls[symbol] = self.calls.get(symbol, 0) + 1
+        return {"price": 100.0 + self.calls[symbol], "sector": "Technology"}
+
+def test_single_upstream_fan_out():
+    """Many subscribers to one symbol should share a poller and get only changed fields"""
+    print("🧪 Testing fan-out and deltas...")
+    quotes = FakeQuotes()
+    outcome = {}
+
+    async def run():
+        hub = QuoteHub(quotes.fetch, poll_interval=0.02, upstream_per_minute=60000)
+        subscribers = [hub.subscriber() for _ in range(5)]
+        for subscriber in subscribers:
+            hub.subscribe(subscriber, ["AAPL"])
+        outcome["first"] = await subscribers[0].next_updates()
+        outcome["second"] = await subscribers[0].next_updates()
+        outcome["status"] = hub.get_status()
+        for subscriber in subscribers:
+            hub.unsubscribe(subscriber)
+        outcome["after"] = hub.get_status()
+        await hub.stop()
+
+    asyncio.run(run())
+    first, second = outcome["first"]["AAPL"], outcome["second"]["AAPL"]
+
+    if outcome["status"]["upstream_calls"] > 3 or outcome["status"]["subscribers"] != 5:
+        print(f"❌ Upstream load grew with subscribers: {outcome['status']}")
+        return False
+    if "sector" not in first or set(second) != {"price"}:
+        print(f"❌ Expected a full quote then a price delta, got {first} then {second}")
+        return False
+    if outcome["after"]["symbols"]:
+        print(f"❌ Poller kept running without subscribers: {outcome['after']}")
+        return False
+
+    print(f"✅ 5 subscribers served by {outcome['status']['upstream_calls']} upstream calls; deltas only")
+    return True
+
+def test_slow_consumer():
+    """Unsent updates should be coalesced, and a client that stays behind dropped"""
+    print("\n🧪 Testing coalescing and slow-consumer dropping...")
+    quotes = FakeQuotes()
+    outcome = {}
+
+    async def run():
+        hub = QuoteHub(quotes.fetch, poll_interval=0.01, upstream_per_minute=60000, max_lag=3)
+        fast, slow = hub.subscriber(), hub.subscriber()
+        hub.subscribe(fast, ["AAPL"])
+        hub.subscribe(slow, ["AAPL"])
+        await fast.next_updates()
+        await asyncio.sleep(0.03)
+        outcome["coalesced"] = await fast.next_updates()
+        while not slow.dropped:
+            await fast.next_updates()
+        outcome["slow_updates"] = await slow.next_updates()
+        outcome["status"] = hub.get_status()
+        await hub.stop()
+
+    asyncio.run(run())
+    coalesced = outcome["coalesced"]["AAPL"]
+
+    if coalesced["price"] < 103:
+        print(f"❌ Expected the latest of several updates, got {coalesced}")
+        return False
+    if outcome["slow_updates"] is not None or outcome["status"]["dropped_subscribers"] != 1:
+        print(f"❌ Slow subscriber not dropped: {outcome['status']}")
+        return False
+    if outcome["status"]["subscribers"] != 1:
+        print(f"❌ Fast subscriber affected: {outcome['status']}")
+        return False
+
+    print("✅ Pending updates coalesced; slow subscriber dropped, fast one unaffected")
+    return True
+
+def test_rate_limit():
+    """Pollers for many symbols should share the upstream rate limit"""
+    print("\n🧪 Testing shared upstream rate limit...")
+    limiter = RateLimiter(per_minute=1200)  # one call every 50 ms
+
+    async def run():
+        start = time.monotonic()
+        await asyncio.gather(*(limiter.wait() for _ in range(5)))
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(run())
+    if elapsed < 0.19:
+        print(f"❌ 5 calls started within {elapsed:.3f}s")
+        return False
+
+    print(f"✅ 5 calls spread over {elapsed:.2f}s")
+    return True
+
+def test_provider_quotas():
+    """Live polling should skip providers whose quota can't sustain it; used-up quotas fall through"""
+    print("\n🧪 Testing per-provider quotas...")
+    daily, per_minute, unmetered = FakeProvider("Daily"), FakeProvider("Per Minute"), FakeProvider("Unmetered")
+    daily.quota, per_minute.quota, unmetered.quota = (3, DAY), (60, MINUTE), None
+    chain = MultiProviderFinancialData()
+    chain.providers = [daily, per_minute, unmetered]
+
+    live = [chain.get_financial_data(f"LIVE{i}", min_calls_per_minute=30) for i in range(10)]
+    if daily.calls or per_minute.calls != 10 or any(result.startswith("Error") for result in live):
+        print(f"❌ Live polls reached the daily-quota provider: {daily.calls} daily, {per_minute.calls} per-minute")
+        return False
+
+    for i in range(5):
+        chain.get_financial_data(f"ANALYZE{i}")
+    if daily.calls != 3 or per_minute.calls != 12:
+        print(f"❌ Daily quota not enforced: {daily.calls} daily, {per_minute.calls} per-minute calls")
+        return False
+    if "Calls Left: 0/3" not in chain.get_provider_status():
+        print(f"❌ Remaining quota not reported:\n{chain.get_provider_status()}")
+        return False
+
+    costly = FakeProvider("Costly")
+    costly.quota, costly.calls_per_fetch = (7, DAY), 3
+    chain.providers = [costly, unmetered]
+    for i in range(4):
+        chain.get_financial_data(f"MULTI{i}")
+    if costly.calls != 2 or "Calls Left: 1/7" not in chain.get_provider_status():
+        print(f"❌ Multi-request fetches not charged per request: {costly.calls} fetches\n{chain.get_provider_status()}")
+        return False
+
+    print("✅ 10 live polls skipped the 3/day provider; analyses used its 3 calls, then fell through")
+    print("✅ A provider making 3 requests per fetch got 2 fetches out of a 7-call quota")
+    return True
+
+def main():
+    print("🚀 Quote Stream Test Suite")
+    print("=" * 50)
+
+    results = {
+        "Fan-out and Deltas": test_single_upstream_fan_out(),
+        "Slow Consumer": test_slow_consumer(),
+        "Rate Limit": test_rate_limit(),
+        "Provider Quotas": test_provider_quotas()
+    }
+
+    print("\n📊 Test Results Summary:")
+    print("=" * 30)
+    for name, passed in results.items():
+        print(f"{name}: {'✅ PASS' if passed else '❌ FAIL'}")
+
+    return all(results.values())
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Test script for the LLM request scheduler
+Runs offline; generations are simulated with asyncio.sleep
+"""
+
+import sys
+import os
+import asyncio
+# Add parent directory's src folder to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from llm_scheduler import LLMScheduler, Priority, SchedulerOverloaded
+
+async def fake_generation(scheduler, priority, name, order, duration=0.05):
+    async with scheduler.slot(priority):
+        order.append(name)
+        await asyncio.sleep(duration)
+
+def test_concurrency_is_bounded():
+    """No more than max_concurrency generations should run at once"""
+    print("🧪 Testing bounded concurrency...")
+    scheduler = LLMScheduler(max_concurrency=2)
+    peak = 0
+
+    async def tracked():
+        nonlocal peak
+        async with scheduler.slot(Priority.BATCH):
+            peak = max(peak, scheduler.active)
+            await asyncio.sleep(0.02)
+
+    async def run():
+        await asyncio.gather(*(tracked() for _ in range(10)))
+
+    asyncio.run(run())
+
+    if peak != 2 or scheduler.active != 0:
+        print(f"❌ Peak concurrency {peak}, active after run {scheduler.active}")
+        return False
+
+    print("✅ Concurrency never exceeded 2")
+    return True
+
+def test_interactive_served_first():
+    """Queued interactive requests should start before queued batch work"""
+    print("\n🧪 Testing priority ordering...")
+    scheduler = LLMScheduler(max_concurrency=1)
+    order = []
+
+    async def run():
+        first = asyncio.create_task(fake_generation(scheduler, Priority.BATCH, "running", order))
+        await asyncio.sleep(0.01)
+        tasks = [
+            asyncio.create_task(fake_generation(scheduler, Priority.BATCH, "batch", order)),
+            asyncio.create_task(fake_generation(scheduler, Priority.ANALYSIS, "analysis", order)),
+            asyncio.create_task(fake_generation(scheduler, Priority.INTERACTIVE, "chat", order)),
+        ]
+        await asyncio.gather(first, *tasks)
+
+    asyncio.run(run())
+
+    if order != ["running", "chat", "analysis", "batch"]:
+        print(f"❌ Unexpected order: {order}")
+        return False
+
+    print(f"✅ Served in priority order: {order}")
+    return True
+
+def test_admission_control():
+    """A full class queue should be rejected with 429 and a Retry-After estimate"""
+    print("\n🧪 Testing admission control...")
+    scheduler = LLMScheduler(max_concurrency=1, queue_limits={Priority.ANALYSIS: 2}, max_queue=10)
+    outcome = {}
+
+    async def run():
+        tasks = [asyncio.create_task(fake_generation(scheduler, Priority.ANALYSIS, i, [])) for i in range(3)]
+        await asyncio.sleep(0.01)
+        try:
+            scheduler.check_admission(Priority.ANALYSIS)
+        except SchedulerOverloaded as e:
+            outcome["error"] = e
+        # Other classes are still admitted
+        scheduler.check_admission(Priority.INTERACTIVE)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    error = outcome.get("error")
+
+    if error is None or error.status_code != 429 or error.retry_after < 1:
+        print(f"❌ Expected a 429 rejection, got {error!r}")
+        return False
+
+    status = scheduler.get_status()["classes"]["analysis"]
+    if status["rejected"] != 1 or status["completed"] != 3:
+        print(f"❌ Unexpected metrics: {status}")
+        return False
+
+    print(f"✅ Rejected with 429, Retry-After {error.retry_after}s")
+    return True
+
+def test_cancelled_waiter_releases_queue():
+    """Cancelling a queued request should not leak its queue position or slot"""
+    print("\n🧪 Testing cancelled waiter...")
+    scheduler = LLMScheduler(max_concurrency=1)
+
+    async def run():
+        running = asyncio.create_task(fake_generation(scheduler, Priority.BATCH, "a", []))
+        await asyncio.sleep(0.01)
+        waiting = asyncio.create_task(fake_generation(scheduler, Priority.BATCH, "b", []))
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        await asyncio.gather(running, waiting, return_exceptions=True)
+
+    asyncio.run(run())
+
+    if scheduler.active != 0 or scheduler.queued != 0:
+        print(f"❌ Leaked state: active={scheduler.active}, queued={scheduler.queued}")
+        return False
+
+    print("✅ No slots or queue entries leaked")
+    return True
+
+def main():
+    print("🚀 LLM Scheduler Test Suite")
+    print("=" * 50)
+
+    results = {
+        "Bounded Concurrency": test_concurrency_is_bounded(),
+        "Priority Ordering": test_interactive_served_first(),
+        "Admission Control": test_admission_control(),
+        "Cancelled Waiter": test_cancelled_waiter_releases_queue()
+    }
+
+    print("\n📊 Test Results Summary:")
+    print("=" * 30)
+    for name, passed in results.items():
+        print(f"{name}: {'✅ PASS' if passed else '❌ FAIL'}")
+
+    return all(results.values())
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Test script for server-side conversation sessions
+Runs offline; the SQLite backend uses a temporary database
+"""
+
+import sys
+import os
+import tempfile
+import time
+# Add parent directory's src folder to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from context_packer import ContextPacker
+from session_store import MemorySessionStore, SQLiteSessionStore, new_message
+
+def check_backend(store) -> bool:
+    session = store.create("aapl")
+    store.append(session.id, [new_message('assistant', "Initial analysis of AAPL.")])
+    store.append(session.id, [new_message('user', "What about margins?"),
+                              new_message('assistant', "Margins are strong.")], {"summary": {"turns": 1, "text": "s"}})
+    loaded = store.get(session.id)
+
+    if loaded.company_name != "AAPL" or [m['role'] for m in loaded.history] != ['assistant', 'user', 'assistant']:
+        print(f"❌ {store.backend}: unexpected history {loaded.history}")
+        return False
+    if loaded.tokens <= 0 or loaded.state["summary"]["text"] != "s":
+        print(f"❌ {store.backend}: token counts or state not kept")
+        return False
+    if not store.delete(session.id) or store.get(session.id) is not None:
+        print(f"❌ {store.backend}: session not deleted")
+        return False
+
+    print(f"✅ {store.backend}: history, token counts and state kept across turns")
+    return True
+
+def test_backends():
+    """Both backends should keep history and derived state between requests"""
+    print("🧪 Testing memory and SQLite backends...")
+    with tempfile.TemporaryDirectory() as directory:
+        sqlite_ok = check_backend(SQLiteSessionStore(path=os.path.join(directory, "sessions.db")))
+        # A new store on the same file sees sessions written by the previous one
+        path = os.path.join(directory, "shared.db")
+        session = SQLiteSessionStore(path=path).create("msft")
+        reopened = SQLiteSessionStore(path=path).get(session.id) is not None
+    if not reopened:
+        print("❌ sqlite: session not visible to a second store")
+    return check_backend(MemorySessionStore()) and sqlite_ok and reopened
+
+def test_limits():
+    """Sessions expire after the TTL; session count and length are capped"""
+    print("\n🧪 Testing TTL and size caps...")
+    store = MemorySessionStore(ttl=0.05, max_sessions=2, max_messages=3)
+    first = store.create("A")
+    store.create("B")
+    store.create("C")
+    evicted = store.get(first.id) is None
+
+    session = store.create("D")
+    store.append(session.id, [new_message('user', str(i)) for i in range(2)], {"summary": {"turns": 2, "text": "0, 1"}})
+    trimmed = store.append(session.id, [new_message('user', str(i)) for i in range(2, 5)])
+    time.sleep(0.1)
+    expired = store.get(session.id) is None
+
+    if not evicted or [m['content'] for m in trimmed.history] != ['2', '3', '4'] or not expired:
+        print(f"❌ Unexpected: evicted={evicted}, history={trimmed.history}, expired={expired}")
+        return False
+    if trimmed.state["summary"]["turns"] != 0:
+        print(f"❌ Summary coverage not shifted after trimming: {trimmed.state}")
+        return False
+
+    print("✅ Oldest session evicted, history trimmed and session expired")
+    return True
+
+def test_summary_kept_in_session():
+    """The rolling summary should be stored in the session and reused after a restart"""
+    print("\n🧪 Testing rolling summary in session state...")
+    calls = []
+
+    def summarizer(previous, turns):
+        calls.append(len(turns))
+        return (previous + " " if previous else "") + " ".join(m['content'] for m in turns)
+
+    history = [{'role': 'user', 'content': f"message {i} " + "word " * 40} for i in range(12)]
+    state = {}
+    ContextPacker("test", summarizer=summarizer, budget=300).pack("System.", history, "Tail.", session_state=state)
+    covered = state["summary"]["turns"]
+
+    # A fresh packer (as after a restart) with one more turn only summarizes the new part
+    calls.clear()
+    history.append({'role': 'user', 'content': "message 12 " + "word " * 40})
+    ContextPacker("test", summarizer=summarizer, budget=300).pack("System.", history, "Tail.", session_state=state)
+
+    if calls != [1] or state["summary"]["turns"] != covered + 1:
+        print(f"❌ Summary was not resumed from the session: calls={calls}, state={state['summary']['turns']}")
+        return False
+
+    print("✅ Summary resumed from session state; only the new turn was summarized")
+    return True
+
+def test_summary_survives_trim():
+    """A summary whose turns were all trimmed away should still reach the prompt and seed the next summary"""
+    print("\n🧪 Testing summary after trimming...")
+    store = MemorySessionStore(max_messages=3)
+    session = store.create("D")
+    store.append(session.id, [new_message('user', f"early {i}") for i in range(2)],
+                 {"summary": {"turns": 2, "text": "Early: user prefers dividends."}})
+    trimmed = store.append(session.id, [new_message('user', f"late {i}") for i in range(3)])
+    previous = []
+
+    def summarizer(summary, turns):
+        previous.append(summary)
+        return summary + " " + " ".join(m['content'] for m in turns)
+
+    short = ContextPacker("test", summarizer=summarizer, budget=300).pack(
+        "System.", trimmed.history, "Tail.", session_state=dict(trimmed.state))
+    long_history = trimmed.history[:2] + [{'role': 'user', 'content': "late 2 " + "word " * 400}]
+    state = dict(trimmed.state)
+    ContextPacker("test", summarizer=summarizer, budget=300).pack("System.", long_history, "Tail.", session_state=state)
+
+    if "Early: user prefers dividends." not in short.prompt or short.summarized_turns != 0:
+        print(f"❌ Dropped messages' summary missing from the prompt:\n{short.prompt}")
+        return False
+    if previous != ["Early: user prefers dividends."] or not state["summary"]["text"].startswith("Early:"):
+        print(f"❌ Summary restarted without the seed: {previous}, {state['summary']}")
+        return False
+
+    print("✅ Summary of trimmed messages kept in the prompt and extended by the next summary")
+    return True
+
+def main():
+    print("🚀 Session Store Test Suite")
+    print("=" * 50)
+
+    results = {
+        "Backends": test_backends(),
+        "TTL and Caps": test_limits(),
+        "Summary State": test_summary_kept_in_session(),
+        "Trimmed Summary": test_summary_survives_trim()
+    }
+
+    print("\n📊 Test Results Summary:")
+    print("=" * 30)
+    for name, passed in results.items():
+        print(f"{name}: {'✅ PASS' if passed else '❌ FAIL'}")
+
+    return all(results.values())
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test script for parsing provider output and the compact prompt encoding
+Runs offline on sample provider text
+"""
+
+import sys
+import os
+# Add parent directory's src folder to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from financial_snapshot import parse_financial_data, encode_compact, compact_financial_data
+from context_packer import count_tokens
+
+PROVIDER_TEXT = """Financial Data for AAPL:
+Data Source: Financial Modeling Prep (Primary Provider)
+
+Company: Apple Inc.
+Sector: Technology
+Industry: N/A
+
+Real-time Quote Data:
+Current Price: $185.50
+Change: $1.50
+Change %: 0.82%
+Day High: $188.20
+Day Low: $183.90
+Previous Close: $184.00
+Volume: 52,345,678
+Market Cap: $2,910,000,000,000
+52-Week High: $199.62
+52-Week Low: $164.08
+52-Week Range: 21.7%
+
+Fundamental Metrics:
+P/E Ratio: 28.50
+Forward P/E: N/A
+Beta: 1.29
+
+📊 Note: Using real-time data. Historical analysis not available due to rate limits."""
+
+def test_parse():
+    """Parsing should convert labelled values to numbers and drop N/A fields"""
+    print("🧪 Testing provider text parsing...")
+    snapshot = parse_financial_data(PROVIDER_TEXT)
+
+    expected = {"symbol": "AAPL", "company": "Apple Inc.", "source": "Financial Modeling Prep",
+                "price": 185.5, "change": 1.5, "change_pct": 0.82, "volume": 52345678.0}
+    wrong = {key: snapshot.get(key) for key, value in expected.items() if snapshot.get(key) != value}
+    if wrong or "industry" in snapshot or "forward_pe" in snapshot:
+        print(f"❌ Unexpected snapshot values: {wrong or snapshot}")
+        return False
+
+    print("✅ Snapshot parsed")
+    return True
+
+def test_compact_encoding():
+    """The compact form should keep the numbers with fixed precision and drop prose"""
+    print("\n🧪 Testing compact encoding...")
+    compact = encode_compact(parse_financial_data(PROVIDER_TEXT))
+
+    for fragment in ["AAPL (Apple Inc.)", "price=185.50", "chg%=0.82", "vol=52.35M", "mcap=2.91T", "pe=28.50"]:
+        if fragment not in compact:
+            print(f"❌ Missing {fragment!r} in:\n{compact}")
+            return False
+    if "N/A" in compact or "Note" in compact or "$" in compact:
+        print(f"❌ Compact form still contains prose:\n{compact}")
+        return False
+
+    text_tokens, compact_tokens = count_tokens(PROVIDER_TEXT), count_tokens(compact)
+    if compact_tokens >= text_tokens:
+        print(f"❌ Compact form is not smaller: {compact_tokens} vs {text_tokens} tokens")
+        return False
+
+    print(f"✅ {text_tokens} tokens as text, {compact_tokens} compact")
+    return True
+
+def test_errors_pass_through():
+    """Error messages and text without numbers should be left unchanged"""
+    print("\n🧪 Testing pass-through of errors...")
+    error = "Error: All financial data providers failed."
+    if compact_financial_data(error) != error or compact_financial_data("no data here") != "no data here":
+        print("❌ Non-data text was rewritten")
+        return False
+
+    print("✅ Errors passed through unchanged")
+    return True
+
+def main():
+    print("🚀 Snapshot Test Suite")
+    print("=" * 50)
+
+    results = {
+        "Parse": test_parse(),
+        "Compact Encoding": test_compact_encoding(),
+        "Error Pass-through": test_errors_pass_through()
+    }
+
+    print("\n📊 Test Results Summary:")
+    print("=" * 30)
+    for name, passed in results.items():
+        print(f"{name}: {'✅ PASS' if passed else '❌ FAIL'}")
+
+    return all(results.values())
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
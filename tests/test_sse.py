@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Test script for the Server-Sent Event streaming endpoints
+Runs offline against the web app with a fake provider and a fake LLM
+"""
+
+import sys
+import os
+import json
+import asyncio
+import time
+from urllib.parse import urlencode
+# Add parent directory's src folder to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import httpx
+import app as web
+from fakes import FakeLLM, FakeProvider, LatencyProfile
+
+def install(llm, fail_after=None):
+    """Serve generations from llm, counting chunks; raise after fail_after chunks if given"""
+    client = llm.install(web.llm_client)
+    astream = client.astream
+    llm.chunks = 0
+
+    async def counting_astream(prompt, **kwargs):
+        async for chunk in astream(prompt, **kwargs):
+            if fail_after is not None and llm.chunks >= fail_after:
+                raise RuntimeError("model crashed")
+            llm.chunks += 1
+            yield chunk
+
+    client.astream = counting_astream
+    web.financial_agent.data_provider = FakeProvider(profile=LatencyProfile(latency_ms=0))
+    web.financial_agent.clear_cache()
+    return llm
+
+def parse_events(body: str) -> list:
+    """(event, data) pairs from an event stream; every event must be an event line, a data line and a blank line"""
+    events = []
+    for block in body.split("\n\n")[:-1]:
+        event_line, data_line = block.split("\n")
+        assert event_line.startswith("event: ") and data_line.startswith("data: "), block
+        events.append((event_line[len("event: "):], json.loads(data_line[len("data: "):])))
+    assert body.endswith("\n\n"), body[-50:]
+    return events
+
+def stream_analysis(**form):
+    """POST /analyze/stream through the ASGI transport; returns the response and its events"""
+    async def run():
+        transport = httpx.ASGITransport(app=web.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/analyze/stream", data={"company_name": "AAPL", **form})
+        return response, parse_events(response.text)
+
+    return asyncio.run(run())
+
+def test_event_framing():
+    """sse_event should frame one JSON payload per event"""
+    print("🧪 Testing event framing...")
+    frame = web.sse_event("token", {"stage": "analysis", "text": "line one\nline two"})
+    events = parse_events(frame)
+
+    if frame != 'event: token\ndata: {"stage": "analysis", "text": "line one\\nline two"}\n\n':
+        print(f"❌ Unexpected frame: {frame!r}")
+        return False
+    if events != [("token", {"stage": "analysis", "text": "line one\nline two"})]:
+        print(f"❌ Frame didn't round-trip: {events}")
+        return False
+
+    print("✅ Newlines in the payload stay inside a single data line")
+    return True
+
+def test_done_event():
+    """A stream should report its stages and tokens, then a done event with the full text"""
+    print("\n🧪 Testing /analyze/stream events...")
+    install(FakeLLM(output_tokens=24, chunk_tokens=4))
+    response, events = stream_analysis()
+    names = [event for event, _ in events]
+    tokens = "".join(data["text"] for event, data in events if event == "token")
+
+    if response.headers["content-type"].split(";")[0] != "text/event-stream" or response.headers["cache-control"] != "no-cache":
+        print(f"❌ Unexpected headers: {dict(response.headers)}")
+        return False
+    if names != ["stage", "stage"] + ["token"] * 6 + ["done"] or [data["stage"] for _, data in events[:2]] != ["data", "analysis"]:
+        print(f"❌ Unexpected events: {names}")
+        return False
+    if events[-1][1]["final_analysis"] != tokens or not events[-1][1]["data_tokens"]:
+        print(f"❌ done event doesn't carry the streamed text: {events[-1]}")
+        return False
+
+    print(f"✅ Stages data and analysis, {names.count('token')} token events, done with the full analysis")
+    return True
+
+def test_analysis_sessions():
+    """An analysis should only start a session when the client asks for one"""
+    print("\n🧪 Testing analysis sessions...")
+    install(FakeLLM(output_tokens=8))
+    before = web.session_store.get_status()["sessions"]
+    _, plain = stream_analysis()
+    after_plain = web.session_store.get_status()["sessions"]
+    _, started = stream_analysis(start_session="true")
+    session = web.session_store.get(started[-1][1]["session_id"])
+
+    if plain[-1][1]["session_id"] is not None or after_plain != before:
+        print(f"❌ Session created without being asked for: {plain[-1][1]['session_id']}")
+        return False
+    if session is None or [m["content"] for m in session.history] != [started[-1][1]["final_analysis"]]:
+        print(f"❌ Requested session missing or without the analysis: {session}")
+        return False
+
+    print("✅ No session by default; start_session=true returns one holding the analysis")
+    return True
+
+def test_error_event():
+    """A generation failing mid-stream should end the stream with an error event instead of done"""
+    print("\n🧪 Testing error event...")
+    install(FakeLLM(output_tokens=24, chunk_tokens=4), fail_after=2)
+    response, events = stream_analysis()
+    names = [event for event, _ in events]
+
+    if response.status_code != 200 or names != ["stage", "stage", "token", "token", "error"]:
+        print(f"❌ Unexpected events: {response.status_code} {names}")
+        return False
+    if events[-1][1] != {"message": "model crashed"}:
+        print(f"❌ Unexpected error event: {events[-1]}")
+        return False
+
+    print("✅ Two tokens then an error event; no done event")
+    return True
+
+def test_client_disconnect():
+    """A client going away mid-stream should stop the generation and free its LLM slot"""
+    print("\n🧪 Testing cancellation on client disconnect...")
+    llm = install(FakeLLM(tokens_per_second=100, output_tokens=200, chunk_tokens=1, first_token_ms=0))
+    body = urlencode({"company_name": "AAPL"}).encode()
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+             "scheme": "http", "path": "/analyze/stream", "raw_path": b"/analyze/stream", "query_string": b"",
+             "root_path": "", "server": ("test", 80), "client": ("127.0.0.1", 1234),
+             "headers": [(b"host", b"test"), (b"content-type", b"application/x-www-form-urlencoded"),
+                         (b"content-length", str(len(body)).encode())]}
+    received = []
+
+    async def run():
+        first_token = asyncio.Event()
+        requests = [{"type": "http.request", "body": body, "more_body": False}]
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            await first_token.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if b"event: token" in message.get("body", b""):
+                received.append(message["body"])
+                first_token.set()
+
+        started = time.perf_counter()
+        await asyncio.wait_for(web.app(scope, receive, send), timeout=10)
+        elapsed = time.perf_counter() - started
+        await asyncio.sleep(0.2)
+        return elapsed, llm.chunks, web.llm_scheduler.active
+
+    elapsed, chunks, active = asyncio.run(run())
+    if chunks >= llm.output_tokens or elapsed > 1.0:
+        print(f"❌ Generation kept running after the disconnect: {chunks} chunks in {elapsed:.2f}s")
+        return False
+    if active != 0:
+        print(f"❌ LLM slot still held: {active} active")
+        return False
+
+    print(f"✅ Stream closed after {len(received)} token event(s); generation stopped at {chunks}/{llm.output_tokens} "
+          f"tokens and released its slot")
+    return True
+
+def test_batch_priority():
+    """Every generation of a portfolio batch, the summary included, should run at batch priority"""
+    print("\n🧪 Testing /analyze/batch priorities...")
+    install(FakeLLM(output_tokens=8))
+    astream = web.llm_client.astream
+    priorities = []
+
+    async def recording_astream(prompt, **kwargs):
+        priorities.append(kwargs.get("priority"))
+        async for chunk in astream(prompt, **kwargs):
+            yield chunk
+
+    web.llm_client.astream = recording_astream
+
+    async def run():
+        transport = httpx.ASGITransport(app=web.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/analyze/batch", json={"symbols": ["AAPL", "MSFT"]})
+        return parse_events(response.text)
+
+    events = asyncio.run(run())
+    stages = [data["stage"] for event, data in events if event == "stage"]
+
+    if stages[-1] != "summary" or events[-1][0] != "done" or not events[-1][1]["summary"]:
+        print(f"❌ Batch didn't end with a summary: {stages}, {events[-1]}")
+        return False
+    if len(priorities) != 3 or set(priorities) != {web.Priority.BATCH}:
+        print(f"❌ Unexpected priorities: {priorities}")
+        return False
+
+    print("✅ Two analyses and the summary all queued at BATCH priority")
+    return True
+
+def main():
+    print("🚀 Server-Sent Events Test Suite")
+    print("=" * 50)
+
+    results = {
+        "Event Framing": test_event_framing(),
+        "Done Event": test_done_event(),
+        "Analysis Sessions": test_analysis_sessions(),
+        "Error Event": test_error_event(),
+        "Client Disconnect": test_client_disconnect(),
+        "Batch Priority": test_batch_priority()
+    }
+
+    print("\n📊 Test Results Summary:")
+    print("=" * 30)
+    for name, passed in results.items():
+        print(f"{name}: {'✅ PASS' if passed else '❌ FAIL'}")
+
+    return all(results.values())
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Test script for start-up cost
+Checks that importing the application does not load heavy libraries eagerly
+"""
+
+import sys
+import os
+# Add parent directory to path for profile_imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from profile_imports import HEAVY_PACKAGES, profile_module
+
+def check_module(module: str) -> bool:
+    total_us, entries = profile_module(module)
+    loaded = sorted({name.split(".")[0] for *_, name in entries} & set(HEAVY_PACKAGES))
+    if loaded:
+        print(f"❌ Importing {module} loaded {', '.join(loaded)}")
+        return False
+    print(f"✅ {module} imported in {total_us / 1000:.0f} ms without heavy packages")
+    return True
+
+def test_app_import():
+    """The web app should start without importing LangChain, pandas or the provider SDKs"""
+    print("🧪 Testing app import...")
+    return check_module("app")
+
+def test_cli_import():
+    """The CLI agent module should defer LangChain until the first question"""
+    print("\n🧪 Testing CLI agent import...")
+    return check_module("agent")
+
+def main():
+    print("🚀 Startup Test Suite")
+    print("=" * 50)
+
+    results = {
+        "App Import": test_app_import(),
+        "CLI Import": test_cli_import()
+    }
+
+    print("\n📊 Test Results Summary:")
+    print("=" * 30)
+    for name, passed in results.items():
+        print(f"{name}: {'✅ PASS' if passed else '❌ FAIL'}")
+
+    return all(results.values())
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test script for structured logging
+Runs offline; records are written to in-memory streams
+"""
+
+import sys
+import os
+import io
+import json
+import queue
+import time
+import logging
+# Add parent directory's src folder to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from structured_logging import DroppingQueueHandler, SamplingFilter, configure_logging, get_logger, shutdown_logging
+from financial_data_providers import MultiProviderFinancialData
+
+class CountingValue:
+    """Counts how often it is rendered"""
+    def __init__(self):
+        self.renders = 0
+
+    def __str__(self):
+        self.renders += 1
+        return "value"
+
+class FailingProvider:
+    name = "Failing"
+    rate_limit = "n/a"
+
+    def get_financial_data(self, symbol):
+        return f"Error: no data for {symbol}"
+
+def capture(**options) -> io.StringIO:
+    stream = io.StringIO()
+    configure_logging(stream=stream, **options)
+    return stream
+
+def test_levels_and_json():
+    """Disabled levels should cost nothing; enabled records come out as JSON with their fields"""
+    print("🧪 Testing level gating and JSON output...")
+    stream = capture(level="INFO", fmt="json")
+    log = get_logger("test")
+    value = CountingValue()
+    log.debug("hidden", value=value)
+    log.info("shown", symbol="AAPL", age=12)
+    shutdown_logging()
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    if value.renders != 0:
+        print("❌ A DEBUG record was formatted at INFO level")
+        return False
+    if len(lines) != 1 or lines[0]["event"] != "shown" or lines[0]["symbol"] != "AAPL" or lines[0]["age"] != 12:
+        print(f"❌ Unexpected output: {lines}")
+        return False
+
+    print(f"✅ {lines[0]}")
+    return True
+
+def test_sampling():
+    """Repeated INFO events should be capped per window and report what was suppressed"""
+    print("\n🧪 Testing sampling of repetitive events...")
+    sampler = SamplingFilter(burst=3, window=0.05)
+
+    def record(level=logging.INFO):
+        return logging.LogRecord("financial_agent.cache", level, __file__, 0, "cache_miss", None, None)
+
+    passed = sum(sampler.filter(record()) for _ in range(10))
+    warning_passed = sampler.filter(record(logging.WARNING))
+    time.sleep(0.06)
+    resumed = record()
+    sampler.filter(resumed)
+
+    if passed != 3 or not warning_passed:
+        print(f"❌ {passed} of 10 passed, warning passed={warning_passed}")
+        return False
+    if getattr(resumed, "fields", {}).get("suppressed") != 7:
+        print(f"❌ Suppressed count not reported: {getattr(resumed, 'fields', None)}")
+        return False
+
+    print("✅ 3 of 10 passed; next window reported 7 suppressed; warnings always pass")
+    return True
+
+def test_non_blocking_queue():
+    """A full queue should drop records instead of blocking the caller"""
+    print("\n🧪 Testing non-blocking queue...")
+    handler = DroppingQueueHandler(queue.Queue(maxsize=2))
+    logger = logging.getLogger("financial_agent.test.queue")
+    logger.propagate = False
+    logger.addHandler(handler)
+    for i in range(5):
+        logger.warning("event %d", i)
+    logger.removeHandler(handler)
+
+    if handler.queue.qsize() != 2 or handler.dropped != 3:
+        print(f"❌ queued={handler.queue.qsize()}, dropped={handler.dropped}")
+        return False
+
+    print("✅ 2 queued, 3 dropped without blocking")
+    return True
+
+def test_provider_events():
+    """Provider fallbacks should be logged as structured events"""
+    print("\n🧪 Testing provider events...")
+    stream = capture(level="DEBUG", fmt="text")
+    provider = MultiProviderFinancialData()
+    provider.providers = [FailingProvider()]
+    provider.get_financial_data("MSFT")
+    shutdown_logging()
+
+    output = stream.getvalue()
+    if "provider_attempt provider=Failing symbol=MSFT" not in output or "provider_failed" not in output:
+        print(f"❌ Unexpected output:\n{output}")
+        return False
+
+    print("✅ " + output.strip().replace("\n", "\n✅ "))
+    return True
+
+def main():
+    print("🚀 Structured Logging Test Suite")
+    print("=" * 50)
+
+    results = {
+        "Levels and JSON": test_levels_and_json(),
+        "Sampling": test_sampling(),
+        "Non-blocking Queue": test_non_blocking_queue(),
+        "Provider Events": test_provider_events()
+    }
+
+    print("\n📊 Test Results Summary:")
+    print("=" * 30)
+    for name, passed in results.items():
+        print(f"{name}: {'✅ PASS' if passed else '❌ FAIL'}")
+
+    return all(results.values())
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Test script for request tracing
+Runs offline with simulated providers and a minimal FastAPI app
+"""
+
+import sys
+import os
+import asyncio
+import json
+import tempfile
+# Add parent directory's src folder to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import tracing
+from concurrency import run_blocking
+from financial_data_providers import MultiProviderFinancialData
+from tracing import TraceExporter, TracingMiddleware, span, start_span, trace
+
+class FailingProvider:
+    name = "Failing"
+    rate_limit = "n/a"
+
+    def get_financial_data(self, symbol):
+        return f"Error: no data for {symbol}"
+
+class WorkingProvider:
+    name = "Working"
+    rate_limit = "n/a"
+
+    def get_financial_data(self, symbol):
+        with span("http.get", url=f"https://example.test/{symbol}"):
+            return f"Financial Data for {symbol}"
+
+def test_span_nesting():
+    """Spans in worker threads and tasks should attach to the request that started them"""
+    print("🧪 Testing span nesting across threads...")
+
+    def blocking_work():
+        with span("outer") as outer:
+            with span("inner"):
+                pass
+        return outer
+
+    async def run():
+        with trace("request") as active:
+            outer = await run_blocking(blocking_work)
+            generation = start_span("generate", model="test")
+            generation.end()
+        return active, outer
+
+    active, outer = asyncio.run(run())
+    parents = {s.name: s.parent_id for s in active.spans}
+
+    if parents != {"inner": outer.span_id, "outer": active.root.span_id, "generate": active.root.span_id}:
+        print(f"❌ Unexpected parents: {parents}")
+        return False
+    if start_span("outside") is not tracing.NOOP_SPAN:
+        print("❌ Span recorded outside a trace")
+        return False
+
+    print("✅ Thread and generator spans parented to the request")
+    return True
+
+def test_provider_attempts():
+    """Each provider attempt should be a span; failed attempts marked as errors"""
+    print("\n🧪 Testing provider attempt spans...")
+    provider = MultiProviderFinancialData()
+    provider.providers = [FailingProvider(), WorkingProvider()]
+
+    with trace("fetch") as active:
+        result = provider.get_financial_data("AAPL")
+
+    attempts = [(s.attributes["provider"], s.error is None) for s in active.spans if s.name == "provider.attempt"]
+    timings = active.timings()
+
+    if result != "Financial Data for AAPL" or attempts != [("Failing", False), ("Working", True)]:
+        print(f"❌ Unexpected attempts: {attempts}")
+        return False
+    if "provider.backoff" not in timings or "http.get" not in timings:
+        print(f"❌ Missing spans: {list(timings)}")
+        return False
+
+    print(f"✅ Attempts recorded: {attempts}, backoff {timings['provider.backoff']['ms']:.0f} ms")
+    return True
+
+def test_middleware_and_export():
+    """Responses should carry Server-Timing; traces should be exported as OTLP/JSON"""
+    print("\n🧪 Testing Server-Timing header and OTLP export...")
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    app = FastAPI()
+    app.add_middleware(TracingMiddleware)
+
+    @app.get("/work")
+    async def work():
+        with span("cache.lookup", hit=False):
+            pass
+        await run_blocking(WorkingProvider().get_financial_data, "MSFT")
+        return {"ok": True}
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "traces.jsonl")
+        tracing.exporter = TraceExporter(path)
+        try:
+            response = TestClient(app).get("/work", headers={
+                "traceparent": "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"})
+            tracing.exporter.flush()
+        finally:
+            tracing.exporter = None
+        with open(path) as f:
+            exported = [json.loads(line) for line in f]
+
+    timing = response.headers.get("server-timing", "")
+    if not all(metric in timing for metric in ("cache.lookup;dur=", "http.get;dur=", "total;dur=")):
+        print(f"❌ Unexpected Server-Timing: {timing}")
+        return False
+
+    spans = exported[0]["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    root = spans[0]
+    if len(exported) != 1 or root["traceId"] != "0af7651916cd43dd8448eb211c80319c" \
+            or root["parentSpanId"] != "b7ad6b7169203331" or len(spans) != 3:
+        print(f"❌ Unexpected export: {exported}")
+        return False
+    if response.headers.get("x-trace-id") != root["traceId"]:
+        print("❌ X-Trace-Id does not match the exported trace")
+        return False
+
+    print(f"✅ Server-Timing: {timing}")
+    print("✅ Trace exported with the incoming traceparent")
+    return True
+
+def test_export_off_request_path():
+    """A failing export should be counted and logged by the writer thread, not the request"""
+    print("\n🧪 Testing background export failures...")
+    with tempfile.TemporaryDirectory() as directory:
+        exporter = TraceExporter(os.path.join(directory, "missing", "traces.jsonl"))
+        with trace("request") as active:
+            pass
+        exporter.export(active)
+        exporter.flush()
+
+    if exporter.failures != 1 or exporter.exported != 0:
+        print(f"❌ Unexpected counts: {exporter.failures} failures, {exporter.exported} exported")
+        return False
+
+    print("✅ Export to a missing directory counted as a failure without raising")
+    return True
+
+def main():
+    print("🚀 Tracing Test Suite")
+    print("=" * 50)
+
+    results = {
+        "Span Nesting": test_span_nesting(),
+        "Provider Attempts": test_provider_attempts(),
+        "Middleware and Export": test_middleware_and_export(),
+        "Export Failures": test_export_off_request_path()
+    }
+
+    print("\n📊 Test Results Summary:")
+    print("=" * 30)
+    for name, passed in results.items():
+        print(f"{name}: {'✅ PASS' if passed else '❌ FAIL'}")
+
+    return all(results.values())
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)